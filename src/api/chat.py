@@ -1,5 +1,5 @@
 import logging
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, WebSocket
 from fastapi.responses import HTMLResponse, JSONResponse
@@ -9,14 +9,13 @@ from pydantic import BaseModel
 from src.api.depends import (
     authenticate_user_by_token,
     get_access_token,
-    get_auth_service,
     get_chat_manager,
     get_chat_repo,
     get_chat_template,
+    get_jwt_service,
     get_user_id,
 )
-from src.core.auth.auth_service import AuthService
-from src.core.auth.jwt import InvalidTokenError, TokenExpiredError
+from src.core.auth.jwt import InvalidTokenError, JWTServiceInterface, TokenExpiredError
 from src.core.chat_manager.exception import NotMemberError
 from src.core.chat_manager.interface import ChatManagerInterface
 from src.core.schemas.chat import ChatDTO, ChatType, CreateChatDTO
@@ -162,18 +161,22 @@ async def websocket_endpoint(
     chat_id: int,
     token: str,
     chat_manager: Annotated[ChatManagerInterface, Depends(get_chat_manager)],
-    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    jwt_service: Annotated[JWTServiceInterface, Depends(get_jwt_service)],
+    last_seen_id: Optional[int] = None,
 ):
     try:
-        payload = auth_service.authenticate_user_by_token(token=token)
+        payload = jwt_service.decode(token)
     except TokenExpiredError:
         await websocket.close(code=3003, reason="Access token expired")
+        return
     except InvalidTokenError:
         await websocket.close(code=3003, reason="Access token invalid")
+        return
     if not (user_id := payload.get("user_id")):
         await websocket.close(code=3003, reason="Access token invalid")
+        return
     try:
-        await chat_manager.connect_to_chat(chat_id, user_id, websocket)
+        await chat_manager.connect_to_chat(chat_id, user_id, websocket, last_seen_id)
     except NotMemberError:
         logger.warning(f"User {user_id} tried to connect to someone else's chat {chat_id}")
         await websocket.close(code=3003, reason="ACCESS FORBIDDEN")
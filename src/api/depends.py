@@ -1,41 +1,55 @@
-from typing import Annotated, AsyncGenerator, Generator
+from typing import Annotated, AsyncGenerator, Generator, Optional
 
 from fastapi import Depends, HTTPException, Request
+from fastapi.requests import HTTPConnection
 from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from src.core.auth.auth_service import ACCESS_COOKIE_NAME, AuthService
-from src.core.auth.jwt import (
-    InvalidTokenError,
-    JWTService,
-    JWTServiceInterface,
-    TokenExpiredError,
-)
+from src.core.auth.jwt import InvalidTokenError, JWTServiceInterface, TokenExpiredError
+from src.core.auth.jwt.cache import jwt_service
+from src.core.chat_manager.delivery import LocalDelivery
 from src.core.chat_manager.fastapi import FastapiChatManager
 from src.core.chat_manager.interface import ChatManagerInterface
+from src.core.fanout_bus.interface import FanoutBusInterface
+from src.core.heartbeat import HeartbeatSweeper
+from src.core.message_buffer import RecentMessagesBuffer, message_buffer
+from src.core.rate_limiter import message_rate_limiter
 from src.core.storage import connection_storage
+from src.data.chat_repo.cache import chat_cache
 from src.data.chat_repo.interface import ChatRepositoryInterface
+from src.data.chat_repo.memory import InMemoryChatRepository
 from src.data.chat_repo.postgresql import ChatRepository
+from src.data.memory_store import memory_store
+from src.data.message_repo.batching import (
+    BatchedMessageWriter,
+    BatchingMessageRepository,
+    ReadReceiptAggregator,
+)
 from src.data.message_repo.interface import MessageRepositoryInterface
+from src.data.message_repo.memory import InMemoryMessageRepository
 from src.data.message_repo.postrgesql import MessageRepository
+from src.data.outbox_repo.interface import OutboxRepositoryInterface
+from src.data.outbox_repo.memory import InMemoryOutboxRepository
+from src.data.outbox_repo.postgresql import OutboxRepository
+from src.data.repositories import RepositoriesFactory
 from src.data.user_repo.interface import UserRepositoryInterface
+from src.data.user_repo.memory import InMemoryUserRepository
 from src.data.user_repo.postgresql import UserRepository
-from src.database.postgresql.connection import (
-    SessionFactory,
-    SessionWrapper,
-    create_engine,
-)
+from src.database.postgresql.connection import SessionFactory, SessionWrapper
 from src.settings import settings
 
 
-def get_async_engine() -> AsyncEngine:
-    return create_engine(url=settings.DATABASE_ASYNC_URL)
+def get_async_engine(connection: HTTPConnection) -> AsyncEngine:
+    return connection.app.state.async_engine
+
 
+def get_async_session_factory(connection: HTTPConnection) -> SessionFactory:
+    return connection.app.state.async_session_factory
 
-def get_async_session_factory(
-    async_engine: Annotated[AsyncEngine, Depends(get_async_engine)],
-) -> SessionFactory:
-    return SessionFactory(engine=async_engine)
+
+def _in_memory() -> bool:
+    return settings.REPOSITORY_BACKEND == "memory"
 
 
 def get_async_session_wrapper(
@@ -51,6 +65,9 @@ async def get_user_repo(
         SessionWrapper, Depends(get_async_session_wrapper)
     ],
 ) -> AsyncGenerator[None, UserRepositoryInterface]:
+    if _in_memory():
+        yield InMemoryUserRepository(memory_store)
+        return
     async with async_session_wrapper.t() as session:
         yield UserRepository(session=session)
 
@@ -60,17 +77,54 @@ async def get_chat_repo(
         SessionWrapper, Depends(get_async_session_wrapper)
     ],
 ) -> AsyncGenerator[None, ChatRepositoryInterface]:
+    if _in_memory():
+        yield InMemoryChatRepository(memory_store)
+        return
     async with async_session_wrapper.t() as session:
-        yield ChatRepository(session=session)
+        yield ChatRepository(session=session, cache=chat_cache)
+
+
+def get_message_writer(connection: HTTPConnection) -> Optional[BatchedMessageWriter]:
+    return connection.app.state.message_writer
+
+
+def get_read_receipts(connection: HTTPConnection) -> Optional[ReadReceiptAggregator]:
+    return connection.app.state.read_receipts
 
 
 async def get_message_repo(
     async_session_wrapper: Annotated[
         SessionWrapper, Depends(get_async_session_wrapper)
     ],
+    message_writer: Annotated[
+        Optional[BatchedMessageWriter], Depends(get_message_writer)
+    ],
+    read_receipts: Annotated[
+        Optional[ReadReceiptAggregator], Depends(get_read_receipts)
+    ],
 ) -> AsyncGenerator[None, MessageRepositoryInterface]:
+    if _in_memory():
+        yield InMemoryMessageRepository(memory_store)
+        return
+    async with async_session_wrapper.t() as session:
+        message_repo = MessageRepository(session=session)
+        if message_writer is not None or read_receipts is not None:
+            message_repo = BatchingMessageRepository(
+                message_repo, writer=message_writer, read_receipts=read_receipts
+            )
+        yield message_repo
+
+
+async def get_outbox_repo(
+    async_session_wrapper: Annotated[
+        SessionWrapper, Depends(get_async_session_wrapper)
+    ],
+) -> AsyncGenerator[None, OutboxRepositoryInterface]:
+    if _in_memory():
+        yield InMemoryOutboxRepository(memory_store)
+        return
     async with async_session_wrapper.t() as session:
-        yield MessageRepository(session=session)
+        yield OutboxRepository(session=session)
 
 
 def get_jinja_environment() -> Environment:
@@ -85,25 +139,43 @@ def get_chat_template(
     return env.get_template("chat.html")
 
 
+def get_fanout_bus(connection: HTTPConnection) -> FanoutBusInterface:
+    return connection.app.state.fanout_bus
+
+
+def get_heartbeat(connection: HTTPConnection) -> Optional[HeartbeatSweeper]:
+    return connection.app.state.heartbeat
+
+
+def get_local_delivery(connection: HTTPConnection) -> LocalDelivery:
+    return connection.app.state.local_delivery
+
+
+def get_repositories(connection: HTTPConnection) -> RepositoriesFactory:
+    return connection.app.state.repositories
+
+
 def get_chat_manager(
-    chat_repo: Annotated[ChatRepositoryInterface, Depends(get_chat_repo)],
-    user_repo: Annotated[UserRepositoryInterface, Depends(get_user_repo)],
-    message_repo: Annotated[MessageRepositoryInterface, Depends(get_message_repo)],
+    repositories: Annotated[RepositoriesFactory, Depends(get_repositories)],
+    fanout_bus: Annotated[FanoutBusInterface, Depends(get_fanout_bus)],
 ) -> Generator[None, None, ChatManagerInterface]:
+    # No request session, websockets outlive it and open their own per unit of work
     yield FastapiChatManager(
         connection_storage=connection_storage,
-        message_repository=message_repo,
-        chat_repository=chat_repo,
-        user_repository=user_repo,
+        repositories=repositories,
+        fanout_bus=fanout_bus,
+        replay_limit=settings.RECONNECT_REPLAY_LIMIT,
+        message_buffer=message_buffer,
+        rate_limiter=message_rate_limiter,
     )
 
 
+def get_message_buffer() -> RecentMessagesBuffer:
+    return message_buffer
+
+
 def get_jwt_service() -> JWTServiceInterface:
-    return JWTService(
-        algorithm=settings.JWT_SIGNATURE_ALGORITHM,
-        secret_key=settings.JWT_SECRET_KEY,
-        token_lifetime=settings.JWT_TOKEN_LIFETIME_SEC,
-    )
+    return jwt_service
 
 
 def get_auth_service(
@@ -129,10 +201,11 @@ def get_access_token(request: Request) -> str:
 
 def authenticate_user_by_token(
     token: Annotated[str, Depends(get_access_token)],
-    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    jwt_service: Annotated[JWTServiceInterface, Depends(get_jwt_service)],
 ) -> dict[str, str]:
+    # Token checks go straight to the JWT service, AuthService would open a session for its user repo
     try:
-        payload = auth_service.authenticate_user_by_token(token)
+        payload = jwt_service.decode(token)
     except TokenExpiredError:
         raise HTTPException(status_code=403, detail="Access token expired")
     except InvalidTokenError:
@@ -1,9 +1,17 @@
+import base64
+import binascii
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
-from src.api.depends import get_chat_repo, get_message_repo, get_user_id
+from src.api.depends import (
+    get_chat_repo,
+    get_message_buffer,
+    get_message_repo,
+    get_user_id,
+)
+from src.core.message_buffer import RecentMessagesBuffer
 from src.core.schemas.message import MessageHistory
 from src.data.chat_repo.exception import ChatNotFound
 from src.data.chat_repo.interface import ChatRepositoryInterface
@@ -11,10 +19,32 @@ from src.data.message_repo.interface import MessageRepositoryInterface
 
 history_router = APIRouter(prefix="/history")
 
+CURSOR_DIRECTIONS = ("before", "after")
+
 
 class HistoryPaginationParams(BaseModel):
     limit: Optional[int] = None
     offset: Optional[int] = None
+    before_id: Optional[int] = None
+    after_id: Optional[int] = None
+    latest: bool = False
+    cursor: Optional[str] = None
+    with_total: bool = False
+
+
+def encode_cursor(direction: str, message_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{direction}:{message_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        direction, message_id = base64.urlsafe_b64decode(cursor).decode().split(":")
+        message_id = int(message_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="INVALID CURSOR")
+    if direction not in CURSOR_DIRECTIONS:
+        raise HTTPException(status_code=400, detail="INVALID CURSOR")
+    return direction, message_id
 
 
 @history_router.get("/{chat_id}")
@@ -24,6 +54,7 @@ async def get_chat_history(
     pagination: Annotated[HistoryPaginationParams, Query()],
     message_repo: Annotated[MessageRepositoryInterface, Depends(get_message_repo)],
     chat_repo: Annotated[ChatRepositoryInterface, Depends(get_chat_repo)],
+    message_buffer: Annotated[RecentMessagesBuffer, Depends(get_message_buffer)],
 ) -> MessageHistory:
     try:
         chat = await chat_repo.get_chat(chat_id)
@@ -33,6 +64,44 @@ async def get_chat_history(
     if user_id not in chat.members_ids:
         raise HTTPException(status_code=403, detail="YOU ARE NOT A MEMBER OF THAT CHAT")
 
-    return await message_repo.get_message_history(
-        chat_id, limit=pagination.limit, offset=pagination.offset
+    before_id, after_id, latest = pagination.before_id, pagination.after_id, pagination.latest
+    if pagination.cursor is not None:
+        direction, message_id = decode_cursor(pagination.cursor)
+        if direction == "before":
+            before_id = message_id
+        else:
+            after_id = message_id
+
+    first_page = (
+        latest
+        and pagination.limit is not None
+        and pagination.offset is None
+        and before_id is None
+        and after_id is None
+        and not pagination.with_total
     )
+    if first_page and (items := message_buffer.get_latest(chat_id, pagination.limit)) is not None:
+        history = MessageHistory(items=items)
+    else:
+        history = await message_repo.get_message_history(
+            chat_id,
+            limit=pagination.limit,
+            offset=pagination.offset,
+            before_id=before_id,
+            after_id=after_id,
+            latest=latest,
+            with_total=pagination.with_total,
+        )
+        if first_page:
+            message_buffer.seed(
+                chat_id, history.items, complete=len(history.items) < pagination.limit
+            )
+
+    keyset = latest or before_id is not None or after_id is not None
+    if keyset and history.items and len(history.items) == pagination.limit:
+        history.next_cursor = (
+            encode_cursor("before", history.items[0].id)
+            if latest or before_id is not None
+            else encode_cursor("after", history.items[-1].id)
+        )
+    return history
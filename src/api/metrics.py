@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.core.metrics import Samples, metrics
+from src.core.storage import connection_storage
+from src.settings import settings
+
+metrics_router = APIRouter()
+
+
+def _chat_connections() -> Samples:
+    # Only the largest chats, a label per chat would not fit in Prometheus
+    return [
+        ((str(chat_id),), count)
+        for chat_id, count in connection_storage.get_chat_connection_counts(settings.METRICS_TOP_CHATS)
+    ]
+
+
+metrics.gauge(
+    "websocket_connections",
+    "Open websockets of this worker",
+    lambda: connection_storage.get_stats()["connections"],
+)
+metrics.gauge(
+    "websocket_chat_connections",
+    "Open websockets of the chats with the most of them",
+    _chat_connections,
+    ("chat_id",),
+)
+metrics.gauge(
+    "websocket_send_queue_frames",
+    "Frames waiting in send queues of this worker",
+    lambda: connection_storage.get_stats()["queued"],
+)
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
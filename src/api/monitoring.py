@@ -0,0 +1,125 @@
+from typing import Annotated, Optional, Union
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.api.depends import (
+    authenticate_user_by_token,
+    get_async_engine,
+    get_fanout_bus,
+    get_heartbeat,
+    get_local_delivery,
+    get_message_writer,
+    get_outbox_repo,
+    get_read_receipts,
+)
+from src.core.auth.jwt.cache import jwt_service
+from src.core.chat_manager.delivery import LocalDelivery
+from src.core.fanout_bus.interface import FanoutBusInterface
+from src.core.heartbeat import HeartbeatSweeper
+from src.core.message_buffer import message_buffer
+from src.core.rate_limiter import message_rate_limiter
+from src.core.storage import connection_storage
+from src.core.tracing import tracer
+from src.data.chat_repo.cache import chat_cache
+from src.data.message_repo.batching import BatchedMessageWriter, ReadReceiptAggregator
+from src.data.outbox_repo.interface import OutboxRepositoryInterface
+from src.database.postgresql.connection import get_pool_stats
+
+monitoring_router = APIRouter(
+    prefix="/monitoring", dependencies=(Depends(authenticate_user_by_token),)
+)
+
+
+@monitoring_router.get("/db_pool")
+async def get_db_pool_stats(
+    async_engine: Annotated[AsyncEngine, Depends(get_async_engine)],
+) -> dict[str, Union[int, float]]:
+    return get_pool_stats(async_engine)
+
+
+@monitoring_router.get("/connection_storage")
+async def get_connection_storage_stats() -> dict[str, int]:
+    return connection_storage.get_stats()
+
+
+@monitoring_router.get("/connections")
+async def get_connections_stats(limit: int = 100) -> list[dict[str, int]]:
+    return connection_storage.get_connection_stats(limit)
+
+
+@monitoring_router.get("/delivery_outbox")
+async def get_delivery_outbox_stats(
+    outbox_repo: Annotated[OutboxRepositoryInterface, Depends(get_outbox_repo)],
+) -> dict[str, int]:
+    return {"pending_deliveries": await outbox_repo.count_deliveries()}
+
+
+@monitoring_router.get("/chat_cache")
+async def get_chat_cache_stats() -> dict[str, int]:
+    return chat_cache.get_stats()
+
+
+@monitoring_router.get("/message_writer")
+async def get_message_writer_stats(
+    message_writer: Annotated[
+        Optional[BatchedMessageWriter], Depends(get_message_writer)
+    ],
+) -> dict[str, int]:
+    if message_writer is None:
+        return {}
+    return message_writer.get_stats()
+
+
+@monitoring_router.get("/read_receipts")
+async def get_read_receipts_stats(
+    read_receipts: Annotated[
+        Optional[ReadReceiptAggregator], Depends(get_read_receipts)
+    ],
+) -> dict[str, int]:
+    if read_receipts is None:
+        return {}
+    return read_receipts.get_stats()
+
+
+@monitoring_router.get("/message_buffer")
+async def get_message_buffer_stats() -> dict[str, int]:
+    return message_buffer.get_stats()
+
+
+@monitoring_router.get("/fanout_bus")
+async def get_fanout_bus_stats(
+    fanout_bus: Annotated[FanoutBusInterface, Depends(get_fanout_bus)],
+) -> dict[str, int]:
+    return fanout_bus.get_stats()
+
+
+@monitoring_router.get("/local_delivery")
+async def get_local_delivery_stats(
+    local_delivery: Annotated[LocalDelivery, Depends(get_local_delivery)],
+) -> dict[str, int]:
+    return local_delivery.get_stats()
+
+
+@monitoring_router.get("/heartbeat")
+async def get_heartbeat_stats(
+    heartbeat: Annotated[Optional[HeartbeatSweeper], Depends(get_heartbeat)],
+) -> dict[str, int]:
+    if heartbeat is None:
+        return {}
+    return heartbeat.get_stats()
+
+
+@monitoring_router.get("/jwt_cache")
+async def get_jwt_cache_stats() -> dict[str, int]:
+    return jwt_service.get_stats()
+
+
+@monitoring_router.get("/rate_limiter")
+async def get_rate_limiter_stats() -> dict[str, int]:
+    return message_rate_limiter.get_stats()
+
+
+@monitoring_router.get("/tracing")
+async def get_tracing_stats() -> dict[str, int]:
+    return tracer.get_stats()
@@ -1,26 +1,190 @@
 import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
 import uvicorn
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
 from src.api.auth import auth_router
 from src.api.chat import chat_router, websocket_router
 from src.api.history import history_router
+from src.api.metrics import metrics_router
+from src.api.monitoring import monitoring_router
 from src.api.user import user_router
-
-from src import sync_persistent_and_memory_chat_storage
+from src.core.background import background_tasks
+from src.core.chat_manager.delivery import LocalDelivery
+from src.core.connection_writer import RESTART_CLOSE_CODE, ConnectionWriter
+from src.core.fanout_bus.in_process import InProcessFanoutBus
+from src.core.fanout_bus.postgresql import PostgresFanoutBus
+from src.core.heartbeat import HeartbeatSweeper
+from src.core.message_buffer import message_buffer
+from src.core.metrics import http_request_seconds
+from src.core.schemas.delivery import DeliveryDTO
+from src.core.schemas.message import MessageDTO
+from src.core.storage import connection_storage
+from src.data.chat_repo.cache import chat_cache
+from src.data.memory_store import memory_store
+from src.data.message_repo.batching import BatchedMessageWriter, ReadReceiptAggregator
+from src.data.repositories import memory_repositories, postgres_repositories
+from src.database.postgresql.connection import (
+    SessionFactory,
+    SessionWrapper,
+    create_engine,
+)
+from src.settings import settings
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Both phases share SHUTDOWN_TIMEOUT_SEC: uvicorn closes the sockets and waits
+# for their handlers first, the lifespan then flushes pending writes
+CONNECTIONS_SHUTDOWN_SEC = settings.SHUTDOWN_TIMEOUT_SEC / 2
+LIFESPAN_SHUTDOWN_SEC = settings.SHUTDOWN_TIMEOUT_SEC - CONNECTIONS_SHUTDOWN_SEC
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    async_engine = create_engine(
+        url=settings.DATABASE_ASYNC_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+        pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+    )
+    app.state.async_engine = async_engine
+    app.state.async_session_factory = SessionFactory(engine=async_engine)
+    async_session_wrapper = SessionWrapper(app.state.async_session_factory)
+
+    in_memory = settings.REPOSITORY_BACKEND == "memory"
+    # Batchers write to the database directly, the in-memory repositories need none
+    app.state.message_writer = None
+    if settings.MESSAGE_BATCH_WRITER_ENABLED and not in_memory:
+        app.state.message_writer = BatchedMessageWriter(
+            session_wrapper=async_session_wrapper,
+            max_batch_size=settings.MESSAGE_BATCH_MAX_SIZE,
+            max_delay_sec=settings.MESSAGE_BATCH_MAX_DELAY_SEC,
+        )
+        app.state.message_writer.start()
+
+    app.state.read_receipts = None
+    if settings.READ_RECEIPT_BATCHING_ENABLED and not in_memory:
+        app.state.read_receipts = ReadReceiptAggregator(
+            session_wrapper=async_session_wrapper,
+            max_batch_size=settings.READ_RECEIPT_BATCH_MAX_SIZE,
+            max_delay_sec=settings.READ_RECEIPT_BATCH_MAX_DELAY_SEC,
+        )
+        app.state.read_receipts.start()
+
+    # Units of work outside of HTTP requests, websockets and background tasks, open their own sessions
+    if in_memory:
+        app.state.repositories = memory_repositories(memory_store)
+    else:
+        app.state.repositories = postgres_repositories(
+            async_session_wrapper, app.state.message_writer, app.state.read_receipts
+        )
+
+    async def load_message(message_id: int) -> MessageDTO:
+        async with app.state.repositories() as repos:
+            return await repos.message.get_message(message_id)
+
+    async def return_to_outbox(
+        chat_id: int, user_id: int, deliveries: list[DeliveryDTO]
+    ) -> None:
+        async with app.state.repositories() as repos:
+            for delivery in deliveries:
+                await repos.outbox.add_deliveries(
+                    chat_id, delivery.message.id, (user_id,), delivery.receipt
+                )
+
+    connection_storage.lost_frames_handler = return_to_outbox
+    local_delivery = LocalDelivery(connection_storage, message_buffer)
+    app.state.local_delivery = local_delivery
 
-@app.middleware
+    def on_bus_reconnect() -> None:
+        local_delivery.reset()
+        # Changes of chats made by other workers meanwhile were missed too
+        chat_cache.clear()
+
+    if settings.FANOUT_BUS == "postgresql":
+        app.state.fanout_bus = PostgresFanoutBus(
+            dsn=settings.DATABASE_SYNC_URL,
+            connection_storage=connection_storage,
+            message_loader=load_message,
+            channel=settings.FANOUT_CHANNEL,
+            heartbeat_interval_sec=settings.FANOUT_HEARTBEAT_INTERVAL_SEC,
+            ack_timeout_sec=settings.FANOUT_ACK_TIMEOUT_SEC,
+            on_reconnect=on_bus_reconnect,
+            on_chat_changed=chat_cache.drop,
+        )
+    else:
+        if settings.WORKERS > 1:
+            logger.warning("In-process fan-out bus can't reach sockets of other workers")
+        app.state.fanout_bus = InProcessFanoutBus(connection_storage)
+    await app.state.fanout_bus.start(local_delivery.handle)
+    chat_cache.invalidation_handler = app.state.fanout_bus.chat_changed
+
+    async def forget_evicted(writer: ConnectionWriter) -> None:
+        if connection_storage.remove_user_connection(
+            writer.chat_id, writer.user_id, writer.connection
+        ):
+            await app.state.fanout_bus.user_disconnected(writer.chat_id, writer.user_id)
+
+    app.state.heartbeat = None
+    if settings.HEARTBEAT_ENABLED:
+        app.state.heartbeat = HeartbeatSweeper(
+            interval_sec=settings.HEARTBEAT_INTERVAL_SEC,
+            timeout_sec=settings.HEARTBEAT_TIMEOUT_SEC,
+            on_evict=forget_evicted,
+        )
+        app.state.heartbeat.start()
+        connection_storage.heartbeat = app.state.heartbeat
+
+    yield
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LIFESPAN_SHUTDOWN_SEC
+    # Uvicorn has closed the sockets with 1012 already, this is a fallback for
+    # connections still registered, e.g. when run without uvicorn's graceful
+    # shutdown. Unsent frames of the closed sockets go back to the outbox
+    connection_storage.close_all(RESTART_CLOSE_CODE)
+    await background_tasks.drain(deadline - loop.time())
+    if app.state.heartbeat is not None:
+        await app.state.heartbeat.stop()
+    await app.state.fanout_bus.stop()
+    for batcher in (app.state.message_writer, app.state.read_receipts):
+        if batcher is None:
+            continue
+        try:
+            await asyncio.wait_for(batcher.stop(), max(deadline - loop.time(), 0.1))
+        except asyncio.TimeoutError:
+            logger.error(f"{type(batcher).__name__} was not flushed before shutdown deadline")
+    await async_engine.dispose()
+    logger.info("Database connection pool disposed")
+
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
 async def base_middleware(request: Request, call_next):
+    started_at = time.perf_counter()
     try:
-        return await call_next(request)
-    except BaseException as exc:
+        response = await call_next(request)
+    except Exception:
         logger.exception("An unexpected error occurred")
-        raise HTTPException(status_code=500, detail="Call Sergey Dmitriev, smth went wrong")
+        response = JSONResponse(
+            status_code=500, content={"detail": "Call Sergey Dmitriev, smth went wrong"}
+        )
+    # Route template rather than the path, so ids don't make a series each
+    route = request.scope.get("route")
+    http_request_seconds.observe(
+        time.perf_counter() - started_at,
+        request.method,
+        route.path if route is not None else "unmatched",
+        str(response.status_code),
+    )
+    return response
 
 
 app.include_router(user_router)
@@ -28,7 +192,16 @@ app.include_router(chat_router)
 app.include_router(history_router)
 app.include_router(auth_router)
 app.include_router(websocket_router)
+if settings.MONITORING_ENABLED:
+    app.include_router(monitoring_router)
+app.include_router(metrics_router)
 
-asyncio.run(sync_persistent_and_memory_chat_storage())
-
-uvicorn.run(app, host="0.0.0.0")
+if __name__ == "__main__":
+    uvicorn.run(
+        "src.app:app",
+        host="0.0.0.0",
+        workers=settings.WORKERS,
+        timeout_graceful_shutdown=CONNECTIONS_SHUTDOWN_SEC,
+        ws_ping_interval=settings.WS_PING_INTERVAL_SEC,
+        ws_ping_timeout=settings.WS_PING_TIMEOUT_SEC,
+    )
@@ -0,0 +1,55 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from src.core.auth.jwt import JWTService, JWTServiceInterface, TokenExpiredError
+from src.settings import settings
+
+
+class CachingJWTService(JWTServiceInterface):
+    """Remembers payloads of verified tokens, so a reused token is not decoded again.
+
+    Entries are keyed by the token digest and dropped once the token's exp passes.
+    """
+
+    def __init__(self, jwt_service: JWTServiceInterface, max_size: int) -> None:
+        self._jwt_service = jwt_service
+        self._max_size = max_size
+        self._payloads: OrderedDict[bytes, tuple[float, dict[str, str]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, payload: dict[str, str]) -> str:
+        return self._jwt_service.encode(payload)
+
+    def decode(self, token: str) -> dict[str, str]:
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self._payloads.get(key)
+        if entry is not None:
+            if entry[0] <= time.time():
+                del self._payloads[key]
+                raise TokenExpiredError
+            self._payloads.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+        self.misses += 1
+        payload = self._jwt_service.decode(token)
+        if self._max_size > 0 and "exp" in payload:
+            self._payloads[key] = (float(payload["exp"]), payload)
+            while len(self._payloads) > self._max_size:
+                self._payloads.popitem(last=False)
+        return dict(payload)
+
+    def get_stats(self) -> dict[str, int]:
+        return {"size": len(self._payloads), "hits": self.hits, "misses": self.misses}
+
+
+jwt_service = CachingJWTService(
+    JWTService(
+        algorithm=settings.JWT_SIGNATURE_ALGORITHM,
+        secret_key=settings.JWT_SECRET_KEY,
+        token_lifetime=settings.JWT_TOKEN_LIFETIME_SEC,
+    ),
+    max_size=settings.JWT_CACHE_MAX_SIZE,
+)
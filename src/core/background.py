@@ -0,0 +1,39 @@
+import asyncio
+import logging
+from typing import Any, Coroutine
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """Fire-and-forget tasks the shutdown still waits for."""
+
+    def __init__(self) -> None:
+        self._tasks: set[asyncio.Task] = set()
+
+    def spawn(self, coroutine: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self, timeout_sec: float) -> int:
+        """Wait for running tasks and those they spawn, returns how many were cancelled."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_sec
+        while self._tasks and (remaining := deadline - loop.time()) > 0:
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+
+        pending = list(self._tasks)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} background tasks on shutdown")
+            await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+background_tasks = BackgroundTasks()
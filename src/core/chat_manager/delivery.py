@@ -0,0 +1,61 @@
+from typing import Optional
+
+from src.core.connection_writer import ConnectionWriter, SendConfirmation
+from src.core.message_buffer import RecentMessagesBuffer
+from src.core.schemas.delivery import DeliveryDTO, FanoutEvent
+from src.core.storage import ConnectionStorage
+
+
+class LocalDelivery:
+    """Hands fan-out bus events to the connections of this worker."""
+
+    def __init__(
+        self,
+        connection_storage: ConnectionStorage,
+        message_buffer: Optional[RecentMessagesBuffer] = None,
+    ) -> None:
+        self._connection_storage = connection_storage
+        self._message_buffer = message_buffer
+        self.frames = 0
+        self.rejected = 0
+
+    async def handle(
+        self, event: FanoutEvent, confirmation: Optional[SendConfirmation] = None
+    ) -> None:
+        chat_id = event.message.chat_id
+        if self._message_buffer is not None:
+            if event.receipt:
+                self._message_buffer.mark_read(chat_id, event.message.id)
+            elif event.user_id is None:
+                self._message_buffer.append(event.message)
+
+        if event.user_id is None:
+            writers = self._connection_storage.get_connections(chat_id)
+        else:
+            writers = self._connection_storage.get_user_connections(chat_id, event.user_id)
+        self.broadcast(writers, event.frame, event, confirmation)
+
+    def broadcast(
+        self,
+        writers: list[ConnectionWriter],
+        text: str,
+        delivery: Optional[DeliveryDTO] = None,
+        confirmation: Optional[SendConfirmation] = None,
+    ) -> int:
+        """Queue one frame to every connection, returns how many didn't take it."""
+        # Built once and shared, the ASGI server doesn't modify sent messages
+        frame = {"type": "websocket.send", "text": text}
+        rejected = sum(
+            1 for writer in writers if not writer.put(frame, delivery, confirmation)
+        )
+        self.frames += len(writers)
+        self.rejected += rejected
+        return rejected
+
+    def reset(self) -> None:
+        # Events were lost, the buffer can't vouch for chat tails anymore
+        if self._message_buffer is not None:
+            self._message_buffer.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        return {"frames": self.frames, "rejected": self.rejected}
@@ -1,129 +1,339 @@
-import asyncio
 import logging
+import time
 from datetime import datetime
+from typing import Iterable, Optional
 
 from fastapi import WebSocket
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 
+from src.core.background import background_tasks
 from src.core.chat_manager.exception import NotMemberError
-from src.core.chat_manager.interface import ChatManagerInterface
+from src.core.chat_manager.interface import AsyncConnectionProtocol, ChatManagerInterface
+from src.core.connection_writer import ConnectionWriter, SendConfirmation
+from src.core.fanout_bus.interface import FanoutBusInterface
+from src.core.message_buffer import RecentMessagesBuffer
+from src.core.metrics import message_stage_seconds
+from src.core.rate_limiter import THROTTLED_TEXT, MessageRateLimiter
 from src.core.schemas.chat import ChatDTO, ChatType, CreateChatDTO
 from src.core.schemas.message import MessageCreateDTO, MessageDTO
+from src.core.schemas.delivery import DeliveryDTO, FanoutEvent
+from src.core.schemas.frame import FrameDTO
 from src.core.storage import ConnectionStorage
-from src.data.chat_repo.interface import ChatRepositoryInterface
-from src.data.message_repo.interface import MessageRepositoryInterface
-from src.data.user_repo.interface import UserRepositoryInterface
+from src.core.tracing import Trace, trace_span, tracer
+from src.data.repositories import Repositories, RepositoriesFactory
 
 logger = logging.getLogger(__name__)
 
+REPLAY_TRUNCATED_TEXT = "Some messages were not replayed, load them from /history."
+
 
 class FastapiChatManager(ChatManagerInterface):
+    """Chats over websockets.
+
+    A connection lives long, so it holds no database session: every unit of
+    work, background fan-outs included, opens its own from repositories.
+    """
+
     def __init__(
         self,
         connection_storage: ConnectionStorage,
-        message_repository: MessageRepositoryInterface,
-        chat_repository: ChatRepositoryInterface,
-        user_repository: UserRepositoryInterface,
+        repositories: RepositoriesFactory,
+        fanout_bus: FanoutBusInterface,
+        replay_limit: int = 100,
+        message_buffer: Optional[RecentMessagesBuffer] = None,
+        rate_limiter: Optional[MessageRateLimiter] = None,
     ) -> None:
         self._connection_storage = connection_storage
-        self._message_repository = message_repository
-        self._chat_repository = chat_repository
-        self._user_repository = user_repository
+        self._repositories = repositories
+        self._fanout_bus = fanout_bus
+        self._replay_limit = replay_limit
+        self._message_buffer = message_buffer
+        self._rate_limiter = rate_limiter
+
+    async def _notify_read_by_all(
+        self, repos: Repositories, chat_id: int, message: MessageDTO
+    ) -> None:
+        await repos.message.mark_message_as_read(message_id=message.id)
+        sender_online = self._fanout_bus.is_online(chat_id, message.sender_id)
+        # Published regardless of the sender, so every worker marks its buffer
+        await self._fanout_bus.publish(
+            FanoutEvent(message=message, receipt=True, user_id=message.sender_id)
+        )
+        if not sender_online:
+            await repos.outbox.add_deliveries(
+                chat_id, message.id, (message.sender_id,), receipt=True
+            )
 
-    async def _wait_until_user_connect_and_send(
-        self, message: str, recivier_id: int, chat_id: int, message_id: int
+    async def _acknowledge_deliveries(
+        self, repos: Repositories, chat_id: int, deliveries: list[DeliveryDTO]
     ) -> None:
-        self._connection_storage.add_fresh_message(message_id, chat_id, recivier_id)
-        while True:
-            recivier_connection = self._connection_storage.get_connection(chat_id, recivier_id)
-            if not recivier_connection:
-                await asyncio.sleep(3)
-                continue
-
-            await recivier_connection.send_text(message)
-            self._connection_storage.remover_fresh_message(message_id, chat_id, recivier_id)
-            logger.info(f"Message with id {message_id} successfully delivered")
+        delivered_messages = {
+            delivery.message.id: delivery.message
+            for delivery in deliveries
+            if not delivery.receipt
+        }
+        undelivered_ids = await repos.outbox.get_undelivered_message_ids(
+            delivered_messages
+        )
+        for message_id, message in delivered_messages.items():
+            if message_id not in undelivered_ids:
+                await self._notify_read_by_all(repos, chat_id, message)
+
+    async def _acknowledge_sent(
+        self,
+        chat_id: int,
+        confirmations: list[tuple[DeliveryDTO, SendConfirmation]],
+        delivered: Iterable[DeliveryDTO] = (),
+    ) -> None:
+        """Acknowledge the deliveries once their frames are sent.
+
+        Unsent ones are handed back to the outbox by the writers.
+        """
+        sent = list(delivered)
+        for delivery, confirmation in confirmations:
+            if await confirmation.wait():
+                sent.append(delivery)
+        if not sent:
             return
+        # Opened after the wait, a slow client doesn't hold a connection
+        async with self._repositories() as repos:
+            await self._acknowledge_deliveries(repos, chat_id, sent)
 
-    async def _send_to_all_members(self, chat_id: int, message: MessageDTO) -> None:
-        chat = await self._chat_repository.get_chat(chat_id)
-        tasks = [
-            self._wait_until_user_connect_and_send(message.text, member_id, chat_id, message.id)
-            for member_id in chat.members_ids
-        ]
+    async def _send_to_all_members(
+        self,
+        chat_id: int,
+        message: MessageDTO,
+        saved_at: Optional[float] = None,
+        trace: Optional[Trace] = None,
+    ) -> None:
+        try:
+            await self._fan_out(chat_id, message, saved_at, trace)
+        finally:
+            if trace is not None:
+                tracer.finish(trace)
 
-        await asyncio.gather(*tasks)
+    async def _fan_out(
+        self,
+        chat_id: int,
+        message: MessageDTO,
+        saved_at: Optional[float],
+        trace: Optional[Trace],
+    ) -> None:
+        async with self._repositories() as repos:
+            with trace_span(trace, "get_chat"):
+                chat = await repos.chat.get_chat(chat_id)
+            offline_ids = [
+                member_id
+                for member_id in chat.members_ids
+                if not self._fanout_bus.is_online(chat_id, member_id)
+            ]
+            with trace_span(trace, "publish"):
+                confirmation = await self._fanout_bus.deliver(FanoutEvent(message=message))
+            if saved_at is not None:
+                message_stage_seconds.observe(time.perf_counter() - saved_at, "fanout")
+            if offline_ids:
+                with trace_span(trace, "add_deliveries", offline=len(offline_ids)):
+                    await repos.outbox.add_deliveries(chat_id, message.id, offline_ids)
+                # Member could connect and drain the outbox before the rows above were committed
+                with trace_span(trace, "recheck_offline"):
+                    redelivered = await self._redeliver_to_connected(repos, chat_id, offline_ids)
 
-        await self._message_repository.mark_message_as_read(message_id=message.id)
+        if offline_ids:
+            await self._acknowledge_sent(chat_id, redelivered)
+            return
+        # Frames that are never sent go back to the outbox, the receipt is
+        # then left to whoever drains it
+        with trace_span(trace, "confirm_sent"):
+            sent = await confirmation.wait()
+        if sent:
+            with trace_span(trace, "notify_read_by_all"):
+                async with self._repositories() as repos:
+                    await self._notify_read_by_all(repos, chat_id, message)
 
-        asyncio.create_task(
-            self._wait_until_user_connect_and_send(
-                message=f"{message.text}: Message was read by all chat participants.",
-                recivier_id=message.sender_id,
-                chat_id=chat_id,
-                message_id=message.id,
-            )
-        )
+    async def _redeliver_to_connected(
+        self, repos: Repositories, chat_id: int, offline_ids: list[int]
+    ) -> list[tuple[DeliveryDTO, SendConfirmation]]:
+        """Send the outbox of members that connected meanwhile, returns what to confirm."""
+        confirmations = []
+        for member_id in offline_ids:
+            if self._fanout_bus.is_online(chat_id, member_id):
+                deliveries = await repos.outbox.pop_deliveries(chat_id, member_id)
+                for delivery in deliveries:
+                    event = FanoutEvent(
+                        message=delivery.message,
+                        receipt=delivery.receipt,
+                        user_id=member_id,
+                    )
+                    if delivery.receipt:
+                        await self._fanout_bus.publish(event)
+                    else:
+                        confirmations.append((delivery, await self._fanout_bus.deliver(event)))
+        return confirmations
 
     async def _chat_processing(
-        self, chat_id: int, user_id: int, connection: WebSocket
+        self, chat_id: int, user_id: int, writer: ConnectionWriter
     ) -> None:
+        connection = writer.connection
         try:
             logger.info(f"User {user_id} connected to chat {chat_id}")
             while True:
-                message = await connection.receive_text()
-                message = f"User {user_id}: {message}"
-                message_dto = await self._message_repository.save_message(
-                    dto=MessageCreateDTO(
-                        chat_id=chat_id,
-                        sender_id=user_id,
-                        text=message,
-                        timestamp=int(datetime.now().timestamp()),
+                frame = await connection.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                writer.touch()
+                if frame.get("text") is None:
+                    continue  # Binary frames only answer heartbeat pings
+                if self._rate_limiter is not None and not self._rate_limiter.allow(chat_id, user_id):
+                    writer.put_text(FrameDTO.for_notice(THROTTLED_TEXT).dump())
+                    continue
+                message = f"User {user_id}: {frame['text']}"
+                trace = tracer.start("chat_message", chat_id=chat_id, user_id=user_id)
+                with message_stage_seconds.time("save"), trace_span(trace, "save_message"):
+                    async with self._repositories() as repos:
+                        message_dto = await repos.message.save_message(
+                            dto=MessageCreateDTO(
+                                chat_id=chat_id,
+                                sender_id=user_id,
+                                text=message,
+                                timestamp=int(datetime.now().timestamp()),
+                            )
+                        )
+                if trace is not None:
+                    tracer.bind(message_dto.id, trace)
+                if self._message_buffer is not None:
+                    self._message_buffer.append(message_dto)
+                background_tasks.spawn(
+                    self._send_to_all_members(
+                        chat_id, message_dto, time.perf_counter(), trace
                     )
                 )
-                asyncio.create_task(self._send_to_all_members(chat_id, message_dto))
 
         except WebSocketDisconnect:
-            await self.disconnect_from_chat(chat_id, user_id)
             logger.info(f"User {user_id} disconnected from chat {chat_id}")
 
     async def create_chat(
         self, chat_name: str, chat_type: ChatType, creator_id: int
     ) -> ChatDTO:
-        chat_dto = await self._chat_repository.create_chat(
-            dto=CreateChatDTO(
-                name=chat_name, chat_type=chat_type, creator_id=creator_id
+        async with self._repositories() as repos:
+            chat_dto = await repos.chat.create_chat(
+                dto=CreateChatDTO(
+                    name=chat_name, chat_type=chat_type, creator_id=creator_id
+                )
             )
-        )
-        self._connection_storage.create_chat(chat_dto.id)
         return chat_dto
 
+    async def _get_replay(
+        self, repos: Repositories, chat_id: int, last_seen_id: Optional[int]
+    ) -> tuple[list[MessageDTO], bool]:
+        """Newest messages after last_seen_id, and whether more of them didn't fit."""
+        # One more than the limit tells if the client misses some after last_seen_id
+        limit = self._replay_limit if last_seen_id is None else self._replay_limit + 1
+        replay = None
+        if self._message_buffer is not None:
+            replay = self._message_buffer.get_latest(chat_id, limit, last_seen_id)
+        if replay is None:
+            msg_hist = await repos.message.get_message_history(
+                chat_id=chat_id,
+                limit=limit,
+                after_id=last_seen_id,
+                latest=True,
+            )
+            replay = msg_hist.items
+            if self._message_buffer is not None and last_seen_id is None:
+                self._message_buffer.seed(chat_id, replay, complete=len(replay) < limit)
+        if len(replay) > self._replay_limit:
+            return replay[1:], True
+        return replay, False
+
+    @staticmethod
+    def _missed_by_replay(
+        replay: list[MessageDTO], deliveries: list[DeliveryDTO], last_seen_id: Optional[int]
+    ) -> list[MessageDTO]:
+        """Pending messages the replay doesn't cover, cut off by its limit or not buffered yet."""
+        replayed_ids = {message.id for message in replay}
+        return [
+            delivery.message
+            for delivery in deliveries
+            if not delivery.receipt
+            and delivery.message.id not in replayed_ids
+            # The client has everything up to last_seen_id already
+            and (last_seen_id is None or delivery.message.id > last_seen_id)
+        ]
+
     async def connect_to_chat(
-        self, chat_id: int, user_id: int, connection: WebSocket
+        self,
+        chat_id: int,
+        user_id: int,
+        connection: WebSocket,
+        last_seen_id: Optional[int] = None,
     ) -> None:
-        chat = await self._chat_repository.get_chat(chat_id)
+        async with self._repositories() as repos:
+            chat = await repos.chat.get_chat(chat_id)
 
         if user_id not in chat.members_ids:
             raise NotMemberError
 
         await connection.accept()
 
-        self._connection_storage.add_user_connection(chat_id, user_id, connection)
-
-        fresh_messages = self._connection_storage.get_fresh_messages(chat_id, user_id)
+        writer = self._connection_storage.add_user_connection(chat_id, user_id, connection)
+        try:
+            await self._fanout_bus.user_connected(chat_id, user_id)
 
-        msg_hist = await self._message_repository.get_message_history(chat_id=chat_id)
+            async with self._repositories() as repos:
+                deliveries = await repos.outbox.pop_deliveries(chat_id, user_id)
+                replay, truncated = await self._get_replay(repos, chat_id, last_seen_id)
+            if truncated:
+                writer.put_text(FrameDTO.for_notice(REPLAY_TRUNCATED_TEXT).dump())
+            # Every pending message is sent, the replay limit aside, and the writer
+            # returns them to the outbox if they never are
+            replay = sorted(
+                replay + self._missed_by_replay(replay, deliveries, last_seen_id),
+                key=lambda message: (message.timestamp, message.id),
+            )
+            pending = {
+                delivery.message.id: delivery for delivery in deliveries if not delivery.receipt
+            }
+            confirmations = []
+            for msg in replay:
+                delivery = pending.pop(msg.id, None)
+                if delivery is None:
+                    writer.put_text(FrameDTO.for_message(msg).dump())
+                else:
+                    confirmation = SendConfirmation()
+                    writer.put_text(delivery.frame, delivery, confirmation)
+                    confirmations.append((delivery, confirmation))
 
-        for msg in msg_hist.items:
-            if msg.id not in fresh_messages:
-                await connection.send_text(msg.text)
+            # What is left pending the client had up to last_seen_id
+            background_tasks.spawn(
+                self._acknowledge_sent(chat_id, confirmations, list(pending.values()))
+            )
+            for delivery in deliveries:
+                if delivery.receipt:
+                    writer.put_text(delivery.frame, delivery)
 
-        await self._chat_processing(chat_id, user_id, connection)
+            await self._chat_processing(chat_id, user_id, writer)
+        finally:
+            # Whatever ended the connection, its writer and presence must not outlive it
+            await self.disconnect_from_chat(chat_id, user_id, connection)
 
-    async def disconnect_from_chat(self, chat_id: int, user_id: int) -> None:
-        self._connection_storage.remove_user_connection(chat_id, user_id)
+    async def disconnect_from_chat(
+        self,
+        chat_id: int,
+        user_id: int,
+        connection: Optional[AsyncConnectionProtocol] = None,
+    ) -> None:
+        if self._connection_storage.remove_user_connection(chat_id, user_id, connection):
+            await self._fanout_bus.user_disconnected(chat_id, user_id)
 
     async def sync_persistent_and_memory_chat_storage(self) -> None:
-        ids = await self._chat_repository.get_all_chats_ids()
-        for chat_id in ids:
-            self._connection_storage.create_chat(chat_id)
+        # Chat state is created on connect, only the state of chats gone
+        # from the database is left to drop
+        stale_ids = set(self._connection_storage.get_chat_ids())
+        async with self._repositories() as repos:
+            async for ids in repos.chat.iter_chat_ids():
+                stale_ids.difference_update(ids)
+                if not stale_ids:
+                    return
+        for chat_id in stale_ids:
+            for user_id in self._connection_storage.drop_chat(chat_id):
+                await self._fanout_bus.user_disconnected(chat_id, user_id)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Protocol, Iterable, Optional
+from typing import Any, MutableMapping, Protocol, Iterable, Optional
 
 from src.core.schemas.chat import ChatDTO, ChatType
 
@@ -7,8 +7,12 @@ from src.core.schemas.chat import ChatDTO, ChatType
 class AsyncConnectionProtocol(Protocol):
     async def send_text(self, data: str) -> None: ...
 
+    async def send(self, message: MutableMapping[str, Any]) -> None: ...
+
     async def receive_text(self) -> str: ...
 
+    async def receive(self) -> MutableMapping[str, Any]: ...
+
     async def accept(
         self,
         subprotocol: Optional[str] = None,
@@ -21,11 +25,20 @@ class ChatManagerInterface(ABC):
 
     @abstractmethod
     async def connect_to_chat(
-        self, chat_id: int, user_id: int, connection: AsyncConnectionProtocol
+        self,
+        chat_id: int,
+        user_id: int,
+        connection: AsyncConnectionProtocol,
+        last_seen_id: Optional[int] = None,
     ) -> None: ...
 
     @abstractmethod
-    async def disconnect_from_chat(self, chat_id: int, user_id: int) -> None: ...
+    async def disconnect_from_chat(
+        self,
+        chat_id: int,
+        user_id: int,
+        connection: Optional[AsyncConnectionProtocol] = None,
+    ) -> None: ...
 
     @abstractmethod
     async def create_chat(
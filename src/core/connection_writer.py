@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Optional
+
+from fastapi.websockets import WebSocketDisconnect
+
+from src.core.background import background_tasks
+from src.core.chat_manager.interface import AsyncConnectionProtocol
+from src.core.metrics import message_stage_seconds
+from src.core.schemas.delivery import DeliveryDTO
+from src.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Try Again Later
+OVERFLOW_CLOSE_CODE = 1013
+# Service Restart, the client is expected to reconnect
+RESTART_CLOSE_CODE = 1012
+# Normal Closure, the chat is deleted and there is nothing to reconnect to
+CHAT_GONE_CLOSE_CODE = 1000
+CLOSE_TIMEOUT_SEC = 1
+
+Frame = dict[str, Any]
+LostFramesHandler = Callable[[int, int, list[DeliveryDTO]], Awaitable[None]]
+
+
+class OverflowPolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest"
+    DISCONNECT = "disconnect"
+    SPILL = "spill"
+
+
+class SendConfirmation:
+    """Settles once every frame it was tracked for is sent or lost."""
+
+    __slots__ = ("_pending", "_settled", "all_sent")
+
+    def __init__(self) -> None:
+        self._pending = 0
+        self._settled: Optional[asyncio.Event] = None
+        self.all_sent = True
+
+    def track(self) -> None:
+        self._pending += 1
+
+    def settle(self, sent: bool) -> None:
+        self.all_sent = self.all_sent and sent
+        self._pending -= 1
+        if not self._pending and self._settled is not None:
+            self._settled.set()
+
+    async def wait(self) -> bool:
+        """Whether every tracked frame was sent."""
+        if self._pending:
+            if self._settled is None:
+                self._settled = asyncio.Event()
+            await self._settled.wait()
+        return self.all_sent
+
+
+class _QueuedFrame:
+    __slots__ = ("frame", "delivery", "confirmation", "queued_at")
+
+    def __init__(
+        self,
+        frame: Frame,
+        delivery: Optional[DeliveryDTO],
+        confirmation: Optional[SendConfirmation],
+    ) -> None:
+        self.frame = frame
+        # What to put back to the outbox if the frame is never sent
+        self.delivery = delivery
+        self.confirmation = confirmation
+        if confirmation is not None:
+            confirmation.track()
+        self.queued_at = time.perf_counter()
+
+    def settle(self, sent: bool) -> None:
+        if self.confirmation is not None:
+            self.confirmation.settle(sent)
+
+
+class ConnectionWriter:
+    """Sends frames to one websocket in order through a bounded queue.
+
+    The writing task lives only while there are frames queued. On overflow the
+    oldest frame is dropped and handed to lost_frames_handler, or the socket
+    is closed and, for the spill policy, unsent frames are handed over. Frames
+    left unsent after the socket fails or the member leaves are handed over too.
+    A SendConfirmation given with a frame learns whether it was sent.
+    """
+
+    __slots__ = (
+        "chat_id",
+        "user_id",
+        "connection",
+        "_max_queue_size",
+        "_overflow_policy",
+        "_lost_frames_handler",
+        "_queue",
+        "_task",
+        "_sending",
+        "closed",
+        "_keep_lost_frames",
+        "sent",
+        "dropped",
+        "max_depth",
+        "last_seen",
+    )
+
+    def __init__(
+        self,
+        chat_id: int,
+        user_id: int,
+        connection: AsyncConnectionProtocol,
+        max_queue_size: int,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DISCONNECT,
+        lost_frames_handler: Optional[LostFramesHandler] = None,
+    ) -> None:
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.connection = connection
+        self._max_queue_size = max_queue_size
+        self._overflow_policy = overflow_policy
+        self._lost_frames_handler = lost_frames_handler
+        # Allocated only while there is something to send, most connections idle
+        self._queue: Optional[Deque[_QueuedFrame]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sending: Optional[_QueuedFrame] = None
+        self.closed = False
+        # Unset once frames are dropped for the client to catch up through the replay
+        self._keep_lost_frames = True
+        self.sent = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.last_seen = 0.0
+
+    @property
+    def depth(self) -> int:
+        return (len(self._queue) if self._queue else 0) + (self._sending is not None)
+
+    def put(
+        self,
+        frame: Frame,
+        delivery: Optional[DeliveryDTO] = None,
+        confirmation: Optional[SendConfirmation] = None,
+    ) -> bool:
+        queued = _QueuedFrame(frame, delivery, confirmation)
+        if self.closed:
+            self._lose([queued])
+            return False
+        if self._queue is None:
+            self._queue = deque()
+        elif len(self._queue) >= self._max_queue_size:
+            if self._overflow_policy != OverflowPolicy.DROP_OLDEST:
+                logger.warning(f"Send queue of user {self.user_id} in chat {self.chat_id} overflowed")
+                self._abandon(
+                    queued,
+                    close_code=OVERFLOW_CLOSE_CODE,
+                    keep_lost_frames=self._overflow_policy == OverflowPolicy.SPILL,
+                )
+                return False
+            # Dropped from the socket, not from the chat: its delivery goes back to the outbox
+            self._lose([self._queue.popleft()])
+            self.dropped += 1
+
+        self._queue.append(queued)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+        return True
+
+    def put_text(
+        self,
+        text: str,
+        delivery: Optional[DeliveryDTO] = None,
+        confirmation: Optional[SendConfirmation] = None,
+    ) -> bool:
+        return self.put({"type": "websocket.send", "text": text}, delivery, confirmation)
+
+    def touch(self) -> None:
+        self.last_seen = time.monotonic()
+
+    def close(self) -> None:
+        """Stop writing, the member is gone."""
+        if not self.closed:
+            self._abandon()
+
+    def evict(self, close_code: int, keep_lost_frames: bool = True) -> None:
+        """Close the socket with close_code, unsent frames are handed over unless not kept."""
+        if not self.closed:
+            self._abandon(close_code=close_code, keep_lost_frames=keep_lost_frames)
+
+    def get_stats(self) -> dict[str, int]:
+        # Counts only, who is connected to which chat is not for monitoring
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+    async def _drain(self) -> None:
+        try:
+            while self._queue:
+                # Kept aside while being sent, so it isn't lost if the socket fails
+                self._sending = self._queue.popleft()
+                await self.connection.send(self._sending.frame)
+                if self._sending.delivery is not None:
+                    sent_at = time.perf_counter()
+                    message_stage_seconds.observe(sent_at - self._sending.queued_at, "deliver")
+                    tracer.add_span(
+                        self._sending.delivery.message.id,
+                        "send",
+                        self._sending.queued_at,
+                        sent_at,
+                        user_id=self.user_id,
+                    )
+                self._sending.settle(True)
+                self._sending = None
+                self.sent += 1
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            self._task = None
+            self._abandon()
+        finally:
+            self._task = None
+            if not self._queue:
+                self._queue = None
+
+    def _abandon(
+        self,
+        overflowed: Optional[_QueuedFrame] = None,
+        close_code: Optional[int] = None,
+        keep_lost_frames: bool = True,
+    ) -> None:
+        self.closed = True
+        self._keep_lost_frames = keep_lost_frames
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        unsent = list(self._queue or ())
+        if self._sending is not None:
+            unsent.insert(0, self._sending)
+            self._sending = None
+        self._queue = None
+        if overflowed is not None:
+            unsent.append(overflowed)
+        if close_code is not None:
+            background_tasks.spawn(self._close(close_code))
+        self._lose(unsent)
+
+    def _lose(self, unsent: list[_QueuedFrame]) -> None:
+        for queued in unsent:
+            queued.settle(False)
+        if not self._keep_lost_frames:
+            self.dropped += len(unsent)
+            return
+        deliveries = [queued.delivery for queued in unsent if queued.delivery is not None]
+        if deliveries and self._lost_frames_handler is not None:
+            background_tasks.spawn(self._hand_over(deliveries))
+
+    async def _hand_over(self, deliveries: list[DeliveryDTO]) -> None:
+        try:
+            await self._lost_frames_handler(self.chat_id, self.user_id, deliveries)
+        except Exception:
+            logger.exception(f"Lost {len(deliveries)} frames of user {self.user_id} in chat {self.chat_id}")
+
+    async def _close(self, code: int) -> None:
+        try:
+            await asyncio.wait_for(
+                self.connection.send({"type": "websocket.close", "code": code, "reason": ""}),
+                timeout=CLOSE_TIMEOUT_SEC,
+            )
+        except (WebSocketDisconnect, RuntimeError, OSError, asyncio.TimeoutError):
+            pass
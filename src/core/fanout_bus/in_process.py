@@ -0,0 +1,39 @@
+from typing import Optional
+
+from src.core.connection_writer import SendConfirmation
+from src.core.fanout_bus.interface import EventHandler, FanoutBusInterface
+from src.core.schemas.delivery import FanoutEvent
+from src.core.storage import ConnectionStorage
+
+
+class InProcessFanoutBus(FanoutBusInterface):
+    """Single worker bus, events go straight to the local handler."""
+
+    def __init__(self, connection_storage: ConnectionStorage) -> None:
+        self._connection_storage = connection_storage
+        self._handler: Optional[EventHandler] = None
+
+    async def start(self, handler: EventHandler) -> None:
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    async def publish(self, event: FanoutEvent) -> None:
+        if self._handler is not None:
+            await self._handler(event, None)
+
+    async def deliver(self, event: FanoutEvent) -> SendConfirmation:
+        confirmation = SendConfirmation()
+        if self._handler is not None:
+            await self._handler(event, confirmation)
+        return confirmation
+
+    def is_online(self, chat_id: int, user_id: int) -> bool:
+        return self._connection_storage.is_connected(chat_id, user_id)
+
+    async def user_connected(self, chat_id: int, user_id: int) -> None:
+        pass
+
+    async def user_disconnected(self, chat_id: int, user_id: int) -> None:
+        pass
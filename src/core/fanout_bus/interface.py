@@ -0,0 +1,40 @@
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional
+
+from src.core.connection_writer import SendConfirmation
+from src.core.schemas.delivery import FanoutEvent
+
+EventHandler = Callable[[FanoutEvent, Optional[SendConfirmation]], Awaitable[None]]
+
+
+class FanoutBusInterface(ABC):
+    """Spreads chat events to every worker and tracks which members are connected anywhere."""
+
+    @abstractmethod
+    async def start(self, handler: EventHandler) -> None: ...
+
+    @abstractmethod
+    async def stop(self) -> None: ...
+
+    @abstractmethod
+    async def publish(self, event: FanoutEvent) -> None:
+        """Hand the event to the handler of every worker, this one included."""
+
+    @abstractmethod
+    async def deliver(self, event: FanoutEvent) -> SendConfirmation:
+        """Publish the event, the confirmation settles once every worker sent or lost its frames."""
+
+    @abstractmethod
+    def is_online(self, chat_id: int, user_id: int) -> bool: ...
+
+    @abstractmethod
+    async def user_connected(self, chat_id: int, user_id: int) -> None: ...
+
+    @abstractmethod
+    async def user_disconnected(self, chat_id: int, user_id: int) -> None: ...
+
+    def chat_changed(self, chat_id: int) -> None:
+        """Tell other workers that members of the chat changed."""
+
+    def get_stats(self) -> dict[str, int]:
+        return {}
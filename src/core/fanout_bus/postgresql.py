@@ -0,0 +1,355 @@
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+import asyncpg
+
+from src.core.background import background_tasks
+from src.core.connection_writer import SendConfirmation
+from src.core.fanout_bus.interface import EventHandler, FanoutBusInterface
+from src.core.schemas.delivery import FanoutEvent
+from src.core.schemas.message import MessageDTO
+from src.core.storage import ConnectionStorage
+from src.data.message_repo.exception import MessageNotFound
+
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes and longer
+NOTIFY_PAYLOAD_LIMIT = 7900
+SNAPSHOT_CHUNK_SIZE = 250
+PUBLISH_BATCH_SIZE = 256
+# Workers silent for this many heartbeat intervals are considered gone
+HEARTBEAT_MISSES = 3
+
+MessageLoader = Callable[[int], Awaitable[MessageDTO]]
+
+
+class _PendingAck:
+    __slots__ = ("workers", "confirmation", "timer")
+
+    def __init__(
+        self,
+        workers: set[str],
+        confirmation: SendConfirmation,
+        timer: asyncio.TimerHandle,
+    ) -> None:
+        self.workers = workers
+        self.confirmation = confirmation
+        self.timer = timer
+
+
+class PostgresFanoutBus(FanoutBusInterface):
+    """Fan-out between workers over Postgres LISTEN/NOTIFY.
+
+    Each worker announces members connected to it, so presence is known across
+    workers. Events too large for a NOTIFY travel as a message id and are
+    loaded back with message_loader. Chats changed on another worker are
+    passed to on_chat_changed. Delivered events are acknowledged by every
+    worker once its frames are sent or lost, a worker silent for
+    ack_timeout_sec counts as having lost them.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        connection_storage: ConnectionStorage,
+        message_loader: MessageLoader,
+        channel: str = "chat_fanout",
+        heartbeat_interval_sec: float = 5,
+        ack_timeout_sec: float = 30,
+        on_reconnect: Optional[Callable[[], None]] = None,
+        on_chat_changed: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        self._dsn = dsn
+        self._connection_storage = connection_storage
+        self._message_loader = message_loader
+        self._channel = channel
+        self._heartbeat_interval_sec = heartbeat_interval_sec
+        self._ack_timeout_sec = ack_timeout_sec
+        self._on_reconnect = on_reconnect
+        self._on_chat_changed = on_chat_changed
+        self._worker_id = uuid.uuid4().hex
+        self._handler: Optional[EventHandler] = None
+        self._connection: Optional[asyncpg.Connection] = None
+        self._outgoing: asyncio.Queue[str] = asyncio.Queue()
+        self._incoming: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        # {worker_id: {(chat_id, user_id)}}
+        self._remote_members: dict[str, set[tuple[int, int]]] = {}
+        self._last_seen: dict[str, float] = {}
+        self._ack_ids = itertools.count()
+        self._pending_acks: dict[int, _PendingAck] = {}
+        self.published = 0
+        self.received = 0
+
+    async def start(self, handler: EventHandler) -> None:
+        self._handler = handler
+        await self._connect()
+        self._tasks = [
+            asyncio.create_task(self._publish_loop()),
+            asyncio.create_task(self._dispatch_loop()),
+            asyncio.create_task(self._heartbeat_loop()),
+        ]
+        self._notify({"type": "hello"})
+
+    async def stop(self) -> None:
+        self._notify({"type": "bye"})
+        # Let the publisher flush what is queued, "bye" included
+        try:
+            await asyncio.wait_for(self._outgoing.join(), timeout=self._heartbeat_interval_sec)
+        except asyncio.TimeoutError:
+            logger.warning(f"Fan-out bus stopped with {self._outgoing.qsize()} events unsent")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        self._fail_acks()
+        self._handler = None
+
+    async def publish(self, event: FanoutEvent) -> None:
+        self._outgoing.put_nowait(self._encode_event(event))
+        if self._handler is not None:
+            await self._handler(event, None)
+
+    async def deliver(self, event: FanoutEvent) -> SendConfirmation:
+        confirmation = SendConfirmation()
+        workers = set(self._last_seen)
+        ack_id = None
+        if workers:
+            ack_id = next(self._ack_ids)
+            for _ in workers:
+                confirmation.track()
+            timer = asyncio.get_running_loop().call_later(
+                self._ack_timeout_sec, self._fail_ack, ack_id
+            )
+            self._pending_acks[ack_id] = _PendingAck(workers, confirmation, timer)
+        self._outgoing.put_nowait(self._encode_event(event, ack_id))
+        if self._handler is not None:
+            await self._handler(event, confirmation)
+        return confirmation
+
+    def is_online(self, chat_id: int, user_id: int) -> bool:
+        if self._connection_storage.is_connected(chat_id, user_id):
+            return True
+        member = (chat_id, user_id)
+        return any(member in members for members in self._remote_members.values())
+
+    async def user_connected(self, chat_id: int, user_id: int) -> None:
+        self._notify({"type": "presence", "chat_id": chat_id, "user_id": user_id, "online": True})
+
+    async def user_disconnected(self, chat_id: int, user_id: int) -> None:
+        self._notify({"type": "presence", "chat_id": chat_id, "user_id": user_id, "online": False})
+
+    def chat_changed(self, chat_id: int) -> None:
+        self._notify({"type": "chat_changed", "chat_id": chat_id})
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "workers": len(self._remote_members) + 1,
+            "remote_members": sum(len(members) for members in self._remote_members.values()),
+            "published": self.published,
+            "received": self.received,
+            "queued": self._outgoing.qsize(),
+            "pending_acks": len(self._pending_acks),
+        }
+
+    def _notify(self, data: dict[str, Any]) -> None:
+        self._outgoing.put_nowait(json.dumps({"worker": self._worker_id, **data}))
+
+    def _encode_event(self, event: FanoutEvent, ack_id: Optional[int] = None) -> str:
+        payload = json.dumps(
+            {
+                "worker": self._worker_id,
+                "type": "event",
+                "event": event.model_dump(mode="json"),
+                "ack": ack_id,
+            }
+        )
+        if len(payload.encode()) < NOTIFY_PAYLOAD_LIMIT:
+            return payload
+        return json.dumps(
+            {
+                "worker": self._worker_id,
+                "type": "event_ref",
+                "message_id": event.message.id,
+                "receipt": event.receipt,
+                "user_id": event.user_id,
+                "ack": ack_id,
+            }
+        )
+
+    async def _connect(self) -> None:
+        self._connection = await asyncpg.connect(self._dsn)
+        await self._connection.add_listener(self._channel, self._on_notification)
+
+    async def _reconnect(self) -> None:
+        if self._connection is not None:
+            self._connection.terminate()
+        while True:
+            try:
+                await self._connect()
+                break
+            except (OSError, asyncpg.PostgresError):
+                logger.warning("Fan-out bus reconnect failed, retrying")
+                await asyncio.sleep(self._heartbeat_interval_sec)
+
+        # Notifications sent while disconnected are lost
+        self._remote_members.clear()
+        self._last_seen.clear()
+        self._fail_acks()
+        if self._on_reconnect is not None:
+            self._on_reconnect()
+        self._notify({"type": "hello"})
+        self._send_snapshot()
+
+    async def _publish_loop(self) -> None:
+        while True:
+            payloads = [await self._outgoing.get()]
+            while not self._outgoing.empty() and len(payloads) < PUBLISH_BATCH_SIZE:
+                payloads.append(self._outgoing.get_nowait())
+            while True:
+                try:
+                    # Sent over the listening connection, so workers see them in order
+                    await self._connection.executemany(
+                        "SELECT pg_notify($1, $2)",
+                        [(self._channel, payload) for payload in payloads],
+                    )
+                    break
+                except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                    logger.exception("Fan-out bus publish failed, reconnecting")
+                    await self._reconnect()
+            self.published += len(payloads)
+            for _ in payloads:
+                self._outgoing.task_done()
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            data = await self._incoming.get()
+            confirmation = None if data.get("ack") is None else SendConfirmation()
+            try:
+                if data["type"] == "event":
+                    event = FanoutEvent.model_validate(data["event"])
+                else:
+                    event = FanoutEvent(
+                        message=await self._message_loader(data["message_id"]),
+                        receipt=data["receipt"],
+                        user_id=data["user_id"],
+                    )
+                await self._handler(event, confirmation)
+            except MessageNotFound:
+                logger.warning(f"Message {data.get('message_id')} of a fan-out event is gone, skipped")
+                self._fail_confirmation(confirmation)
+            except Exception:
+                logger.exception("Fan-out event handling failed")
+                self._fail_confirmation(confirmation)
+            if confirmation is not None:
+                background_tasks.spawn(self._acknowledge(data, confirmation))
+
+    async def _acknowledge(self, data: dict[str, Any], confirmation: SendConfirmation) -> None:
+        sent = await confirmation.wait()
+        self._notify({"type": "ack", "target": data["worker"], "ack": data["ack"], "sent": sent})
+
+    @staticmethod
+    def _fail_confirmation(confirmation: Optional[SendConfirmation]) -> None:
+        if confirmation is not None:
+            confirmation.track()
+            confirmation.settle(False)
+
+    def _settle_ack(self, ack_id: int, worker_id: str, sent: bool) -> None:
+        pending = self._pending_acks.get(ack_id)
+        if pending is None or worker_id not in pending.workers:
+            return
+        pending.workers.discard(worker_id)
+        pending.confirmation.settle(sent)
+        if not pending.workers:
+            pending.timer.cancel()
+            del self._pending_acks[ack_id]
+
+    def _fail_ack(self, ack_id: int) -> None:
+        pending = self._pending_acks.get(ack_id)
+        if pending is not None:
+            logger.warning(f"Fan-out workers {sorted(pending.workers)} didn't acknowledge event {ack_id}")
+            for worker_id in list(pending.workers):
+                self._settle_ack(ack_id, worker_id, False)
+
+    def _fail_acks(self, worker_id: Optional[str] = None) -> None:
+        """Fail acknowledgements still expected from worker_id, or from everyone."""
+        for ack_id, pending in list(self._pending_acks.items()):
+            for pending_worker_id in list(pending.workers):
+                if worker_id in (None, pending_worker_id):
+                    self._settle_ack(ack_id, pending_worker_id, False)
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_interval_sec)
+            self._notify({"type": "heartbeat"})
+            deadline = time.monotonic() - self._heartbeat_interval_sec * HEARTBEAT_MISSES
+            for worker_id, last_seen in list(self._last_seen.items()):
+                if last_seen < deadline:
+                    logger.warning(f"Fan-out worker {worker_id} stopped responding")
+                    self._forget(worker_id)
+
+    def _send_snapshot(self) -> None:
+        members = self._connection_storage.get_members()
+        for start in range(0, max(len(members), 1), SNAPSHOT_CHUNK_SIZE):
+            self._notify(
+                {
+                    "type": "snapshot",
+                    "reset": start == 0,
+                    "members": members[start:start + SNAPSHOT_CHUNK_SIZE],
+                }
+            )
+
+    def _forget(self, worker_id: str) -> None:
+        self._remote_members.pop(worker_id, None)
+        self._last_seen.pop(worker_id, None)
+        # Whatever it had queued is lost or handed back to the outbox
+        self._fail_acks(worker_id)
+
+    def _on_notification(
+        self, connection: Any, pid: int, channel: str, payload: str
+    ) -> None:
+        data = json.loads(payload)
+        worker_id = data["worker"]
+        if worker_id == self._worker_id:
+            return
+        self.received += 1
+        message_type = data["type"]
+
+        if message_type == "bye":
+            self._forget(worker_id)
+            return
+        if worker_id not in self._last_seen and message_type not in ("hello", "snapshot"):
+            # Joined or came back unnoticed, ask for its members
+            self._notify({"type": "hello", "target": worker_id})
+        self._last_seen[worker_id] = time.monotonic()
+        members = self._remote_members.setdefault(worker_id, set())
+
+        if message_type in ("event", "event_ref"):
+            self._incoming.put_nowait(data)
+        elif message_type == "presence":
+            member = (data["chat_id"], data["user_id"])
+            if data["online"]:
+                members.add(member)
+            else:
+                members.discard(member)
+        elif message_type == "ack":
+            if data["target"] == self._worker_id:
+                self._settle_ack(data["ack"], worker_id, data["sent"])
+        elif message_type == "chat_changed":
+            if self._on_chat_changed is not None:
+                self._on_chat_changed(data["chat_id"])
+        elif message_type == "hello":
+            if data.get("target") in (None, self._worker_id):
+                self._send_snapshot()
+        elif message_type == "snapshot":
+            if data["reset"]:
+                members.clear()
+            members.update((chat_id, user_id) for chat_id, user_id in data["members"])
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Optional
+
+from src.core.background import background_tasks
+from src.core.connection_writer import ConnectionWriter
+
+logger = logging.getLogger(__name__)
+
+# Answered by the client with any frame; binary so it never reads as a chat message
+PING_FRAME = {"type": "websocket.send", "bytes": b""}
+# Going Away
+EVICTION_CLOSE_CODE = 1001
+
+EvictionHandler = Callable[[ConnectionWriter], Awaitable[None]]
+
+
+class HeartbeatSweeper:
+    """Pings connections silent for interval_sec and evicts those silent for interval_sec + timeout_sec.
+
+    One task sweeps a timer wheel of tick_sec slots. Activity only moves the
+    writer's last_seen, a writer is rescheduled when its slot comes due.
+    """
+
+    def __init__(
+        self,
+        interval_sec: float,
+        timeout_sec: float,
+        on_evict: Optional[EvictionHandler] = None,
+        tick_sec: float = 1,
+    ) -> None:
+        self._interval_sec = interval_sec
+        self._timeout_sec = timeout_sec
+        self._on_evict = on_evict
+        self._tick_sec = tick_sec
+        self._wheel: list[set[ConnectionWriter]] = [
+            set() for _ in range(math.ceil((interval_sec + timeout_sec) / tick_sec) + 2)
+        ]
+        self._position = 0
+        self._task: Optional[asyncio.Task] = None
+        self.pings = 0
+        self.evictions = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def track(self, writer: ConnectionWriter) -> None:
+        writer.touch()
+        self._schedule(writer, self._interval_sec)
+
+    def sweep(self) -> None:
+        self._position = (self._position + 1) % len(self._wheel)
+        due, self._wheel[self._position] = self._wheel[self._position], set()
+        now = time.monotonic()
+        for writer in due:
+            if writer.closed:
+                continue
+            silent_sec = now - writer.last_seen
+            if silent_sec >= self._interval_sec + self._timeout_sec:
+                self._evict(writer)
+            elif silent_sec >= self._interval_sec:
+                writer.put(PING_FRAME)
+                self.pings += 1
+                self._schedule(writer, self._interval_sec + self._timeout_sec - silent_sec)
+            else:
+                self._schedule(writer, self._interval_sec - silent_sec)
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "tracked": sum(len(slot) for slot in self._wheel),
+            "pings": self.pings,
+            "evictions": self.evictions,
+        }
+
+    def _schedule(self, writer: ConnectionWriter, delay_sec: float) -> None:
+        ticks = min(max(math.ceil(delay_sec / self._tick_sec), 1), len(self._wheel) - 1)
+        self._wheel[(self._position + ticks) % len(self._wheel)].add(writer)
+
+    def _evict(self, writer: ConnectionWriter) -> None:
+        logger.info(f"Evicting silent connection of user {writer.user_id} in chat {writer.chat_id}")
+        self.evictions += 1
+        writer.evict(EVICTION_CLOSE_CODE)
+        if self._on_evict is not None:
+            background_tasks.spawn(self._on_evict(writer))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._tick_sec)
+            self.sweep()
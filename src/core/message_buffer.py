@@ -0,0 +1,126 @@
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Deque, Optional
+
+from src.core.schemas.message import MessageDTO
+from src.settings import settings
+
+
+def _position(message: MessageDTO) -> tuple[int, int]:
+    return message.timestamp, message.id
+
+
+class _ChatMessages:
+    # Holds every message of the chat ordered not earlier than messages[0],
+    # and the whole chat history when complete is set
+    __slots__ = ("messages", "complete")
+
+    def __init__(self, messages: Deque[MessageDTO], complete: bool) -> None:
+        self.messages = messages
+        self.complete = complete
+
+
+class RecentMessagesBuffer:
+    """Bounded tails of recent messages per chat, least recently used chats are evicted first."""
+
+    def __init__(self, depth: int, max_messages: int) -> None:
+        self._depth = depth
+        self._max_messages = max_messages
+        self._chats: OrderedDict[int, _ChatMessages] = OrderedDict()
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+
+    def append(self, message: MessageDTO) -> None:
+        if self._depth <= 0:
+            return
+        chat = self._chats.get(message.chat_id)
+        if chat is None:
+            chat = self._chats[message.chat_id] = _ChatMessages(deque(), False)
+        self._chats.move_to_end(message.chat_id)
+        self._insert(chat, message)
+        self._evict()
+
+    def seed(self, chat_id: int, messages: list[MessageDTO], complete: bool) -> None:
+        """Remember the tail of the chat read from the database."""
+        if self._depth <= 0 or chat_id in self._chats:
+            return
+        tail = messages[-self._depth:]
+        self._chats[chat_id] = _ChatMessages(
+            deque(tail), complete and len(tail) == len(messages)
+        )
+        self._total += len(tail)
+        self._evict()
+
+    def get_latest(
+        self, chat_id: int, limit: int, after_id: Optional[int] = None
+    ) -> Optional[list[MessageDTO]]:
+        """Newest messages (after after_id if given) or None when the buffer can't vouch for them."""
+        chat = self._chats.get(chat_id)
+        result = None
+        if chat is not None and after_id is not None:
+            for index in range(len(chat.messages) - 1, -1, -1):
+                if chat.messages[index].id == after_id:
+                    start = max(index + 1, len(chat.messages) - limit)
+                    result = list(islice(chat.messages, start, None))
+                    break
+        elif chat is not None and (len(chat.messages) >= limit or chat.complete):
+            result = list(islice(chat.messages, max(len(chat.messages) - limit, 0), None))
+
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._chats.move_to_end(chat_id)
+        return result
+
+    def mark_read(self, chat_id: int, message_id: int) -> None:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            return
+        for message in reversed(chat.messages):
+            if message.id == message_id:
+                message.read = True
+                return
+
+    def clear(self) -> None:
+        self._chats.clear()
+        self._total = 0
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "chats": len(self._chats),
+            "messages": self._total,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _insert(self, chat: _ChatMessages, message: MessageDTO) -> None:
+        messages = chat.messages
+        position = _position(message)
+        if not messages or position > _position(messages[-1]):
+            messages.append(message)
+        else:
+            positions = [_position(buffered) for buffered in messages]
+            index = bisect_left(positions, position)
+            if index < len(positions) and positions[index] == position:
+                return
+            if index == 0 and not chat.complete:
+                return  # Older than anything the buffer can vouch for
+            messages.insert(index, message)
+        self._total += 1
+        if len(messages) > self._depth:
+            messages.popleft()
+            chat.complete = False
+            self._total -= 1
+
+    def _evict(self) -> None:
+        while self._total > self._max_messages and self._chats:
+            _, chat = self._chats.popitem(last=False)
+            self._total -= len(chat.messages)
+
+
+message_buffer = RecentMessagesBuffer(
+    depth=settings.MESSAGE_BUFFER_DEPTH, max_messages=settings.MESSAGE_BUFFER_MAX_MESSAGES
+)
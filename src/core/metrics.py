@@ -0,0 +1,182 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional, Union
+
+# Seconds, from a fast in-memory operation to a slow database query
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+Samples = Iterable[tuple[Labels, float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int) -> None:
+        # Not cumulative, the last one counts values above every bucket
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_started_at")
+
+    def __init__(self, histogram: "Histogram", labels: Labels) -> None:
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> None:
+        self._started_at = time.perf_counter()
+
+    def __exit__(self, *_) -> None:
+        self._histogram.observe(time.perf_counter() - self._started_at, *self._labels)
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._buckets = buckets
+        self._series: dict[Labels, _HistogramSeries] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(len(self._buckets) + 1)
+        series.counts[bisect_left(self._buckets, value)] += 1
+        series.sum += value
+
+    def time(self, *labels: str) -> _Timer:
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self._buckets + (float("inf"),), series.counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.labelnames, labels, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            formatted = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{formatted} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{formatted} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read at scrape time, so nothing is spent on it in between."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Union[float, Samples]],
+        labelnames: Labels = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        samples = self._collect()
+        if not self.labelnames:
+            samples = [((), samples)]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in samples
+        ]
+
+
+Metric = Union[Histogram, Gauge]
+
+
+class MetricsRegistry:
+    """Metrics of this worker in the Prometheus text format.
+
+    Updates are plain attribute arithmetic without locks, they all happen on
+    the event loop thread.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Union[float, Samples]],
+        labelnames: Labels = (),
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, collect, labelnames))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            kind = type(metric).__name__.lower()
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+metrics = MetricsRegistry()
+
+message_stage_seconds = metrics.histogram(
+    "chat_message_stage_seconds",
+    "Time a chat message spends being saved, published to the fan-out bus and waiting in send queues",
+    ("stage",),
+)
+http_request_seconds = metrics.histogram(
+    "http_request_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+db_query_seconds = metrics.histogram(
+    "db_query_seconds", "Latency of repository methods", ("repository", "method")
+)
+db_pool_checkout_wait_seconds = metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool"
+)
@@ -0,0 +1,111 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+from src.settings import settings
+
+THROTTLED_TEXT = "Message was not sent: too many messages, slow down."
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float) -> None:
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class TokenBucketLimiter:
+    """Token bucket per key refilled at rate_per_sec up to burst.
+
+    A bucket left alone long enough to refill is the same as a new one, so such
+    buckets are forgotten. Buckets are kept in order of use, which makes that an
+    amortized O(1) check of the oldest ones.
+    """
+
+    def __init__(self, rate_per_sec: float, burst: int) -> None:
+        self._rate_per_sec = rate_per_sec
+        self._burst = max(burst, 1)
+        self._buckets: OrderedDict[Hashable, _Bucket] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._rate_per_sec > 0
+
+    def acquire(self, key: Hashable) -> bool:
+        if not self.enabled:
+            return True
+        now = time.monotonic()
+        self._expire(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self._burst, now)
+        else:
+            bucket.tokens = min(
+                self._burst, bucket.tokens + (now - bucket.updated_at) * self._rate_per_sec
+            )
+            bucket.updated_at = now
+            self._buckets.move_to_end(key)
+        if bucket.tokens < 1:
+            return False
+        bucket.tokens -= 1
+        return True
+
+    def refund(self, key: Hashable) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.tokens = min(self._burst, bucket.tokens + 1)
+
+    def _expire(self, now: float) -> None:
+        refill_sec = self._burst / self._rate_per_sec
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated_at < refill_sec:
+                return
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class MessageRateLimiter:
+    """Limits inbound messages of every user and of every chat."""
+
+    def __init__(
+        self,
+        user_rate_per_sec: float,
+        user_burst: int,
+        chat_rate_per_sec: float,
+        chat_burst: int,
+    ) -> None:
+        self._users = TokenBucketLimiter(user_rate_per_sec, user_burst)
+        self._chats = TokenBucketLimiter(chat_rate_per_sec, chat_burst)
+        self.throttled_users = 0
+        self.throttled_chats = 0
+
+    def allow(self, chat_id: int, user_id: int) -> bool:
+        if not self._users.acquire(user_id):
+            self.throttled_users += 1
+            return False
+        if not self._chats.acquire(chat_id):
+            # Message is not sent, so it should not cost the user anything
+            self._users.refund(user_id)
+            self.throttled_chats += 1
+            return False
+        return True
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "user_buckets": len(self._users),
+            "chat_buckets": len(self._chats),
+            "throttled_users": self.throttled_users,
+            "throttled_chats": self.throttled_chats,
+        }
+
+
+message_rate_limiter = MessageRateLimiter(
+    user_rate_per_sec=settings.MESSAGE_RATE_PER_USER_SEC,
+    user_burst=settings.MESSAGE_BURST_PER_USER,
+    chat_rate_per_sec=settings.MESSAGE_RATE_PER_CHAT_SEC,
+    chat_burst=settings.MESSAGE_BURST_PER_CHAT,
+)
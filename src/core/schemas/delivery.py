@@ -0,0 +1,22 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from src.core.schemas.frame import FrameDTO
+from src.core.schemas.message import MessageDTO
+
+
+class DeliveryDTO(BaseModel):
+    message: MessageDTO
+    receipt: bool = False
+
+    @property
+    def frame(self) -> str:
+        if self.receipt:
+            return FrameDTO.for_receipt(self.message).dump()
+        return FrameDTO.for_message(self.message).dump()
+
+
+class FanoutEvent(DeliveryDTO):
+    # Delivered to every connection of the chat unless user_id is set
+    user_id: Optional[int] = None
@@ -0,0 +1,44 @@
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+from src.core.schemas.message import MessageDTO
+
+
+class FrameType(str, Enum):
+    MESSAGE = "message"
+    RECEIPT = "receipt"
+    NOTICE = "notice"
+
+
+class FrameDTO(BaseModel):
+    """Text frame sent over a chat websocket.
+
+    id is the id of the message the frame is about, clients remember the
+    largest id of message frames and reconnect with it as last_seen_id.
+    Notices are about no message and carry no id.
+    """
+
+    type: FrameType
+    text: str
+    id: Optional[int] = None
+
+    @classmethod
+    def for_message(cls, message: MessageDTO) -> "FrameDTO":
+        return cls(type=FrameType.MESSAGE, id=message.id, text=message.text)
+
+    @classmethod
+    def for_receipt(cls, message: MessageDTO) -> "FrameDTO":
+        return cls(
+            type=FrameType.RECEIPT,
+            id=message.id,
+            text=f"{message.text}: Message was read by all chat participants.",
+        )
+
+    @classmethod
+    def for_notice(cls, text: str) -> "FrameDTO":
+        return cls(type=FrameType.NOTICE, text=text)
+
+    def dump(self) -> str:
+        return self.model_dump_json(exclude_none=True)
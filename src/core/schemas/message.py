@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -20,4 +22,5 @@ class MessageDTO(BaseModel):
 
 class MessageHistory(BaseModel):
     items: list[MessageDTO]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
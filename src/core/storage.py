@@ -1,44 +1,178 @@
-from typing import Optional, Union, Set
+import heapq
+from typing import Any, Collection, Optional, Union
+
 from src.core.chat_manager.interface import AsyncConnectionProtocol
+from src.core.connection_writer import (
+    CHAT_GONE_CLOSE_CODE,
+    ConnectionWriter,
+    LostFramesHandler,
+    OverflowPolicy,
+)
+from src.core.heartbeat import HeartbeatSweeper
+from src.settings import settings
 
+# A lone writer for the usual single device, a set only for several
+UserConnections = Union[ConnectionWriter, set[ConnectionWriter]]
+
+
+def _writers(user_connections: UserConnections) -> Collection[ConnectionWriter]:
+    if isinstance(user_connections, ConnectionWriter):
+        return (user_connections,)
+    return user_connections
+
+
+class _ChatState:
+    # Freed as soon as the last connection of the chat leaves
+    __slots__ = ("connections",)
 
-class ConnectionStorage:
     def __init__(self) -> None:
-        self._chats: dict[
-            int, dict[int, dict[str, Union[AsyncConnectionProtocol, Set]]]
-        ] = (
-            {}
-        )  # {chat_id: {"connections": {user_id: WebSocketObject}}, "fresh_message_ids": {user_id: set()}}
+        self.connections: dict[int, UserConnections] = {}
 
-    def create_chat(self, chat_id: int) -> None:
-        self._chats[chat_id] = {"connections": {}, "fresh_message_ids": {}}
 
-    def get_chat(self, chat_id: int) -> dict[int, dict[str, Union[AsyncConnectionProtocol, Set]]]:
-        return self._chats[chat_id]
+class ConnectionStorage:
+    def __init__(
+        self,
+        max_queue_size: int = 1000,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DISCONNECT,
+    ) -> None:
+        self._chats: dict[int, _ChatState] = {}
+        self._max_queue_size = max_queue_size
+        self._overflow_policy = overflow_policy
+        self.lost_frames_handler: Optional[LostFramesHandler] = None
+        self.heartbeat: Optional[HeartbeatSweeper] = None
 
     def add_user_connection(
         self, chat_id: int, user_id: int, connection: AsyncConnectionProtocol
-    ) -> None:
-        self._chats[chat_id]["connections"].update({user_id: connection})
-        if user_id not in self._chats[chat_id]["fresh_message_ids"]:
-            self._chats[chat_id]["fresh_message_ids"].update({user_id: set()})
+    ) -> ConnectionWriter:
+        writer = ConnectionWriter(
+            chat_id,
+            user_id,
+            connection,
+            max_queue_size=self._max_queue_size,
+            overflow_policy=self._overflow_policy,
+            lost_frames_handler=self.lost_frames_handler,
+        )
+        if self.heartbeat is not None:
+            self.heartbeat.track(writer)
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _ChatState()
+        current = chat.connections.get(user_id)
+        if current is None:
+            chat.connections[user_id] = writer
+        elif isinstance(current, ConnectionWriter):
+            chat.connections[user_id] = {current, writer}
+        else:
+            current.add(writer)
+        return writer
 
-    def remove_user_connection(self, chat_id: int, user_id: int) -> None:
-        del self._chats[chat_id]["connections"][user_id]
+    def remove_user_connection(
+        self,
+        chat_id: int,
+        user_id: int,
+        connection: Optional[AsyncConnectionProtocol] = None,
+    ) -> bool:
+        """Remove the given connection or every one of the user, tells if none is left."""
+        chat = self._chats.get(chat_id)
+        if chat is None or (current := chat.connections.get(user_id)) is None:
+            return True
+        remaining = set()
+        for writer in _writers(current):
+            if connection is None or writer.connection is connection:
+                writer.close()
+            else:
+                remaining.add(writer)
 
-    def add_fresh_message(self, message_id: int, chat_id: int, user_id: int) -> None:
-        if user_id in self._chats[chat_id]["fresh_message_ids"]:
-            self._chats[chat_id]["fresh_message_ids"][user_id].add(message_id)
-        else:
-            self._chats[chat_id]["fresh_message_ids"].update({user_id: {message_id}})
+        if len(remaining) > 1:
+            chat.connections[user_id] = remaining
+            return False
+        if remaining:
+            chat.connections[user_id] = remaining.pop()
+            return False
+        del chat.connections[user_id]
+        if not chat.connections:
+            del self._chats[chat_id]
+        return True
+
+    def get_user_connections(self, chat_id: int, user_id: int) -> list[ConnectionWriter]:
+        chat = self._chats.get(chat_id)
+        if chat is None or (current := chat.connections.get(user_id)) is None:
+            return []
+        return list(_writers(current))
+
+    def is_connected(self, chat_id: int, user_id: int) -> bool:
+        return any(not writer.closed for writer in self.get_user_connections(chat_id, user_id))
+
+    def get_connections(self, chat_id: int) -> list[ConnectionWriter]:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            return []
+        writers = []
+        for current in chat.connections.values():
+            if isinstance(current, ConnectionWriter):
+                writers.append(current)
+            else:
+                writers.extend(current)
+        return writers
+
+    def get_chat_ids(self) -> list[int]:
+        return list(self._chats)
+
+    def drop_chat(self, chat_id: int) -> list[int]:
+        """Close the sockets of a deleted chat, returns the members that were connected."""
+        chat = self._chats.pop(chat_id, None)
+        if chat is None:
+            return []
+        for current in chat.connections.values():
+            for writer in _writers(current):
+                # The outbox can't take frames of a chat that is gone
+                writer.evict(CHAT_GONE_CLOSE_CODE, keep_lost_frames=False)
+        return list(chat.connections)
+
+    def close_all(self, close_code: int) -> None:
+        for chat_id in list(self._chats):
+            for current in self._chats.pop(chat_id).connections.values():
+                for writer in _writers(current):
+                    writer.evict(close_code)
+
+    def get_members(self) -> list[tuple[int, int]]:
+        return [
+            (chat_id, user_id)
+            for chat_id, chat in self._chats.items()
+            for user_id in chat.connections
+        ]
+
+    def get_stats(self) -> dict[str, int]:
+        writers = self._all_writers()
+        return {
+            "chats": len(self._chats),
+            "connections": len(writers),
+            "queued": sum(writer.depth for writer in writers),
+        }
+
+    def get_chat_connection_counts(self, limit: int) -> list[tuple[int, int]]:
+        """Chats with the most connections and their connection counts."""
+        counts = (
+            (chat_id, sum(len(_writers(current)) for current in chat.connections.values()))
+            for chat_id, chat in self._chats.items()
+        )
+        return heapq.nlargest(limit, counts, key=lambda count: count[1])
 
-    def remover_fresh_message(self, message_id: int, chat_id: int, user_id: int) -> None:
-        self._chats[chat_id]["fresh_message_ids"][user_id].discard(message_id)
-    
-    def get_fresh_messages(self, chat_id: int, user_id: int) -> Set:
-        return self._chats.get(chat_id)["fresh_message_ids"].get(user_id)
+    def get_connection_stats(self, limit: int) -> list[dict[str, Any]]:
+        """Stats of the connections with the deepest send queues."""
+        writers = self._all_writers()
+        writers.sort(key=lambda writer: writer.depth, reverse=True)
+        return [writer.get_stats() for writer in writers[:limit]]
 
-    def get_connection(self, chat_id: int, user_id: int) -> Optional[AsyncConnectionProtocol]:
-        return self._chats.get(chat_id)["connections"].get(user_id)
+    def _all_writers(self) -> list[ConnectionWriter]:
+        return [
+            writer
+            for chat in self._chats.values()
+            for current in chat.connections.values()
+            for writer in _writers(current)
+        ]
 
-connection_storage = ConnectionStorage()
+connection_storage = ConnectionStorage(
+    max_queue_size=settings.SEND_QUEUE_MAX_SIZE,
+    overflow_policy=OverflowPolicy(settings.SEND_QUEUE_OVERFLOW_POLICY),
+)
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "started_at", "ended_at", "attributes")
+
+    def __init__(self, name: str, started_at: float, attributes: dict[str, Any]) -> None:
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        # perf_counter seconds, turned into wall clock time on export
+        self.started_at = started_at
+        self.ended_at = started_at
+        self.attributes = attributes
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.ended_at = time.perf_counter()
+
+
+class Trace:
+    """Spans of one chat message from receiving it to writing it to the sockets."""
+
+    __slots__ = ("trace_id", "root", "spans", "_clock_offset", "_max_spans")
+
+    def __init__(self, name: str, attributes: dict[str, Any], max_spans: int) -> None:
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, time.perf_counter(), attributes)
+        self.spans: list[Span] = []
+        self._clock_offset = time.time() - self.root.started_at
+        self._max_spans = max_spans
+
+    def span(self, name: str, **attributes: Any) -> Span:
+        span = Span(name, time.perf_counter(), attributes)
+        if len(self.spans) < self._max_spans:
+            self.spans.append(span)
+        return span
+
+    def add_span(self, name: str, started_at: float, ended_at: float, **attributes: Any) -> None:
+        if len(self.spans) < self._max_spans:
+            span = Span(name, started_at, attributes)
+            span.ended_at = ended_at
+            self.spans.append(span)
+
+    def end(self) -> None:
+        self.root.ended_at = max([self.root.ended_at, *(span.ended_at for span in self.spans)])
+
+    def unix_nano(self, perf_counter_sec: float) -> int:
+        return int((perf_counter_sec + self._clock_offset) * 1e9)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *_) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def trace_span(trace: Optional[Trace], name: str, **attributes: Any):
+    """Span of the trace, or a no-op for messages which were not sampled."""
+    if trace is None:
+        return _NO_SPAN
+    return trace.span(name, **attributes)
+
+
+class SpanExporter(ABC):
+
+    @abstractmethod
+    def export(self, trace: Trace) -> None: ...
+
+
+class LogSpanExporter(SpanExporter):
+    """One structured log line per trace, durations in milliseconds."""
+
+    def export(self, trace: Trace) -> None:
+        root = trace.root
+        record = {
+            "trace_id": trace.trace_id,
+            "name": root.name,
+            **root.attributes,
+            "duration_ms": round((root.ended_at - root.started_at) * 1000, 3),
+            "spans": [
+                {
+                    "name": span.name,
+                    **span.attributes,
+                    "offset_ms": round((span.started_at - root.started_at) * 1000, 3),
+                    "duration_ms": round((span.ended_at - span.started_at) * 1000, 3),
+                }
+                for span in trace.spans
+            ],
+        }
+        logger.info(json.dumps(record))
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        else:
+            typed = {"stringValue": str(value)}
+        result.append({"key": key, "value": typed})
+    return result
+
+
+class OtlpFileSpanExporter(SpanExporter):
+    """Appends traces to a file as OTLP/JSON export requests, one per line."""
+
+    def __init__(self, path: str, service_name: str) -> None:
+        self._path = path
+        self._resource = {"attributes": _otlp_attributes({"service.name": service_name})}
+
+    def to_otlp(self, trace: Trace) -> dict[str, Any]:
+        root = trace.root
+        spans = [self._span(trace, root, None)]
+        spans.extend(self._span(trace, span, root.span_id) for span in trace.spans)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": self._resource,
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+                }
+            ]
+        }
+
+    def export(self, trace: Trace) -> None:
+        with open(self._path, "a") as file:
+            file.write(json.dumps(self.to_otlp(trace)) + "\n")
+
+    @staticmethod
+    def _span(trace: Trace, span: Span, parent_span_id: Optional[str]) -> dict[str, Any]:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(trace.unix_nano(span.started_at)),
+            "endTimeUnixNano": str(trace.unix_nano(span.ended_at)),
+            "attributes": _otlp_attributes(span.attributes),
+        }
+        if parent_span_id is not None:
+            otlp_span["parentSpanId"] = parent_span_id
+        return otlp_span
+
+
+class Tracer:
+    """Samples chat messages to trace.
+
+    A trace is bound to the message id once the message is saved, so the
+    connection writers can add their send spans. It is exported linger_sec
+    after the fan-out finishes to let those sends land.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float,
+        exporter: SpanExporter,
+        linger_sec: float = 1.0,
+        max_spans: int = 100,
+    ) -> None:
+        self._sample_rate = sample_rate
+        self._exporter = exporter
+        self._linger_sec = linger_sec
+        self._max_spans = max_spans
+        self._traces: dict[int, Trace] = {}
+        self.started = 0
+        self.exported = 0
+
+    def start(self, name: str, **attributes: Any) -> Optional[Trace]:
+        if self._sample_rate <= 0 or random.random() >= self._sample_rate:
+            return None
+        self.started += 1
+        return Trace(name, attributes, self._max_spans)
+
+    def bind(self, message_id: int, trace: Trace) -> None:
+        trace.root.attributes["message_id"] = message_id
+        self._traces[message_id] = trace
+
+    def add_span(
+        self, message_id: int, name: str, started_at: float, ended_at: float, **attributes: Any
+    ) -> None:
+        trace = self._traces.get(message_id)
+        if trace is not None:
+            trace.add_span(name, started_at, ended_at, **attributes)
+
+    def finish(self, trace: Trace) -> None:
+        asyncio.get_running_loop().call_later(self._linger_sec, self._export, trace)
+
+    def _export(self, trace: Trace) -> None:
+        self._traces.pop(trace.root.attributes.get("message_id"), None)
+        trace.end()
+        try:
+            self._exporter.export(trace)
+        except Exception:
+            logger.exception(f"Failed to export trace {trace.trace_id}")
+            return
+        self.exported += 1
+
+    def get_stats(self) -> dict[str, int]:
+        return {"started": self.started, "in_flight": len(self._traces), "exported": self.exported}
+
+
+def _create_exporter() -> SpanExporter:
+    if settings.TRACE_EXPORTER == "otlp_file":
+        return OtlpFileSpanExporter(settings.TRACE_FILE, service_name=settings.TITLE)
+    return LogSpanExporter()
+
+
+tracer = Tracer(
+    sample_rate=settings.TRACE_SAMPLE_RATE,
+    exporter=_create_exporter(),
+    linger_sec=settings.TRACE_LINGER_SEC,
+)
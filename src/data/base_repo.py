@@ -1,7 +1,11 @@
-from typing import Generic, TypeVar
+import functools
+import inspect
+import time
+from typing import Any, Callable, Coroutine, Generic, TypeVar
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.metrics import db_query_seconds
 from src.database.postgresql.connection import (
     ISessionAsyncFactory,
     ISessionAsyncWrapper,
@@ -10,7 +14,28 @@ from src.database.postgresql.connection import (
 _EntityT = TypeVar("_EntityT")
 
 
+def _timed(
+    repository: str, method: str, function: Callable[..., Coroutine[Any, Any, Any]]
+) -> Callable[..., Coroutine[Any, Any, Any]]:
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            db_query_seconds.observe(time.perf_counter() - started_at, repository, method)
+
+    return wrapper
+
+
 class BasePostgresAsyncRepository(Generic[_EntityT]):
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # Public coroutine methods of repositories report their latency
+        for name, attribute in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(attribute):
+                setattr(cls, name, _timed(cls.__name__, name, attribute))
+
     def __init__(self, session: AsyncSession) -> None:
         self._session = session
 
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from src.core.schemas.chat import ChatDTO
+from src.settings import settings
+
+
+def _copy(chat: ChatDTO) -> ChatDTO:
+    return chat.model_copy(update={"members_ids": list(chat.members_ids)})
+
+
+class ChatCache:
+    """Process-local LRU of chats with their members, entries live for ttl_sec.
+
+    Changes of members are spread to other workers through
+    invalidation_handler, which the app points at the fan-out bus.
+    """
+
+    def __init__(self, ttl_sec: float, max_size: int) -> None:
+        self._ttl_sec = ttl_sec
+        self._max_size = max_size
+        self._chats: OrderedDict[int, tuple[float, ChatDTO]] = OrderedDict()
+        # Bumped on every drop, so a read that began before it is not cached after it
+        self._version = 0
+        self.invalidation_handler: Optional[Callable[[int], None]] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, chat_id: int) -> Optional[ChatDTO]:
+        entry = self._chats.get(chat_id)
+        if entry is None or entry[0] < time.monotonic():
+            self._chats.pop(chat_id, None)
+            self.misses += 1
+            return None
+        self._chats.move_to_end(chat_id)
+        self.hits += 1
+        return _copy(entry[1])
+
+    def set(self, chat: ChatDTO, version: Optional[int] = None) -> None:
+        """Cache the chat unless it was dropped since version was taken."""
+        if self._ttl_sec <= 0 or self._max_size <= 0:
+            return
+        if version is not None and version != self._version:
+            return
+        self._chats[chat.id] = (time.monotonic() + self._ttl_sec, _copy(chat))
+        self._chats.move_to_end(chat.id)
+        while len(self._chats) > self._max_size:
+            self._chats.popitem(last=False)
+
+    def invalidate(self, chat_id: int) -> None:
+        """Drop the chat here and on the other workers."""
+        self.drop(chat_id)
+        if self.invalidation_handler is not None:
+            self.invalidation_handler(chat_id)
+
+    def drop(self, chat_id: int) -> None:
+        self._chats.pop(chat_id, None)
+        self._version += 1
+
+    def clear(self) -> None:
+        self._chats.clear()
+        self._version += 1
+
+    def get_stats(self) -> dict[str, int]:
+        return {"size": len(self._chats), "hits": self.hits, "misses": self.misses}
+
+
+chat_cache = ChatCache(
+    ttl_sec=settings.CHAT_CACHE_TTL_SEC, max_size=settings.CHAT_CACHE_MAX_SIZE
+)
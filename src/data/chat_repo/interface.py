@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
 from src.core.schemas.chat import ChatDTO, CreateChatDTO
 
@@ -22,4 +23,5 @@ class ChatRepositoryInterface(ABC):
     ) -> None: ...
 
     @abstractmethod
-    async def get_all_chats_ids(self) -> list[int]: ...
+    def iter_chat_ids(self, chunk_size: int = 10_000) -> AsyncIterator[list[int]]:
+        """Ids of all chats in ascending chunks, without loading whole rows."""
@@ -0,0 +1,79 @@
+import logging
+from typing import AsyncIterator
+
+from src.core.schemas.chat import ChatDTO, ChatType, CreateChatDTO
+from src.data.chat_repo.exception import (
+    ChatNotFound,
+    NotCreatorError,
+    PrivateChatError,
+    UserNotFound,
+)
+from src.data.chat_repo.interface import ChatRepositoryInterface
+from src.data.memory_store import ChatRecord, MemoryStore
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryChatRepository(ChatRepositoryInterface):
+
+    def __init__(self, store: MemoryStore) -> None:
+        self._store = store
+
+    async def create_chat(self, dto: CreateChatDTO) -> ChatDTO:
+        if dto.creator_id not in self._store.users:
+            raise UserNotFound
+        chat = ChatRecord(self._store.next_id("chat"), dto.name, dto.chat_type, dto.creator_id)
+        self._store.chats[chat.id] = chat
+        return self._to_dto(chat)
+
+    async def get_chat(self, chat_id: int) -> ChatDTO:
+        if (chat := self._store.chats.get(chat_id)) is None:
+            raise ChatNotFound
+        return self._to_dto(chat)
+
+    async def iter_chat_ids(self, chunk_size: int = 10_000) -> AsyncIterator[list[int]]:
+        ids = sorted(self._store.chats)
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start:start + chunk_size]
+
+    def _get_chat_and_check_owning(self, user_id: int, chat_id: int) -> ChatRecord:
+        if (chat := self._store.chats.get(chat_id)) is None:
+            logger.warning(f"Chat wiht id {chat_id} not found")
+            raise ChatNotFound
+        if user_id != chat.creator_id:
+            logger.warning(
+                f"User with id {user_id} is not creator of chat with id {chat_id}"
+            )
+            raise NotCreatorError
+        return chat
+
+    async def add_user_to_chat(
+        self, user_id: int, new_user_id: int, chat_id: int
+    ) -> None:
+        chat = self._get_chat_and_check_owning(user_id, chat_id)
+        if len(chat.members_ids) > 1 and chat.chat_type == ChatType.PRIVATE:
+            logger.warning(
+                f"User with id {user_id} tried to add more than 2 users in private chat"
+            )
+            raise PrivateChatError
+        # Unknown users and repeated members break constraints of the database
+        if new_user_id not in self._store.users or new_user_id in chat.members_ids:
+            raise UserNotFound
+        chat.members_ids.append(new_user_id)
+
+    async def remove_user_from_chat(
+        self, user_id: int, remove_user_id: int, chat_id: int
+    ) -> None:
+        chat = self._get_chat_and_check_owning(user_id, chat_id)
+        if remove_user_id in chat.members_ids:
+            chat.members_ids.remove(remove_user_id)
+
+    @staticmethod
+    def _to_dto(chat: ChatRecord) -> ChatDTO:
+        return ChatDTO(
+            id=chat.id,
+            name=chat.name,
+            chat_type=chat.chat_type,
+            creator_id=chat.creator_id,
+            members_ids=list(chat.members_ids),
+        )
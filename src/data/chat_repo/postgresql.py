@@ -1,10 +1,13 @@
 import logging
+from typing import AsyncIterator, Optional
 
 from sqlalchemy import and_, delete, func, select
 from sqlalchemy.exc import IntegrityError, NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.schemas.chat import ChatDTO, ChatType, CreateChatDTO
 from src.data.base_repo import BasePostgresAsyncRepository
+from src.data.chat_repo.cache import ChatCache
 from src.data.chat_repo.exception import (
     ChatNotFound,
     NotCreatorError,
@@ -19,6 +22,10 @@ logger = logging.getLogger(__name__)
 
 class ChatRepository(ChatRepositoryInterface, BasePostgresAsyncRepository[Chat]):
 
+    def __init__(self, session: AsyncSession, cache: Optional[ChatCache] = None) -> None:
+        super().__init__(session)
+        self._cache = cache
+
     async def create_chat(self, dto: CreateChatDTO) -> ChatDTO:
         group = Group(name=f"{dto.name}_group", creator_id=dto.creator_id)
         await self.add(group)
@@ -33,38 +40,54 @@ class ChatRepository(ChatRepositoryInterface, BasePostgresAsyncRepository[Chat])
 
         await self.commit()
 
-        return ChatDTO(
+        chat_dto = ChatDTO(
             id=chat.id,
             name=chat.name,
             chat_type=ChatType(chat.chat_type),
             creator_id=group.creator_id,
             members_ids=[],
         )
+        if self._cache is not None:
+            self._cache.set(chat_dto)
+        return chat_dto
 
     async def get_chat(self, chat_id: int) -> ChatDTO:
-        try:
-            chat = await self.session.get_one(Chat, chat_id)
-        except NoResultFound:
-            raise ChatNotFound
-
-        group = await self.session.get_one(Group, chat.group_id)
+        if self._cache is not None and (chat_dto := self._cache.get(chat_id)):
+            return chat_dto
+        cache_version = self._cache.version if self._cache is not None else None
 
-        user_group_list = await self.session.scalars(
-            select(UserGroup).where(UserGroup.group_id == group.id)
+        stmt = (
+            select(Chat.id, Chat.name, Chat.chat_type, Group.creator_id, UserGroup.user_id)
+            .join(Group, Group.id == Chat.group_id)
+            .outerjoin(UserGroup, UserGroup.group_id == Group.id)
+            .where(Chat.id == chat_id)
         )
+        rows = (await self.session.execute(stmt)).all()
+        if not rows:
+            raise ChatNotFound
 
-        members_ids = [user_group.user_id for user_group in user_group_list]
-
-        return ChatDTO(
-            id=chat.id,
-            name=chat.name,
-            chat_type=ChatType(chat.chat_type),
-            creator_id=group.creator_id,
-            members_ids=members_ids,
+        chat_dto = ChatDTO(
+            id=rows[0].id,
+            name=rows[0].name,
+            chat_type=ChatType(rows[0].chat_type),
+            creator_id=rows[0].creator_id,
+            members_ids=[row.user_id for row in rows if row.user_id is not None],
         )
-
-    async def get_all_chats_ids(self) -> list[int]:
-        return [chat.id for chat in await self.session.scalars(select(Chat))]
+        if self._cache is not None:
+            self._cache.set(chat_dto, cache_version)
+        return chat_dto
+
+    async def iter_chat_ids(self, chunk_size: int = 10_000) -> AsyncIterator[list[int]]:
+        stmt = select(Chat.id).order_by(Chat.id).limit(chunk_size)
+        last_id = None
+        while True:
+            chunk_stmt = stmt if last_id is None else stmt.where(Chat.id > last_id)
+            ids = list(await self.session.scalars(chunk_stmt))
+            if ids:
+                yield ids
+            if len(ids) < chunk_size:
+                return
+            last_id = ids[-1]
 
     async def _get_chat_with_group_and_check_owning(
         self, user_id: int, chat_id: int
@@ -111,6 +134,8 @@ class ChatRepository(ChatRepositoryInterface, BasePostgresAsyncRepository[Chat])
             raise UserNotFound
 
         await self.commit()
+        if self._cache is not None:
+            self._cache.invalidate(chat_id)
 
     async def remove_user_from_chat(
         self, user_id: int, remove_user_id: int, chat_id: int
@@ -121,3 +146,5 @@ class ChatRepository(ChatRepositoryInterface, BasePostgresAsyncRepository[Chat])
         )
         await self.session.execute(stmt)
         await self.session.commit()
+        if self._cache is not None:
+            self._cache.invalidate(chat_id)
@@ -0,0 +1,48 @@
+from bisect import insort
+from itertools import count
+
+from src.core.schemas.chat import ChatType
+from src.core.schemas.message import MessageDTO
+from src.core.schemas.user import UserDTO
+
+
+class ChatRecord:
+    __slots__ = ("id", "name", "chat_type", "creator_id", "members_ids")
+
+    def __init__(self, chat_id: int, name: str, chat_type: ChatType, creator_id: int) -> None:
+        self.id = chat_id
+        self.name = name
+        self.chat_type = chat_type
+        self.creator_id = creator_id
+        self.members_ids: list[int] = []
+
+
+class MemoryStore:
+    """Tables of the in-memory repositories, shared by them like a database."""
+
+    def __init__(self) -> None:
+        self.users: dict[int, UserDTO] = {}
+        self.user_ids_by_name: dict[str, int] = {}
+        self.chats: dict[int, ChatRecord] = {}
+        self.messages: dict[int, MessageDTO] = {}
+        # Sorted (timestamp, id) of every chat's messages, the order of the history
+        self.chat_positions: dict[int, list[tuple[int, int]]] = {}
+        # (chat_id, user_id) -> {(message_id, receipt)}
+        self.outbox: dict[tuple[int, int], set[tuple[int, bool]]] = {}
+        self.outbox_size = 0
+        # message_id -> recipients it is still pending for, receipts aside
+        self.undelivered: dict[int, int] = {}
+        self._ids = {"user": count(1), "chat": count(1), "message": count(1)}
+
+    def next_id(self, table: str) -> int:
+        return next(self._ids[table])
+
+    def add_message(self, message: MessageDTO) -> None:
+        self.messages[message.id] = message
+        insort(self.chat_positions.setdefault(message.chat_id, []), (message.timestamp, message.id))
+
+    def clear(self) -> None:
+        self.__init__()
+
+
+memory_store = MemoryStore()
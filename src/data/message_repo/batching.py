@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Generic, Iterable, Optional, TypeVar
+
+from sqlalchemy import insert
+
+from src.core.schemas.message import MessageCreateDTO, MessageDTO, MessageHistory
+from src.data.message_repo.interface import MessageRepositoryInterface
+from src.data.message_repo.postrgesql import MessageRepository
+from src.data.models import Message
+from src.database.postgresql.connection import ISessionAsyncWrapper
+
+logger = logging.getLogger(__name__)
+
+_ItemT = TypeVar("_ItemT")
+_ResultT = TypeVar("_ResultT")
+
+_STOP = object()
+
+
+class BaseBatcher(ABC, Generic[_ItemT, _ResultT]):
+    """Collects items until max_batch_size or max_delay_sec and writes them at once."""
+
+    def __init__(
+        self,
+        session_wrapper: ISessionAsyncWrapper,
+        max_batch_size: int,
+        max_delay_sec: float,
+    ) -> None:
+        self._session_wrapper = session_wrapper
+        self._max_batch_size = max_batch_size
+        self._max_delay_sec = max_delay_sec
+        self._queue: asyncio.Queue[tuple[_ItemT, Optional[asyncio.Future]]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write everything submitted so far and stop the background task."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self._queue.put_nowait(_STOP)
+        await task
+
+    async def submit(self, item: _ItemT) -> _ResultT:
+        if self._task is None:
+            raise RuntimeError(f"{type(self).__name__} is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    def submit_nowait(self, item: _ItemT) -> None:
+        """Queue item without waiting for it to be written."""
+        if self._task is None:
+            raise RuntimeError(f"{type(self).__name__} is not running")
+        self._queue.put_nowait((item, None))
+
+    async def _collect(self) -> tuple[list[tuple[_ItemT, Optional[asyncio.Future]]], bool]:
+        batch = []
+        entry = await self._queue.get()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_delay_sec
+        while entry is not _STOP:
+            batch.append(entry)
+            if len(batch) >= self._max_batch_size:
+                return batch, False
+            if not self._queue.empty():
+                entry = self._queue.get_nowait()
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                return batch, False
+            try:
+                entry = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return batch, False
+        return batch, True
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._process(batch)
+
+    async def _process(self, batch: list[tuple[_ItemT, Optional[asyncio.Future]]]) -> None:
+        try:
+            results = await self._write([item for item, _ in batch])
+        except Exception as exc:
+            logger.exception(f"Failed to write batch of {len(batch)} items")
+            for _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), result in zip(batch, results):
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    @abstractmethod
+    async def _write(self, items: list[_ItemT]) -> list[_ResultT]: ...
+
+    def get_stats(self) -> dict[str, int]:
+        return {"batches": self.batches, "items": self.items, "queued": self._queue.qsize()}
+
+
+class BatchedMessageWriter(BaseBatcher[MessageCreateDTO, MessageDTO]):
+
+    async def save_message(self, dto: MessageCreateDTO) -> MessageDTO:
+        return await self.submit(dto)
+
+    async def _write(self, items: list[MessageCreateDTO]) -> list[MessageDTO]:
+        values = [dto.model_dump() for dto in items]
+        stmt = insert(Message).returning(Message.id, sort_by_parameter_order=True)
+        async with self._session_wrapper.t() as session:
+            ids = (await session.scalars(stmt, values)).all()
+            await session.commit()
+        return [MessageDTO(id=message_id, **value) for message_id, value in zip(ids, values)]
+
+
+class ReadReceiptAggregator(BaseBatcher[int, None]):
+
+    def mark_message_as_read(self, message_id: int) -> None:
+        self.submit_nowait(message_id)
+
+    async def _write(self, items: list[int]) -> list[None]:
+        async with self._session_wrapper.t() as session:
+            await MessageRepository(session).mark_messages_as_read(set(items))
+        return [None] * len(items)
+
+
+class BatchingMessageRepository(MessageRepositoryInterface):
+    """Message repository which routes writes through shared batchers when they are given."""
+
+    def __init__(
+        self,
+        repository: MessageRepositoryInterface,
+        writer: Optional[BatchedMessageWriter] = None,
+        read_receipts: Optional[ReadReceiptAggregator] = None,
+    ) -> None:
+        self._repository = repository
+        self._writer = writer
+        self._read_receipts = read_receipts
+
+    async def save_message(self, dto: MessageCreateDTO) -> MessageDTO:
+        if self._writer is None:
+            return await self._repository.save_message(dto)
+        return await self._writer.save_message(dto)
+
+    async def get_message(self, message_id: int) -> MessageDTO:
+        return await self._repository.get_message(message_id)
+
+    async def mark_message_as_read(self, message_id: int) -> None:
+        if self._read_receipts is None:
+            await self._repository.mark_message_as_read(message_id)
+            return
+        self._read_receipts.mark_message_as_read(message_id)
+
+    async def mark_messages_as_read(self, message_ids: Iterable[int]) -> None:
+        await self._repository.mark_messages_as_read(message_ids)
+
+    async def mark_chat_as_read(self, chat_id: int, up_to_id: int) -> None:
+        await self._repository.mark_chat_as_read(chat_id, up_to_id)
+
+    async def get_message_history(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        latest: bool = False,
+        with_total: bool = False,
+    ) -> MessageHistory:
+        return await self._repository.get_message_history(
+            chat_id,
+            limit=limit,
+            offset=offset,
+            before_id=before_id,
+            after_id=after_id,
+            latest=latest,
+            with_total=with_total,
+        )
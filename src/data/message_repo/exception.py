@@ -0,0 +1 @@
+class MessageNotFound(Exception): ...
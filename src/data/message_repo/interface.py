@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Iterable, Optional
 
 from src.core.schemas.message import MessageCreateDTO, MessageDTO, MessageHistory
 
@@ -8,10 +8,28 @@ class MessageRepositoryInterface(ABC):
     @abstractmethod
     async def save_message(self, dto: MessageCreateDTO) -> MessageDTO: ...
 
+    @abstractmethod
+    async def get_message(self, message_id: int) -> MessageDTO:
+        """Raises MessageNotFound for an unknown id."""
+
     @abstractmethod
     async def mark_message_as_read(self, message_id: int) -> None: ...
 
+    @abstractmethod
+    async def mark_messages_as_read(self, message_ids: Iterable[int]) -> None: ...
+
+    @abstractmethod
+    async def mark_chat_as_read(self, chat_id: int, up_to_id: int) -> None: ...
+
     @abstractmethod
     async def get_message_history(
-        self, chat_id: int, limit: Optional[int] = None, offset: Optional[int] = None
-    ) -> MessageHistory: ...
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        latest: bool = False,
+        with_total: bool = False,
+    ) -> MessageHistory:
+        """Messages ordered by (timestamp, id); before_id/after_id/latest paginate by keyset."""
@@ -0,0 +1,86 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Optional
+
+from src.core.schemas.message import MessageCreateDTO, MessageDTO, MessageHistory
+from src.data.memory_store import MemoryStore
+from src.data.message_repo.exception import MessageNotFound
+from src.data.message_repo.interface import MessageRepositoryInterface
+
+
+class InMemoryMessageRepository(MessageRepositoryInterface):
+
+    def __init__(self, store: MemoryStore) -> None:
+        self._store = store
+
+    async def save_message(self, dto: MessageCreateDTO) -> MessageDTO:
+        message = MessageDTO(id=self._store.next_id("message"), **dto.model_dump())
+        self._store.add_message(message)
+        return message.model_copy()
+
+    async def get_message(self, message_id: int) -> MessageDTO:
+        if (message := self._store.messages.get(message_id)) is None:
+            raise MessageNotFound
+        return message.model_copy()
+
+    async def mark_message_as_read(self, message_id: int) -> None:
+        await self.mark_messages_as_read((message_id,))
+
+    async def mark_messages_as_read(self, message_ids: Iterable[int]) -> None:
+        for message_id in message_ids:
+            if (message := self._store.messages.get(message_id)) is not None:
+                message.read = True
+
+    async def mark_chat_as_read(self, chat_id: int, up_to_id: int) -> None:
+        if (position := self._position(chat_id, up_to_id)) is None:
+            return
+        positions = self._store.chat_positions.get(chat_id, [])
+        for _, message_id in positions[:bisect_right(positions, position)]:
+            self._store.messages[message_id].read = True
+
+    def _position(self, chat_id: int, message_id: int) -> Optional[tuple[int, int]]:
+        message = self._store.messages.get(message_id)
+        if message is None or message.chat_id != chat_id:
+            return None
+        return message.timestamp, message_id
+
+    async def get_message_history(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        latest: bool = False,
+        with_total: bool = False,
+    ) -> MessageHistory:
+        positions = self._store.chat_positions.get(chat_id, [])
+        total = len(positions) if with_total else None
+
+        start, end = 0, len(positions)
+        for message_id, before in ((before_id, True), (after_id, False)):
+            if message_id is None:
+                continue
+            # Like comparing with NULL in the database, an unknown message matches nothing
+            if (position := self._position(chat_id, message_id)) is None:
+                return MessageHistory(items=[], total=total)
+            if before:
+                end = min(end, bisect_left(positions, position))
+            else:
+                start = max(start, bisect_right(positions, position))
+
+        offset = offset or 0
+        if latest or before_id is not None:
+            end = max(start, end - offset)
+            if limit is not None:
+                start = max(start, end - limit)
+        else:
+            start = min(end, start + offset)
+            if limit is not None:
+                end = min(end, start + limit)
+        return MessageHistory(
+            items=[
+                self._store.messages[message_id].model_copy()
+                for _, message_id in positions[start:end]
+            ],
+            total=total,
+        )
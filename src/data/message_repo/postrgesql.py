@@ -1,9 +1,11 @@
-from typing import Optional
+from typing import Iterable, Optional
 
-from sqlalchemy import func, select, update
+from sqlalchemy import ColumnElement, Integer, and_, any_, bindparam, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from src.core.schemas.message import MessageCreateDTO, MessageDTO, MessageHistory
 from src.data.base_repo import BasePostgresAsyncRepository
+from src.data.message_repo.exception import MessageNotFound
 from src.data.message_repo.interface import MessageRepositoryInterface
 from src.data.models import Message
 
@@ -18,26 +20,87 @@ class MessageRepository(
 
         return MessageDTO(**message_model.__dict__)
 
+    async def get_message(self, message_id: int) -> MessageDTO:
+        message_model = await self.session.get(Message, message_id)
+        if message_model is None:
+            raise MessageNotFound
+        return MessageDTO(**message_model.__dict__)
+
     async def mark_message_as_read(self, message_id: int) -> None:
         stmt = update(Message).values(read=True).where(Message.id == message_id)
         await self.session.execute(stmt)
         await self.commit()
 
-    async def get_message_history(
-        self, chat_id: int, limit: Optional[int] = None, offset: Optional[int] = None
-    ) -> MessageHistory:
+    async def mark_messages_as_read(self, message_ids: Iterable[int]) -> None:
+        message_ids = list(message_ids)
+        if not message_ids:
+            return
+        ids = bindparam("message_ids", message_ids, type_=ARRAY(Integer))
+        stmt = update(Message).values(read=True).where(Message.id == any_(ids))
+        await self.session.execute(stmt)
+        await self.commit()
+
+    async def mark_chat_as_read(self, chat_id: int, up_to_id: int) -> None:
         stmt = (
-            select(Message)
-            .where(Message.chat_id == chat_id)
-            .order_by(Message.timestamp)
+            update(Message)
+            .values(read=True)
+            .where(
+                and_(
+                    Message.chat_id == chat_id,
+                    tuple_(Message.timestamp, Message.id) <= self._position(chat_id, up_to_id),
+                    Message.read.is_(False),
+                )
+            )
         )
-        stmt_total = select(func.count()).select_from(stmt)
-        total = await self.session.scalar(stmt_total)
+        await self.session.execute(stmt)
+        await self.commit()
+
+    @staticmethod
+    def _position(chat_id: int, message_id: int) -> ColumnElement:
+        # NULL for a message of another chat, so it matches nothing
+        timestamp = (
+            select(Message.timestamp)
+            .where(Message.id == message_id, Message.chat_id == chat_id)
+            .scalar_subquery()
+        )
+        return tuple_(timestamp, message_id)
+
+    async def get_message_history(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        latest: bool = False,
+        with_total: bool = False,
+    ) -> MessageHistory:
+        stmt = select(Message).where(Message.chat_id == chat_id)
+        total = None
+        if with_total:
+            total = await self.session.scalar(
+                select(func.count()).select_from(stmt.subquery())
+            )
+
+        position = tuple_(Message.timestamp, Message.id)
+        if before_id is not None:
+            stmt = stmt.where(position < self._position(chat_id, before_id))
+        if after_id is not None:
+            stmt = stmt.where(position > self._position(chat_id, after_id))
+
+        descending = latest or before_id is not None
+        if descending:
+            stmt = stmt.order_by(Message.timestamp.desc(), Message.id.desc())
+        else:
+            stmt = stmt.order_by(Message.timestamp, Message.id)
+
         if limit is not None:
             stmt = stmt.limit(limit)
         if offset is not None:
             stmt = stmt.offset(offset)
-        message_records = await self.session.scalars(stmt)
+        message_records = list(await self.session.scalars(stmt))
+        if descending:
+            message_records.reverse()
         return MessageHistory(
             items=[MessageDTO(**record.__dict__) for record in message_records],
             total=total,
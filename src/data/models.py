@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import Boolean, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -28,6 +28,7 @@ class Group(Base):
 class Chat(Base):
 
     __tablename__ = "chat"
+    __table_args__ = (Index("ix_chat_group_id", "group_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
@@ -38,7 +39,10 @@ class Chat(Base):
 class UserGroup(Base):
 
     __tablename__ = "user_group"
-    __table_args__ = (UniqueConstraint("user_id", "group_id"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "group_id"),
+        Index("ix_user_group_group_id_user_id", "group_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey(User.id))
@@ -48,6 +52,9 @@ class UserGroup(Base):
 class Message(Base):
 
     __tablename__ = "message"
+    __table_args__ = (
+        Index("ix_message_chat_id_timestamp_id", "chat_id", "timestamp", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     chat_id: Mapped[int] = mapped_column(Integer, ForeignKey(Chat.id))
@@ -55,3 +62,18 @@ class Message(Base):
     text: Mapped[str] = mapped_column(String, nullable=False)
     timestamp: Mapped[int] = mapped_column(Integer, nullable=False)
     read: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+
+class DeliveryOutbox(Base):
+
+    __tablename__ = "delivery_outbox"
+    __table_args__ = (
+        UniqueConstraint("user_id", "chat_id", "message_id", "receipt"),
+        Index("ix_delivery_outbox_message_id", "message_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey(User.id))
+    chat_id: Mapped[int] = mapped_column(Integer, ForeignKey(Chat.id))
+    message_id: Mapped[int] = mapped_column(Integer, ForeignKey(Message.id))
+    receipt: Mapped[bool] = mapped_column(Boolean, nullable=False)
@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+from src.core.schemas.delivery import DeliveryDTO
+
+
+class OutboxRepositoryInterface(ABC):
+
+    @abstractmethod
+    async def add_deliveries(
+        self,
+        chat_id: int,
+        message_id: int,
+        recipients_ids: Iterable[int],
+        receipt: bool = False,
+    ) -> None: ...
+
+    @abstractmethod
+    async def pop_deliveries(self, chat_id: int, user_id: int) -> list[DeliveryDTO]: ...
+
+    @abstractmethod
+    async def get_undelivered_message_ids(
+        self, message_ids: Iterable[int]
+    ) -> set[int]: ...
+
+    @abstractmethod
+    async def count_deliveries(self) -> int: ...
@@ -0,0 +1,50 @@
+from typing import Iterable
+
+from src.core.schemas.delivery import DeliveryDTO
+from src.data.memory_store import MemoryStore
+from src.data.outbox_repo.interface import OutboxRepositoryInterface
+
+
+class InMemoryOutboxRepository(OutboxRepositoryInterface):
+
+    def __init__(self, store: MemoryStore) -> None:
+        self._store = store
+
+    async def add_deliveries(
+        self,
+        chat_id: int,
+        message_id: int,
+        recipients_ids: Iterable[int],
+        receipt: bool = False,
+    ) -> None:
+        for user_id in recipients_ids:
+            pending = self._store.outbox.setdefault((chat_id, user_id), set())
+            if (message_id, receipt) not in pending:
+                pending.add((message_id, receipt))
+                self._store.outbox_size += 1
+                if not receipt:
+                    undelivered = self._store.undelivered
+                    undelivered[message_id] = undelivered.get(message_id, 0) + 1
+
+    async def pop_deliveries(self, chat_id: int, user_id: int) -> list[DeliveryDTO]:
+        pending = self._store.outbox.pop((chat_id, user_id), set())
+        self._store.outbox_size -= len(pending)
+        undelivered = self._store.undelivered
+        for message_id, receipt in pending:
+            if not receipt:
+                undelivered[message_id] -= 1
+                if not undelivered[message_id]:
+                    del undelivered[message_id]
+        return [
+            DeliveryDTO(message=self._store.messages[message_id].model_copy(), receipt=receipt)
+            for message_id, receipt in sorted(pending)
+            if message_id in self._store.messages
+        ]
+
+    async def get_undelivered_message_ids(
+        self, message_ids: Iterable[int]
+    ) -> set[int]:
+        return {message_id for message_id in message_ids if message_id in self._store.undelivered}
+
+    async def count_deliveries(self) -> int:
+        return self._store.outbox_size
@@ -0,0 +1,81 @@
+from typing import Iterable
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from src.core.schemas.delivery import DeliveryDTO
+from src.core.schemas.message import MessageDTO
+from src.data.base_repo import BasePostgresAsyncRepository
+from src.data.models import DeliveryOutbox, Message
+from src.data.outbox_repo.interface import OutboxRepositoryInterface
+
+
+class OutboxRepository(
+    OutboxRepositoryInterface, BasePostgresAsyncRepository[DeliveryOutbox]
+):
+
+    async def add_deliveries(
+        self,
+        chat_id: int,
+        message_id: int,
+        recipients_ids: Iterable[int],
+        receipt: bool = False,
+    ) -> None:
+        values = [
+            {
+                "user_id": user_id,
+                "chat_id": chat_id,
+                "message_id": message_id,
+                "receipt": receipt,
+            }
+            for user_id in recipients_ids
+        ]
+        if not values:
+            return
+        stmt = insert(DeliveryOutbox).values(values).on_conflict_do_nothing()
+        await self.session.execute(stmt)
+        await self.commit()
+
+    async def pop_deliveries(self, chat_id: int, user_id: int) -> list[DeliveryDTO]:
+        drained = (
+            delete(DeliveryOutbox)
+            .where(
+                and_(DeliveryOutbox.user_id == user_id, DeliveryOutbox.chat_id == chat_id)
+            )
+            .returning(DeliveryOutbox.message_id, DeliveryOutbox.receipt)
+            .cte("drained")
+        )
+        stmt = (
+            select(Message, drained.c.receipt)
+            .join(drained, Message.id == drained.c.message_id)
+            .order_by(Message.id, drained.c.receipt)
+        )
+        records = (await self.session.execute(stmt)).all()
+        await self.commit()
+        return [
+            DeliveryDTO(message=MessageDTO(**message.__dict__), receipt=receipt)
+            for message, receipt in records
+        ]
+
+    async def get_undelivered_message_ids(
+        self, message_ids: Iterable[int]
+    ) -> set[int]:
+        message_ids = list(message_ids)
+        if not message_ids:
+            return set()
+        stmt = (
+            select(DeliveryOutbox.message_id)
+            .where(
+                and_(
+                    DeliveryOutbox.message_id.in_(message_ids),
+                    DeliveryOutbox.receipt.is_(False),
+                )
+            )
+            .distinct()
+        )
+        return set(await self.session.scalars(stmt))
+
+    async def count_deliveries(self) -> int:
+        return await self.session.scalar(
+            select(func.count()).select_from(DeliveryOutbox)
+        )
@@ -0,0 +1,84 @@
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, Callable, Optional
+
+from src.data.chat_repo.cache import chat_cache
+from src.data.chat_repo.interface import ChatRepositoryInterface
+from src.data.chat_repo.memory import InMemoryChatRepository
+from src.data.chat_repo.postgresql import ChatRepository
+from src.data.memory_store import MemoryStore
+from src.data.message_repo.batching import (
+    BatchedMessageWriter,
+    BatchingMessageRepository,
+    ReadReceiptAggregator,
+)
+from src.data.message_repo.interface import MessageRepositoryInterface
+from src.data.message_repo.memory import InMemoryMessageRepository
+from src.data.message_repo.postrgesql import MessageRepository
+from src.data.outbox_repo.interface import OutboxRepositoryInterface
+from src.data.outbox_repo.memory import InMemoryOutboxRepository
+from src.data.outbox_repo.postgresql import OutboxRepository
+from src.data.user_repo.interface import UserRepositoryInterface
+from src.data.user_repo.memory import InMemoryUserRepository
+from src.data.user_repo.postgresql import UserRepository
+from src.database.postgresql.connection import ISessionAsyncWrapper
+
+
+class Repositories:
+    """Repositories of one unit of work, sharing its session."""
+
+    __slots__ = ("chat", "message", "user", "outbox")
+
+    def __init__(
+        self,
+        chat: ChatRepositoryInterface,
+        message: MessageRepositoryInterface,
+        user: UserRepositoryInterface,
+        outbox: OutboxRepositoryInterface,
+    ) -> None:
+        self.chat = chat
+        self.message = message
+        self.user = user
+        self.outbox = outbox
+
+
+# Opens a unit of work, its session is closed and the connection returned on exit
+RepositoriesFactory = Callable[[], AsyncContextManager[Repositories]]
+
+
+def memory_repositories(store: MemoryStore) -> RepositoriesFactory:
+    repositories = Repositories(
+        chat=InMemoryChatRepository(store),
+        message=InMemoryMessageRepository(store),
+        user=InMemoryUserRepository(store),
+        outbox=InMemoryOutboxRepository(store),
+    )
+
+    @asynccontextmanager
+    async def open_repositories() -> AsyncIterator[Repositories]:
+        yield repositories
+
+    return open_repositories
+
+
+def postgres_repositories(
+    session_wrapper: ISessionAsyncWrapper,
+    message_writer: Optional[BatchedMessageWriter] = None,
+    read_receipts: Optional[ReadReceiptAggregator] = None,
+) -> RepositoriesFactory:
+    @asynccontextmanager
+    async def open_repositories() -> AsyncIterator[Repositories]:
+        # The session takes a connection from the pool only on its first query
+        async with session_wrapper.t() as session:
+            message_repo: MessageRepositoryInterface = MessageRepository(session=session)
+            if message_writer is not None or read_receipts is not None:
+                message_repo = BatchingMessageRepository(
+                    message_repo, writer=message_writer, read_receipts=read_receipts
+                )
+            yield Repositories(
+                chat=ChatRepository(session=session, cache=chat_cache),
+                message=message_repo,
+                user=UserRepository(session=session),
+                outbox=OutboxRepository(session=session),
+            )
+
+    return open_repositories
@@ -0,0 +1,28 @@
+from src.core.schemas.user import CreateUserDTO, UserDTO
+from src.data.memory_store import MemoryStore
+from src.data.user_repo.exceptions import UserAlreadyExists, UserNotFound
+from src.data.user_repo.interface import UserRepositoryInterface
+
+
+class InMemoryUserRepository(UserRepositoryInterface):
+
+    def __init__(self, store: MemoryStore) -> None:
+        self._store = store
+
+    async def create_user(self, dto: CreateUserDTO) -> UserDTO:
+        if dto.name in self._store.user_ids_by_name:
+            raise UserAlreadyExists
+        user = UserDTO(id=self._store.next_id("user"), **dto.model_dump())
+        self._store.users[user.id] = user
+        self._store.user_ids_by_name[user.name] = user.id
+        return user.model_copy()
+
+    async def get_user(self, user_id: int) -> UserDTO:
+        if (user := self._store.users.get(user_id)) is None:
+            raise UserNotFound
+        return user.model_copy()
+
+    async def get_user_by_login(self, login: str) -> UserDTO:
+        if (user_id := self._store.user_ids_by_name.get(login)) is None:
+            raise UserNotFound
+        return self._store.users[user_id].model_copy()
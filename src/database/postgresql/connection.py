@@ -1,13 +1,18 @@
+import time
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
-from typing import AsyncContextManager
+from typing import AsyncContextManager, Union
 
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+from src.core.metrics import db_pool_checkout_wait_seconds
 
 
 class ISessionAsyncFactory(ABC):
@@ -27,19 +32,73 @@ class ISessionAsyncWrapper(ABC):
         pass
 
 
-def create_engine(url: str, echo: bool = False) -> AsyncEngine:
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool which counts checkouts and the time spent waiting for them."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait_total_sec = 0.0
+        self.checkout_wait_max_sec = 0.0
+
+    def connect(self) -> PoolProxiedConnection:
+        started_at = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        waited = time.perf_counter() - started_at
+        self.checkouts += 1
+        self.checkout_wait_total_sec += waited
+        db_pool_checkout_wait_seconds.observe(waited)
+        if waited > self.checkout_wait_max_sec:
+            self.checkout_wait_max_sec = waited
+        return connection
+
+
+def create_engine(
+    url: str,
+    echo: bool = False,
+    pool_size: int = 20,
+    max_overflow: int = 10,
+    pool_timeout: float = 5,
+    pool_recycle: int = 1200,
+) -> AsyncEngine:
     return create_async_engine(
         url,
         future=True,
         echo=echo,
+        poolclass=InstrumentedAsyncQueuePool,
         pool_pre_ping=False,
-        pool_size=20,
-        max_overflow=10,
-        pool_recycle=1200,
-        pool_timeout=6000,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=pool_recycle,
+        pool_timeout=pool_timeout,
     )
 
 
+def get_pool_stats(engine: AsyncEngine) -> dict[str, Union[int, float]]:
+    pool = engine.pool
+    stats: dict[str, Union[int, float]] = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        stats.update(
+            {
+                "checkouts": pool.checkouts,
+                "checkout_timeouts": pool.checkout_timeouts,
+                "checkout_wait_total_sec": pool.checkout_wait_total_sec,
+                "checkout_wait_max_sec": pool.checkout_wait_max_sec,
+            }
+        )
+    return stats
+
+
 class SessionFactory(ISessionAsyncFactory):
     def __init__(self, engine: AsyncEngine) -> None:
         self._maker = async_sessionmaker(
@@ -0,0 +1,52 @@
+"""add lookup indexes
+
+Revision ID: 2922d3dc5be6
+Revises: 5fed540e942a
+Create Date: 2026-10-18 13:21:47.904112
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2922d3dc5be6"
+down_revision: Union[str, None] = "5fed540e942a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# user.name lookups are already served by the index behind its unique constraint
+INDEXES = (
+    ("ix_message_chat_id_timestamp_id", "message", ["chat_id", "timestamp", "id"]),
+    ("ix_user_group_group_id_user_id", "user_group", ["group_id", "user_id"]),
+    ("ix_chat_group_id", "chat", ["group_id"]),
+    ("ix_delivery_outbox_message_id", "delivery_outbox", ["message_id"]),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps big tables writable, but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for index_name, table_name, columns in INDEXES:
+            op.create_index(
+                index_name,
+                table_name,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name, table_name, _ in reversed(INDEXES):
+            op.drop_index(
+                index_name,
+                table_name=table_name,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
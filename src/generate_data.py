@@ -0,0 +1,185 @@
+"""Synthetic users, chats, memberships and messages for load tests.
+
+Rows are streamed into Postgres with COPY, so memory stays bounded whatever
+the counts. As many ids from --first-id on as a table gets belong to the
+generator: a run deletes them first and writes everything in one transaction,
+and the same arguments give the same data, so reruns are idempotent. Sequences are moved past the generated
+ids, so the app keeps creating rows normally afterwards.
+
+Chats are a --private-share of private chats with two members and groups whose
+sizes follow a long-tailed Pareto distribution. Messages are spread over chats
+by a Zipf law, so a few chats are hot and most are nearly silent.
+
+    python generate_data.py --users 1000000 --chats 300000 --messages 20000000
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from typing import Iterator
+
+import asyncpg
+
+from src.core.schemas.chat import ChatType
+from src.settings import settings
+
+PASSWORD = "12345"
+# Every message is older than this, so runs don't depend on the current time
+END_TIMESTAMP = 1_750_000_000
+# Messages in the last hour before END_TIMESTAMP are left unread
+UNREAD_SEC = 3600
+
+
+class Generator:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self._args = args
+        self._first_id = args.first_id
+        self._password = getattr(hashlib, settings.PASSWORD_HASH_ALGORITHM.lower())(
+            PASSWORD.encode("utf-8")
+        ).hexdigest()
+        self._zipf_total = sum(self._chat_weight(index) for index in range(args.chats))
+
+    def users(self) -> Iterator[tuple]:
+        for index in range(self._args.users):
+            user_id = self._first_id + index
+            yield user_id, f"user_{user_id}", f"user_{user_id}@mail.ru", self._password
+
+    def groups(self) -> Iterator[tuple]:
+        for index in range(self._args.chats):
+            _, members, _ = self._chat(index)
+            yield self._first_id + index, f"chat_{self._first_id + index}_group", members[0]
+
+    def user_groups(self) -> Iterator[tuple]:
+        for index in range(self._args.chats):
+            _, members, _ = self._chat(index)
+            for user_id in members:
+                yield user_id, self._first_id + index
+
+    def chats(self) -> Iterator[tuple]:
+        for index in range(self._args.chats):
+            chat_id = self._first_id + index
+            chat_type, _, _ = self._chat(index)
+            yield chat_id, f"chat_{chat_id}", chat_type.value, chat_id
+
+    def messages(self) -> Iterator[tuple]:
+        period_sec = self._args.days * 86400
+        message_id = self._first_id
+        for index in range(self._args.chats):
+            chat_id = self._first_id + index
+            _, members, chat_random = self._chat(index)
+            count = self._message_count(index, chat_random)
+            if not count:
+                continue
+
+            # Ascending timestamps with exponential gaps over the whole period
+            mean_gap = period_sec / count
+            timestamp = END_TIMESTAMP - period_sec
+            for number in range(count):
+                timestamp = min(END_TIMESTAMP, timestamp + int(chat_random.expovariate(1 / mean_gap)))
+                sender_id = chat_random.choice(members)
+                read = timestamp < END_TIMESTAMP - UNREAD_SEC
+                yield message_id, chat_id, sender_id, f"Message {number} of user {sender_id}", timestamp, read
+                message_id += 1
+
+    def message_count(self) -> int:
+        """How many messages messages() yields, close to --messages but not exactly."""
+        return sum(
+            self._message_count(index, self._chat(index)[2]) for index in range(self._args.chats)
+        )
+
+    def _message_count(self, index: int, chat_random: random.Random) -> int:
+        expected = self._args.messages * self._chat_weight(index) / self._zipf_total
+        return int(expected) + (chat_random.random() < expected % 1)
+
+    def _chat_weight(self, index: int) -> float:
+        return 1 / (index + 1) ** self._args.zipf_exponent
+
+    def _chat(self, index: int) -> tuple[ChatType, list[int], random.Random]:
+        """Type and members of the chat, and its generator to draw messages from."""
+        # A generator of its own per chat, so every pass sees the same chat
+        chat_random = random.Random(self._args.seed * 1_000_003 + index)
+        if chat_random.random() < self._args.private_share:
+            chat_type, size = ChatType.PRIVATE, 2
+        else:
+            chat_type = ChatType.GROUP
+            size = int(self._args.min_group_size * chat_random.paretovariate(self._args.pareto_alpha))
+        size = max(1, min(size, self._args.max_group_size, self._args.users))
+        members = [self._first_id + number for number in chat_random.sample(range(self._args.users), size)]
+        return chat_type, members, chat_random
+
+
+TABLES = (
+    ("user", ("id", "name", "email", "password"), Generator.users),
+    ("group", ("id", "name", "creator_id"), Generator.groups),
+    ("user_group", ("user_id", "group_id"), Generator.user_groups),
+    ("chat", ("id", "name", "chat_type", "group_id"), Generator.chats),
+    ("message", ("id", "chat_id", "sender_id", "text", "timestamp", "read"), Generator.messages),
+)
+
+# Ids of generated rows are [$1, $2) for users, [$1, $3) for chats and their
+# groups, [$1, $4) for messages. Rows referencing them go first, real rows
+# past the ranges are kept
+DELETE_GENERATED = (
+    """DELETE FROM delivery_outbox
+    WHERE chat_id >= $1 AND chat_id < $3
+        OR user_id >= $1 AND user_id < $2
+        OR message_id >= $1 AND message_id < $4""",
+    """DELETE FROM message
+    WHERE id >= $1 AND id < $4
+        OR chat_id >= $1 AND chat_id < $3
+        OR sender_id >= $1 AND sender_id < $2""",
+    'DELETE FROM chat WHERE id >= $1 AND id < $3 OR group_id >= $1 AND group_id < $3',
+    """DELETE FROM user_group
+    WHERE group_id >= $1 AND group_id < $3 OR user_id >= $1 AND user_id < $2""",
+    """DELETE FROM "group"
+    WHERE id >= $1 AND id < $3 OR creator_id >= $1 AND creator_id < $2""",
+    'DELETE FROM "user" WHERE id >= $1 AND id < $2',
+)
+
+
+async def generate(args: argparse.Namespace) -> None:
+    generator = Generator(args)
+    connection = await asyncpg.connect(settings.DATABASE_SYNC_URL)
+    try:
+        ranges = (
+            args.first_id,
+            args.first_id + args.users,
+            args.first_id + args.chats,
+            args.first_id + generator.message_count(),
+        )
+        async with connection.transaction():
+            for statement in DELETE_GENERATED:
+                await connection.execute(statement, *ranges)
+            for table, columns, rows in TABLES:
+                started_at = time.perf_counter()
+                result = await connection.copy_records_to_table(
+                    table, records=rows(generator), columns=columns
+                )
+                print(f"{table}: {result} in {time.perf_counter() - started_at:.1f}s")
+            for table, _, _ in TABLES + (("delivery_outbox", (), None),):
+                await connection.execute(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                    f"GREATEST((SELECT max(id) FROM \"{table}\"), 1))"
+                )
+        # Planner statistics as they would be in production
+        for table, _, _ in TABLES:
+            await connection.execute(f'ANALYZE "{table}"')
+    finally:
+        await connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--chats", type=int, default=3_000)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--private-share", type=float, default=0.6)
+    parser.add_argument("--min-group-size", type=int, default=3)
+    parser.add_argument("--max-group-size", type=int, default=5_000)
+    parser.add_argument("--pareto-alpha", type=float, default=1.2)
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--first-id", type=int, default=10_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(generate(parser.parse_args()))
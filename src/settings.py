@@ -19,16 +19,85 @@ class Base(BaseSettings):
     JWT_TOKEN_LIFETIME_SEC: int = 604800
     JWT_SIGNATURE_ALGORITHM: str = "HS256"
     JWT_SECRET_KEY: str = "h@ck_Me_plea$e"
+    # Verified tokens kept to skip decoding on every request, 0 disables
+    JWT_CACHE_MAX_SIZE: int = 10_000
 
     PASSWORD_HASH_ALGORITHM: str = "SHA256"
 
+    WORKERS: int = 1
+    # /monitoring/* reveals worker internals, it is mounted only when enabled
+    # and answers authenticated users only
+    MONITORING_ENABLED: bool = False
+    # Chats with the most websockets that get their own series in /metrics
+    METRICS_TOP_CHATS: int = 20
+    # Time given to close sockets and flush pending writes on shutdown, half
+    # of it to each
+    SHUTDOWN_TIMEOUT_SEC: float = 10
+
+    # Chat
+    CHAT_CACHE_TTL_SEC: float = 30
+    CHAT_CACHE_MAX_SIZE: int = 100_000
+    # Keep below SEND_QUEUE_MAX_SIZE, the replay is queued at once
+    RECONNECT_REPLAY_LIMIT: int = 100
+    # Application level heartbeat for clients that answer its binary ping frame:
+    # connections silent for HEARTBEAT_INTERVAL_SEC are pinged and evicted if
+    # nothing comes in for HEARTBEAT_TIMEOUT_SEC more. Off by default, clients
+    # that only listen would be evicted
+    HEARTBEAT_ENABLED: bool = False
+    HEARTBEAT_INTERVAL_SEC: float = 30
+    HEARTBEAT_TIMEOUT_SEC: float = 30
+    # Protocol level ping/pong done by uvicorn, closes connections that don't answer
+    WS_PING_INTERVAL_SEC: float = 20
+    WS_PING_TIMEOUT_SEC: float = 20
+
+    SEND_QUEUE_MAX_SIZE: int = 1000
+    # "drop_oldest", "disconnect" or "spill" to the delivery outbox
+    SEND_QUEUE_OVERFLOW_POLICY: str = "disconnect"
+    # Token buckets for inbound messages, a rate of 0 turns the limit off
+    MESSAGE_RATE_PER_USER_SEC: float = 5
+    MESSAGE_BURST_PER_USER: int = 20
+    MESSAGE_RATE_PER_CHAT_SEC: float = 100
+    MESSAGE_BURST_PER_CHAT: int = 200
+    MESSAGE_BUFFER_DEPTH: int = 100
+    MESSAGE_BUFFER_MAX_MESSAGES: int = 1_000_000
+
+    MESSAGE_BATCH_WRITER_ENABLED: bool = False
+    MESSAGE_BATCH_MAX_SIZE: int = 256
+    MESSAGE_BATCH_MAX_DELAY_SEC: float = 0.005
+
+    READ_RECEIPT_BATCHING_ENABLED: bool = False
+    READ_RECEIPT_BATCH_MAX_SIZE: int = 1000
+    READ_RECEIPT_BATCH_MAX_DELAY_SEC: float = 0.05
+
+    # "in_process" for a single worker, "postgresql" to share chats between workers
+    FANOUT_BUS: str = "in_process"
+    FANOUT_CHANNEL: str = "chat_fanout"
+    FANOUT_HEARTBEAT_INTERVAL_SEC: float = 5
+    # Workers not confirming a message was sent by then hold back its read receipt
+    FANOUT_ACK_TIMEOUT_SEC: float = 30
+
+    # Tracing of chat messages, a share of them from 0 to 1
+    TRACE_SAMPLE_RATE: float = 0
+    # "log" for structured log lines, "otlp_file" for OTLP/JSON lines in TRACE_FILE
+    TRACE_EXPORTER: str = "log"
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_LINGER_SEC: float = 1
+
     # Database
+    # "postgresql", or "memory" to run the chat core without a database, e.g. for benchmarks
+    REPOSITORY_BACKEND: str = "postgresql"
     DB_HOST: str
     DB_PORT: str
     DB_USER: str
     DB_PASSWORD: str
     DB_NAME: str
 
+    DB_POOL_SIZE: int = 20
+    DB_POOL_MAX_OVERFLOW: int = 10
+    # Requests fail after waiting this long for a free connection
+    DB_POOL_TIMEOUT_SEC: float = 5
+    DB_POOL_RECYCLE_SEC: int = 1200
+
     @property
     def DATABASE_SYNC_URL(self):
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
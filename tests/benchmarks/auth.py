@@ -0,0 +1,55 @@
+"""Per-request cost of checking the access token.
+
+Compares the previous path, which built JWTService and AuthService for every
+request and decoded the token each time, against the CachingJWTService
+singleton. Tokens are spread over --users so both cache hits and the LRU
+bookkeeping are measured; no database is involved.
+
+    python -m tests.benchmarks.auth --requests 100000 --users 1000
+"""
+import argparse
+
+from src.core.auth.auth_service import AuthService
+from src.core.auth.jwt import JWTService
+from src.core.auth.jwt.cache import CachingJWTService
+from src.settings import settings
+from tests.benchmarks.common import Stopwatch
+
+
+def new_jwt_service() -> JWTService:
+    return JWTService(
+        algorithm=settings.JWT_SIGNATURE_ALGORITHM,
+        secret_key=settings.JWT_SECRET_KEY,
+        token_lifetime=settings.JWT_TOKEN_LIFETIME_SEC,
+    )
+
+
+def main(requests: int, users: int) -> None:
+    tokens = [new_jwt_service().encode({"user_id": user_id}) for user_id in range(users)]
+
+    with Stopwatch() as per_request:
+        for i in range(requests):
+            auth_service = AuthService(
+                user_repo=None,
+                jwt_service=new_jwt_service(),
+                hash_algorithm=settings.PASSWORD_HASH_ALGORITHM,
+            )
+            auth_service.authenticate_user_by_token(tokens[i % users])
+
+    jwt_service = CachingJWTService(new_jwt_service(), max_size=settings.JWT_CACHE_MAX_SIZE)
+    with Stopwatch() as cached:
+        for i in range(requests):
+            jwt_service.decode(tokens[i % users])
+
+    print(f"requests: {requests}, distinct tokens: {users}")
+    print(f"  decode per request: {per_request.elapsed / requests * 1e6:>8.2f} us/request")
+    print(f"  cached singleton:   {cached.elapsed / requests * 1e6:>8.2f} us/request")
+    print(f"  cache: {jwt_service.get_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.requests, args.users)
@@ -0,0 +1,70 @@
+"""Fan-out of one message to every member of a large group chat.
+
+Compares a send_text coroutine per member (the previous delivery path)
+against LocalDelivery.broadcast, which builds the frame once and queues it
+to the connection writers. Sockets are in-memory stand-ins which encode
+the frame like the ASGI server does, so no database or network is involved.
+
+    python -m tests.benchmarks.broadcast --members 1000 10000 --messages 20
+"""
+import argparse
+import asyncio
+
+from src.core.chat_manager.delivery import LocalDelivery
+from src.core.connection_writer import ConnectionWriter
+from src.core.storage import ConnectionStorage
+from tests.benchmarks.common import Stopwatch
+
+
+class BenchConnection:
+    def __init__(self) -> None:
+        self.sent_bytes = 0
+
+    async def send(self, message: dict) -> None:
+        await asyncio.sleep(0)
+        self.sent_bytes += len(message["text"].encode())
+
+    async def send_text(self, data: str) -> None:
+        await self.send({"type": "websocket.send", "text": data})
+
+
+async def send_per_member(connections: list[BenchConnection], text: str) -> None:
+    async def send(connection: BenchConnection) -> bool:
+        await connection.send_text(text)
+        return True
+
+    await asyncio.gather(*(send(connection) for connection in connections))
+
+
+async def main(members_counts: list[int], messages: int) -> None:
+    text = "User 1: " + "bench message " * 8
+    for members in members_counts:
+        connections = [BenchConnection() for _ in range(members)]
+        local_delivery = LocalDelivery(ConnectionStorage())
+        writers = [
+            ConnectionWriter(1, user_id, connection, max_queue_size=messages)
+            for user_id, connection in enumerate(connections)
+        ]
+
+        with Stopwatch() as per_member:
+            for _ in range(messages):
+                await send_per_member(connections, text)
+        with Stopwatch() as broadcast:
+            for _ in range(messages):
+                local_delivery.broadcast(writers, text)
+                await asyncio.sleep(0)
+            while any(writer.depth for writer in writers):
+                await asyncio.sleep(0)
+
+        frames = members * messages
+        print(f"members: {members}")
+        print(f"  per-member send_text: {frames / per_member.elapsed:>10.0f} frames/sec")
+        print(f"  broadcast:            {frames / broadcast.elapsed:>10.0f} frames/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.members, args.messages))
@@ -0,0 +1,59 @@
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from sqlalchemy import delete
+
+from src.core.schemas.chat import ChatType
+from src.data.models import Chat, DeliveryOutbox, Group, Message, User, UserGroup
+from src.database.postgresql.connection import SessionFactory, SessionWrapper, create_engine
+from src.settings import settings
+
+BENCH_ID = 900_000_001
+
+
+@asynccontextmanager
+async def bench_session_wrapper(pool_size: int = 20) -> AsyncGenerator[SessionWrapper, None]:
+    engine = create_engine(settings.DATABASE_ASYNC_URL, pool_size=pool_size)
+    try:
+        yield SessionWrapper(SessionFactory(engine))
+    finally:
+        await engine.dispose()
+
+
+async def cleanup_bench_chat(ssw: SessionWrapper, chat_id: int = BENCH_ID) -> None:
+    async with ssw.t() as session:
+        await session.execute(delete(DeliveryOutbox).where(DeliveryOutbox.chat_id == chat_id))
+        await session.execute(delete(Message).where(Message.chat_id == chat_id))
+        await session.execute(delete(Chat).where(Chat.id == chat_id))
+        await session.execute(delete(UserGroup).where(UserGroup.group_id == chat_id))
+        await session.execute(delete(Group).where(Group.id == chat_id))
+        await session.execute(delete(User).where(User.id == chat_id))
+        await session.commit()
+
+
+@asynccontextmanager
+async def bench_chat(ssw: SessionWrapper, chat_id: int = BENCH_ID) -> AsyncGenerator[int, None]:
+    """Chat with a single member whose user, group and chat ids all equal chat_id."""
+    await cleanup_bench_chat(ssw, chat_id)
+    async with ssw.t() as session:
+        session.add(User(id=chat_id, name=f"bench_{chat_id}", email="bench@mail.ru", password="-"))
+        await session.flush()
+        session.add(Group(id=chat_id, name=f"bench_{chat_id}_group", creator_id=chat_id))
+        await session.flush()
+        session.add(UserGroup(user_id=chat_id, group_id=chat_id))
+        session.add(Chat(id=chat_id, name=f"bench_{chat_id}", chat_type=ChatType.GROUP.value, group_id=chat_id))
+        await session.commit()
+    try:
+        yield chat_id
+    finally:
+        await cleanup_bench_chat(ssw, chat_id)
+
+
+class Stopwatch:
+    def __enter__(self) -> "Stopwatch":
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.elapsed = time.perf_counter() - self.started_at
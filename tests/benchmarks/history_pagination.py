@@ -0,0 +1,70 @@
+"""Page latency of offset and keyset message history pagination.
+
+Seeds a chat with generate_series on the configured database, then reads
+pages at growing depths. Keyset page latency is expected to stay flat while
+offset latency grows with the depth.
+
+    python -m tests.benchmarks.history_pagination --messages 2000000
+"""
+import argparse
+import asyncio
+import statistics
+
+from sqlalchemy import text
+
+from src.data.message_repo.postrgesql import MessageRepository
+from src.database.postgresql.connection import SessionWrapper
+from tests.benchmarks.common import Stopwatch, bench_chat, bench_session_wrapper
+
+
+async def seed(ssw: SessionWrapper, chat_id: int, messages: int) -> int:
+    async with ssw.t() as session:
+        await session.execute(
+            text(
+                "INSERT INTO message (chat_id, sender_id, text, timestamp, read) "
+                "SELECT :chat_id, :chat_id, 'bench message ' || n, n, true "
+                "FROM generate_series(1, :messages) AS n"
+            ),
+            {"chat_id": chat_id, "messages": messages},
+        )
+        await session.commit()
+        await session.execute(text("ANALYZE message"))
+        return await session.scalar(
+            text("SELECT min(id) FROM message WHERE chat_id = :chat_id"),
+            {"chat_id": chat_id},
+        )
+
+
+async def measure(ssw: SessionWrapper, chat_id: int, repeats: int, **kwargs) -> float:
+    timings = []
+    async with ssw.t() as session:
+        repo = MessageRepository(session)
+        for _ in range(repeats):
+            with Stopwatch() as stopwatch:
+                await repo.get_message_history(chat_id, **kwargs)
+            timings.append(stopwatch.elapsed)
+    return statistics.median(timings) * 1000
+
+
+async def main(messages: int, page_size: int, repeats: int) -> None:
+    async with bench_session_wrapper() as ssw, bench_chat(ssw) as chat_id:
+        first_id = await seed(ssw, chat_id, messages)
+        print(f"{'depth':>10} {'offset ms':>10} {'keyset ms':>10} {'+count ms':>10}")
+        depth = page_size
+        while depth < messages:
+            offset_ms = await measure(ssw, chat_id, repeats, limit=page_size, offset=depth)
+            keyset_ms = await measure(ssw, chat_id, repeats, limit=page_size, after_id=first_id + depth)
+            count_ms = await measure(
+                ssw, chat_id, repeats, limit=page_size, after_id=first_id + depth, with_total=True
+            )
+            print(f"{depth:>10} {offset_ms:>10.2f} {keyset_ms:>10.2f} {count_ms:>10.2f}")
+            depth *= 10
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.page_size, args.repeats))
@@ -0,0 +1,59 @@
+"""Throughput of per-message commits against the batched message writer.
+
+Runs --senders concurrent coroutines, each saving --messages messages, once
+through MessageRepository.save_message (INSERT + COMMIT per message) and
+once through BatchedMessageWriter (one multi-row INSERT + COMMIT per batch).
+
+    python -m tests.benchmarks.message_writer --senders 200 --messages 50
+"""
+import argparse
+import asyncio
+
+from src.core.schemas.message import MessageCreateDTO
+from src.data.message_repo.batching import BatchedMessageWriter
+from src.data.message_repo.postrgesql import MessageRepository
+from src.database.postgresql.connection import SessionWrapper
+from tests.benchmarks.common import Stopwatch, bench_chat, bench_session_wrapper
+
+
+def make_message(chat_id: int, number: int) -> MessageCreateDTO:
+    return MessageCreateDTO(chat_id=chat_id, sender_id=chat_id, text=f"bench message {number}", timestamp=number)
+
+
+async def direct_sender(ssw: SessionWrapper, chat_id: int, messages: int) -> None:
+    async with ssw.t() as session:
+        repo = MessageRepository(session)
+        for number in range(messages):
+            await repo.save_message(make_message(chat_id, number))
+
+
+async def batched_sender(writer: BatchedMessageWriter, chat_id: int, messages: int) -> None:
+    for number in range(messages):
+        await writer.save_message(make_message(chat_id, number))
+
+
+async def main(senders: int, messages: int, batch_size: int, delay_sec: float) -> None:
+    total = senders * messages
+    async with bench_session_wrapper(pool_size=senders) as ssw, bench_chat(ssw) as chat_id:
+        with Stopwatch() as direct:
+            await asyncio.gather(*(direct_sender(ssw, chat_id, messages) for _ in range(senders)))
+
+        writer = BatchedMessageWriter(ssw, max_batch_size=batch_size, max_delay_sec=delay_sec)
+        writer.start()
+        with Stopwatch() as batched:
+            await asyncio.gather(*(batched_sender(writer, chat_id, messages) for _ in range(senders)))
+        await writer.stop()
+
+        print(f"messages:        {total}")
+        print(f"per-message:     {total / direct.elapsed:>10.0f} msgs/sec")
+        print(f"batched writer:  {total / batched.elapsed:>10.0f} msgs/sec ({writer.get_stats()['batches']} batches)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--senders", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--delay-sec", type=float, default=0.005)
+    args = parser.parse_args()
+    asyncio.run(main(args.senders, args.messages, args.batch_size, args.delay_sec))
@@ -0,0 +1,50 @@
+"""Memory held by ConnectionStorage for a large number of chats.
+
+Measures with tracemalloc the memory of --chats chats registered up front
+in the former {chat_id: {"connections": {...}}} layout, and of --connections
+idle connections spread over those chats in the current storage, which
+holds chat state only while somebody is connected.
+
+    python -m tests.benchmarks.storage_memory --chats 1000000 --connections 100000
+"""
+import argparse
+import gc
+import tracemalloc
+from typing import Callable
+
+from src.core.storage import ConnectionStorage
+
+
+def measure(build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    started = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    used = tracemalloc.get_traced_memory()[0] - started
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main(chats: int, connections: int) -> None:
+    def legacy_chats() -> dict:
+        return {chat_id: {"connections": {}} for chat_id in range(chats)}
+
+    def connected_users() -> ConnectionStorage:
+        storage = ConnectionStorage()
+        for number in range(connections):
+            storage.add_user_connection(number % chats, number, object())
+        return storage
+
+    legacy = measure(legacy_chats)
+    connected = measure(connected_users)
+    print(f"chats registered up front, former layout:  {legacy / 2**20:>8.1f} MiB ({legacy / chats:.0f} B/chat)")
+    print(f"chats created on connect ({connections} idle connections): {connected / 2**20:.1f} MiB ({connected / connections:.0f} B/connection)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=1_000_000)
+    parser.add_argument("--connections", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.chats, args.connections)
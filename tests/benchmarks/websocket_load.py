@@ -0,0 +1,288 @@
+"""End-to-end websocket load against the app and a local Postgres.
+
+Seeds --users users and --chats chats (a --private-share of them private, the
+rest groups of --group-size members) straight into the database, starts the
+app with uvicorn in a subprocess, opens --connections websockets through
+/connect_to_chat/{chat_id}/{token} and sends --rate messages per second for
+--duration seconds. Every message carries its send time, so each receiving
+socket measures the end-to-end latency. Reports throughput, latency
+percentiles, repository calls and pool checkouts per message (from
+/metrics and /monitoring/db_pool) and peak RSS of the server. Seeded rows are removed afterwards; --seed makes runs repeatable.
+
+Inbound rate limits are turned off for the server, so the load is not
+throttled unless --keep-rate-limits is given.
+
+    python -m tests.benchmarks.websocket_load --users 200 --chats 50 --connections 400 --rate 200 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import delete, insert
+from websockets.asyncio.client import ClientConnection, connect
+
+from src.core.auth.auth_service import ACCESS_COOKIE_NAME
+from src.core.auth.jwt import JWTService
+from src.core.rate_limiter import THROTTLED_TEXT
+from src.core.schemas.chat import ChatType
+from src.core.schemas.frame import FrameType
+from src.data.models import Chat, DeliveryOutbox, Group, Message, User, UserGroup
+from src.database.postgresql.connection import SessionWrapper
+from src.settings import settings
+from tests.benchmarks.common import Stopwatch, bench_session_wrapper
+
+FIRST_ID = 910_000_001
+DB_QUERIES_PATTERN = re.compile(r"^db_query_seconds_count\{.*\} (\d+)$", re.MULTILINE)
+
+
+@dataclass
+class Seeded:
+    user_ids: list[int]
+    # chat id -> member ids
+    chats: dict[int, list[int]]
+
+
+@dataclass
+class Client:
+    chat_id: int
+    user_id: int
+    socket: Optional[ClientConnection] = None
+    latencies: list[float] = field(default_factory=list)
+    throttled: int = 0
+
+
+async def cleanup(ssw: SessionWrapper, users: int, chats: int) -> None:
+    user_ids = range(FIRST_ID, FIRST_ID + users)
+    chat_ids = range(FIRST_ID, FIRST_ID + chats)
+    async with ssw.t() as session:
+        await session.execute(delete(DeliveryOutbox).where(DeliveryOutbox.chat_id.in_(chat_ids)))
+        await session.execute(delete(Message).where(Message.chat_id.in_(chat_ids)))
+        await session.execute(delete(Chat).where(Chat.id.in_(chat_ids)))
+        await session.execute(delete(UserGroup).where(UserGroup.group_id.in_(chat_ids)))
+        await session.execute(delete(Group).where(Group.id.in_(chat_ids)))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+async def seed(
+    ssw: SessionWrapper,
+    rng: random.Random,
+    users: int,
+    chats: int,
+    private_share: float,
+    group_size: int,
+) -> Seeded:
+    await cleanup(ssw, users, chats)
+    user_ids = list(range(FIRST_ID, FIRST_ID + users))
+    seeded = Seeded(user_ids, {})
+    for chat_id in range(FIRST_ID, FIRST_ID + chats):
+        private = rng.random() < private_share
+        seeded.chats[chat_id] = rng.sample(user_ids, 2 if private else min(group_size, users))
+
+    async with ssw.t() as session:
+        await session.execute(
+            insert(User),
+            [{"id": user_id, "name": f"load_{user_id}", "email": "load@mail.ru", "password": "-"} for user_id in user_ids],
+        )
+        await session.execute(
+            insert(Group),
+            [{"id": chat_id, "name": f"load_{chat_id}", "creator_id": members[0]} for chat_id, members in seeded.chats.items()],
+        )
+        await session.execute(
+            insert(UserGroup),
+            [{"user_id": user_id, "group_id": chat_id} for chat_id, members in seeded.chats.items() for user_id in members],
+        )
+        await session.execute(
+            insert(Chat),
+            [
+                {
+                    "id": chat_id,
+                    "name": f"load_{chat_id}",
+                    "chat_type": (ChatType.PRIVATE if len(members) == 2 else ChatType.GROUP).value,
+                    "group_id": chat_id,
+                }
+                for chat_id, members in seeded.chats.items()
+            ],
+        )
+        await session.commit()
+    return seeded
+
+
+def make_jwt_service() -> JWTService:
+    return JWTService(
+        algorithm=settings.JWT_SIGNATURE_ALGORITHM,
+        secret_key=settings.JWT_SECRET_KEY,
+        token_lifetime=settings.JWT_TOKEN_LIFETIME_SEC,
+    )
+
+
+async def http_get(port: int, path: str, token: Optional[str] = None) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    cookie = f"Cookie: {ACCESS_COOKIE_NAME}={token}\r\n" if token else ""
+    writer.write(f"GET {path} HTTP/1.0\r\nHost: 127.0.0.1\r\n{cookie}\r\n".encode())
+    response = await reader.read()
+    writer.close()
+    return response.partition(b"\r\n\r\n")[2].decode()
+
+
+async def db_counters(port: int, token: str) -> tuple[int, int]:
+    """Repository calls and pool checkouts made by the server so far."""
+    queries = sum(int(count) for count in DB_QUERIES_PATTERN.findall(await http_get(port, "/metrics")))
+    checkouts = json.loads(await http_get(port, "/monitoring/db_pool", token)).get("checkouts", 0)
+    return queries, checkouts
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def start_server(port: int, keep_rate_limits: bool) -> subprocess.Popen:
+    env = dict(os.environ, MONITORING_ENABLED="true")
+    if not keep_rate_limits:
+        env.update(MESSAGE_RATE_PER_USER_SEC="0", MESSAGE_RATE_PER_CHAT_SEC="0")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def wait_until_ready(port: int, timeout_sec: float = 30) -> None:
+    deadline = time.monotonic() + timeout_sec
+    while True:
+        try:
+            await http_get(port, "/metrics")
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def receive(client: Client) -> None:
+    async for frame in client.socket:
+        if isinstance(frame, bytes):
+            # Heartbeat ping of the server
+            await client.socket.send(b"")
+            continue
+        frame = json.loads(frame)
+        if frame["type"] == FrameType.NOTICE and frame["text"] == THROTTLED_TEXT:
+            client.throttled += 1
+        elif frame["type"] == FrameType.MESSAGE:
+            client.latencies.append(time.perf_counter() - float(frame["text"].rsplit(" ", 1)[1]))
+
+
+async def open_clients(port: int, seeded: Seeded, connections: int) -> list[Client]:
+    jwt_service = make_jwt_service()
+    members = [(chat_id, user_id) for chat_id, user_ids in seeded.chats.items() for user_id in user_ids]
+    # Beyond one socket per member the extra ones act as further devices
+    clients = [Client(*members[number % len(members)]) for number in range(connections)]
+    opening = asyncio.Semaphore(100)
+
+    async def open_client(client: Client) -> None:
+        token = jwt_service.encode({"user_id": client.user_id})
+        async with opening:
+            client.socket = await connect(
+                f"ws://127.0.0.1:{port}/connect_to_chat/{client.chat_id}/{token}", max_queue=None
+            )
+
+    await asyncio.gather(*(open_client(client) for client in clients))
+    return clients
+
+
+def percentile(values: list[float], share: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def drive(clients: list[Client], rng: random.Random, rate: float, duration: float) -> dict[int, int]:
+    """Send messages on schedule, returns how many went to each chat."""
+    sent: dict[int, int] = {}
+    started_at = time.perf_counter()
+    for number in range(int(rate * duration)):
+        delay = started_at + number / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        client = rng.choice(clients)
+        await client.socket.send(f"{number} {time.perf_counter()!r}")
+        sent[client.chat_id] = sent.get(client.chat_id, 0) + 1
+    return sent
+
+
+async def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    async with bench_session_wrapper() as ssw:
+        seeded = await seed(ssw, rng, args.users, args.chats, args.private_share, args.group_size)
+        server = start_server(args.port, args.keep_rate_limits)
+        try:
+            await wait_until_ready(args.port)
+            clients = await open_clients(args.port, seeded, args.connections)
+            receivers = [asyncio.create_task(receive(client)) for client in clients]
+            # Monitoring answers authenticated users only
+            token = make_jwt_service().encode({"user_id": seeded.user_ids[0]})
+            queries_before, checkouts_before = await db_counters(args.port, token)
+
+            with Stopwatch() as sending:
+                sent = await drive(clients, rng, args.rate, args.duration)
+            sockets_per_chat: dict[int, int] = {}
+            for client in clients:
+                sockets_per_chat[client.chat_id] = sockets_per_chat.get(client.chat_id, 0) + 1
+            expected = sum(count * sockets_per_chat[chat_id] for chat_id, count in sent.items())
+            deadline = time.perf_counter() + args.drain_sec
+            while sum(len(client.latencies) for client in clients) < expected and time.perf_counter() < deadline:
+                await asyncio.sleep(0.1)
+            total = time.perf_counter() - sending.started_at
+
+            queries, checkouts = await db_counters(args.port, token)
+            queries -= queries_before
+            checkouts -= checkouts_before
+            rss_mb = peak_rss_mb(server.pid)
+            for client in clients:
+                await client.socket.close()
+            await asyncio.gather(*receivers, return_exceptions=True)
+        finally:
+            server.terminate()
+            server.wait()
+            await cleanup(ssw, args.users, args.chats)
+
+    messages = sum(sent.values())
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    throttled = sum(client.throttled for client in clients)
+    print(f"users: {args.users}, chats: {args.chats}, websockets: {len(clients)}")
+    print(f"messages sent:     {messages} ({messages / sending.elapsed:.0f} msgs/sec, {throttled} throttled)")
+    print(f"frames delivered:  {len(latencies)} of {expected} ({len(latencies) / total:.0f} frames/sec)")
+    print(
+        "latency ms:        "
+        + ", ".join(f"p{int(share * 100)} {percentile(latencies, share) * 1000:.1f}" for share in (0.5, 0.95, 0.99))
+    )
+    print(f"repository calls:  {queries / max(messages, 1):.2f} per message")
+    print(f"pool checkouts:    {checkouts / max(messages, 1):.2f} per message")
+    print(f"server peak RSS:   {rss_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--private-share", type=float, default=0.5)
+    parser.add_argument("--group-size", type=int, default=10)
+    parser.add_argument("--connections", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--drain-sec", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    asyncio.run(main(parser.parse_args()))
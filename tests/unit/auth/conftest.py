@@ -0,0 +1,14 @@
+import pytest
+
+from src.core.auth.jwt import JWTService
+from src.core.auth.jwt.cache import CachingJWTService
+
+
+@pytest.fixture
+def jwt_service() -> JWTService:
+    return JWTService(algorithm="HS256", secret_key="test_secret", token_lifetime=60)
+
+
+@pytest.fixture
+def cached_jwt_service(jwt_service: JWTService) -> CachingJWTService:
+    return CachingJWTService(jwt_service, max_size=2)
@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from src.core.auth.jwt import InvalidTokenError, TokenExpiredError
+from src.core.auth.jwt.cache import CachingJWTService
+
+
+def test_verified_token_decoded_once(cached_jwt_service: CachingJWTService) -> None:
+    token = cached_jwt_service.encode({"user_id": 1000})
+    assert cached_jwt_service.decode(token)["user_id"] == 1000
+    assert cached_jwt_service.decode(token)["user_id"] == 1000
+    assert cached_jwt_service.get_stats() == {"size": 1, "hits": 1, "misses": 1}
+
+    with pytest.raises(InvalidTokenError):
+        cached_jwt_service.decode(token[:-2])
+    assert cached_jwt_service.get_stats()["size"] == 1
+
+
+def test_cached_token_expires_and_evicts(
+    cached_jwt_service: CachingJWTService, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tokens = [cached_jwt_service.encode({"user_id": user_id}) for user_id in (1000, 1001, 1002)]
+    for token in tokens:
+        cached_jwt_service.decode(token)
+    assert cached_jwt_service.get_stats()["size"] == 2
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    with pytest.raises(TokenExpiredError):
+        cached_jwt_service.decode(tokens[-1])
+    assert cached_jwt_service.get_stats()["size"] == 1
@@ -0,0 +1,122 @@
+import asyncio
+import inspect
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import pytest
+import pytest_asyncio
+
+from src.core.chat_manager.delivery import LocalDelivery
+from src.core.chat_manager.fastapi import FastapiChatManager
+from src.core.fanout_bus.in_process import InProcessFanoutBus
+from src.core.schemas.chat import ChatDTO, ChatType, CreateChatDTO
+from src.core.schemas.user import CreateUserDTO
+from src.core.storage import ConnectionStorage
+from src.data.chat_repo.memory import InMemoryChatRepository
+from src.data.memory_store import MemoryStore
+from src.data.message_repo.memory import InMemoryMessageRepository
+from src.data.outbox_repo.memory import InMemoryOutboxRepository
+from src.data.repositories import Repositories, RepositoriesFactory
+from src.data.user_repo.memory import InMemoryUserRepository
+
+
+class FakeSession:
+    """Fails like AsyncSession when used by two tasks at once."""
+
+    def __init__(self) -> None:
+        self.busy = False
+
+
+class SessionBound:
+    """Repository whose calls go through a FakeSession, yielding to other tasks on the way."""
+
+    def __init__(self, repository: Any, session: FakeSession) -> None:
+        self._repository = repository
+        self._session = session
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._repository, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        async def call(*args, **kwargs) -> Any:
+            if self._session.busy:
+                raise RuntimeError("This session is provisioning a new connection; concurrent operations are not permitted")
+            self._session.busy = True
+            try:
+                await asyncio.sleep(0)
+                return await attribute(*args, **kwargs)
+            finally:
+                self._session.busy = False
+
+        return call
+
+
+@pytest.fixture
+def store() -> MemoryStore:
+    return MemoryStore()
+
+
+@pytest.fixture
+def message_repo(store: MemoryStore) -> InMemoryMessageRepository:
+    return InMemoryMessageRepository(store)
+
+
+@pytest.fixture
+def outbox_repo(store: MemoryStore) -> InMemoryOutboxRepository:
+    return InMemoryOutboxRepository(store)
+
+
+@pytest.fixture
+def storage() -> ConnectionStorage:
+    return ConnectionStorage()
+
+
+@pytest_asyncio.fixture
+async def group_chat(store: MemoryStore) -> ChatDTO:
+    """Chat of Sergey, Arina and Vlad created by Sergey."""
+    user_repo = InMemoryUserRepository(store)
+    chat_repo = InMemoryChatRepository(store)
+    user_ids = [
+        (await user_repo.create_user(CreateUserDTO(name=name, email="some_email", password="123"))).id
+        for name in ("Sergey", "Arina", "Vlad")
+    ]
+    chat = await chat_repo.create_chat(
+        CreateChatDTO(name="some_chat", chat_type=ChatType.GROUP, creator_id=user_ids[0])
+    )
+    for user_id in user_ids:
+        await chat_repo.add_user_to_chat(user_ids[0], user_id, chat.id)
+    return await chat_repo.get_chat(chat.id)
+
+
+@pytest.fixture
+def repositories(
+    store: MemoryStore,
+    message_repo: InMemoryMessageRepository,
+    outbox_repo: InMemoryOutboxRepository,
+) -> RepositoriesFactory:
+    """A fresh session per unit of work, as with Postgres."""
+
+    @asynccontextmanager
+    async def open_repositories() -> AsyncIterator[Repositories]:
+        session = FakeSession()
+        yield Repositories(
+            chat=SessionBound(InMemoryChatRepository(store), session),
+            message=SessionBound(message_repo, session),
+            user=SessionBound(InMemoryUserRepository(store), session),
+            outbox=SessionBound(outbox_repo, session),
+        )
+
+    return open_repositories
+
+
+@pytest_asyncio.fixture
+async def chat_manager(storage: ConnectionStorage, repositories: RepositoriesFactory) -> FastapiChatManager:
+    bus = InProcessFanoutBus(storage)
+    await bus.start(LocalDelivery(storage).handle)
+    return FastapiChatManager(
+        connection_storage=storage,
+        repositories=repositories,
+        fanout_bus=bus,
+        replay_limit=2,
+    )
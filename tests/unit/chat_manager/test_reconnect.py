@@ -0,0 +1,237 @@
+import asyncio
+import json
+
+import pytest
+
+from src.core.chat_manager.delivery import LocalDelivery
+from src.core.chat_manager.fastapi import REPLAY_TRUNCATED_TEXT, FastapiChatManager
+from src.core.connection_writer import OVERFLOW_CLOSE_CODE
+from src.core.fanout_bus.in_process import InProcessFanoutBus
+from src.core.schemas.chat import ChatDTO
+from src.core.schemas.delivery import DeliveryDTO
+from src.core.schemas.message import MessageCreateDTO, MessageDTO
+from src.core.storage import ConnectionStorage
+
+
+class FakeWebSocket:
+    """Stays connected until left, frames sent to it are kept."""
+
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+        self.left = asyncio.Event()
+
+    async def accept(self) -> None:
+        pass
+
+    async def receive(self) -> dict:
+        await self.left.wait()
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send(self, message: dict) -> None:
+        self.sent.append(json.loads(message["text"]))
+
+
+class ChattyWebSocket(FakeWebSocket):
+    """Sends the given texts right after connecting."""
+
+    def __init__(self, texts: list[str]) -> None:
+        super().__init__()
+        self._texts = texts
+
+    async def receive(self) -> dict:
+        if self._texts:
+            return {"type": "websocket.receive", "text": self._texts.pop(0)}
+        return await super().receive()
+
+
+class SlowWebSocket(FakeWebSocket):
+    """Takes frames only while unblocked, leaves once the server closes it."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.close_code = None
+        self.unblocked = asyncio.Event()
+        self.unblocked.set()
+
+    async def send(self, message: dict) -> None:
+        if message["type"] == "websocket.close":
+            self.close_code = message["code"]
+            self.left.set()
+            return
+        await self.unblocked.wait()
+        await super().send(message)
+
+
+class BrokenWebSocket(FakeWebSocket):
+    async def send(self, message: dict) -> None:
+        raise OSError("Connection reset by peer")
+
+
+def make_message(message_id: int, chat_id: int = 228) -> MessageDTO:
+    return MessageDTO(id=message_id, chat_id=chat_id, sender_id=1000, text=f"Hello {message_id}!", timestamp=message_id)
+
+
+def ids(messages) -> list[int]:
+    return [message.id for message in messages]
+
+
+def texts(websocket: FakeWebSocket) -> list[str]:
+    return [frame["text"] for frame in websocket.sent]
+
+
+def test_pending_deliveries_kept_when_buffer_is_behind() -> None:
+    deliveries = [DeliveryDTO(message=make_message(message_id)) for message_id in (49, 51)]
+
+    assert ids(FastapiChatManager._missed_by_replay([], deliveries, last_seen_id=50)) == [51]
+    assert ids(FastapiChatManager._missed_by_replay([make_message(51)], deliveries, last_seen_id=50)) == []
+
+
+async def connect(chat_manager, chat_id: int, user_id: int, last_seen_id=None) -> FakeWebSocket:
+    websocket = FakeWebSocket()
+    task = asyncio.create_task(chat_manager.connect_to_chat(chat_id, user_id, websocket, last_seen_id))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    websocket.left.set()
+    await task
+    return websocket
+
+
+@pytest.mark.asyncio
+async def test_reconnect_sends_every_pending_message(
+    chat_manager, message_repo, outbox_repo, group_chat: ChatDTO
+) -> None:
+    sergey, arina, vlad = group_chat.members_ids
+    messages = [
+        await message_repo.save_message(
+            MessageCreateDTO(chat_id=group_chat.id, sender_id=arina, text=f"Hello {number}!", timestamp=number)
+        )
+        for number in range(5)
+    ]
+    for message in messages:
+        await outbox_repo.add_deliveries(group_chat.id, message.id, (vlad,))
+
+    websocket = await connect(chat_manager, group_chat.id, vlad, last_seen_id=messages[0].id)
+
+    # The replay holds the last two, older pending ones are sent regardless
+    assert texts(websocket) == [REPLAY_TRUNCATED_TEXT] + [f"Hello {number}!" for number in range(1, 5)]
+    # Every message frame carries the id to reconnect with
+    assert [frame.get("id") for frame in websocket.sent] == [None] + ids(messages[1:])
+    assert await outbox_repo.get_undelivered_message_ids(message.id for message in messages) == set()
+
+    websocket = await connect(chat_manager, group_chat.id, sergey, last_seen_id=messages[2].id)
+    assert texts(websocket) == ["Hello 3!", "Hello 4!"]
+
+
+@pytest.mark.asyncio
+async def test_read_receipt_waits_for_frames_to_be_sent(
+    chat_manager, message_repo, storage, group_chat: ChatDTO
+) -> None:
+    sergey, arina, vlad = group_chat.members_ids
+    websockets = {sergey: FakeWebSocket(), arina: FakeWebSocket(), vlad: BrokenWebSocket()}
+    for user_id, websocket in websockets.items():
+        storage.add_user_connection(group_chat.id, user_id, websocket)
+
+    lost = await message_repo.save_message(
+        MessageCreateDTO(chat_id=group_chat.id, sender_id=arina, text="Hello 1!", timestamp=1)
+    )
+    await chat_manager._send_to_all_members(group_chat.id, lost)
+
+    # Vlad's socket failed, the message isn't read by all yet
+    assert texts(websockets[arina]) == ["Hello 1!"]
+    assert not (await message_repo.get_message(lost.id)).read
+
+    storage.remove_user_connection(group_chat.id, vlad)
+    websockets[vlad] = FakeWebSocket()
+    storage.add_user_connection(group_chat.id, vlad, websockets[vlad])
+    sent = await message_repo.save_message(
+        MessageCreateDTO(chat_id=group_chat.id, sender_id=arina, text="Hello 2!", timestamp=2)
+    )
+    await chat_manager._send_to_all_members(group_chat.id, sent)
+    await asyncio.sleep(0)
+
+    assert texts(websockets[vlad]) == ["Hello 2!"]
+    assert websockets[arina].sent[1:] == [
+        {"type": "message", "id": sent.id, "text": "Hello 2!"},
+        {"type": "receipt", "id": sent.id, "text": "Hello 2!: Message was read by all chat participants."},
+    ]
+    assert (await message_repo.get_message(sent.id)).read
+
+
+@pytest.mark.asyncio
+async def test_connection_forgotten_when_receive_fails(chat_manager, storage, group_chat: ChatDTO) -> None:
+    class FailingWebSocket(FakeWebSocket):
+        async def receive(self) -> dict:
+            raise RuntimeError("Unexpected ASGI message")
+
+    sergey = group_chat.members_ids[0]
+    with pytest.raises(RuntimeError):
+        await chat_manager.connect_to_chat(group_chat.id, sergey, FailingWebSocket())
+
+    assert not storage.is_connected(group_chat.id, sergey)
+    assert storage.get_chat_ids() == []
+
+
+@pytest.mark.asyncio
+async def test_messages_in_a_row_fanned_out_with_own_sessions(
+    chat_manager, message_repo, outbox_repo, storage, group_chat: ChatDTO
+) -> None:
+    sergey, arina, vlad = group_chat.members_ids
+    storage.add_user_connection(group_chat.id, sergey, FakeWebSocket())
+    websocket = ChattyWebSocket(["First", "Second"])
+
+    task = asyncio.create_task(chat_manager.connect_to_chat(group_chat.id, arina, websocket))
+    # Fan-outs of both messages run alongside each other and the receive loop
+    for _ in range(50):
+        await asyncio.sleep(0)
+    websocket.left.set()
+    await task
+
+    deliveries = await outbox_repo.pop_deliveries(group_chat.id, vlad)
+    assert [delivery.message.text for delivery in deliveries] == [f"User {arina}: First", f"User {arina}: Second"]
+
+
+@pytest.mark.asyncio
+async def test_client_catches_up_after_overflow(
+    repositories, message_repo, group_chat: ChatDTO
+) -> None:
+    sergey, arina, vlad = group_chat.members_ids
+    # The replay fits the queue, as RECONNECT_REPLAY_LIMIT fits SEND_QUEUE_MAX_SIZE
+    storage = ConnectionStorage(max_queue_size=3)
+    bus = InProcessFanoutBus(storage)
+    await bus.start(LocalDelivery(storage).handle)
+    chat_manager = FastapiChatManager(
+        connection_storage=storage, repositories=repositories, fanout_bus=bus, replay_limit=2
+    )
+    fan_outs = []
+
+    async def send(number: int) -> None:
+        message = await message_repo.save_message(
+            MessageCreateDTO(chat_id=group_chat.id, sender_id=arina, text=f"Hello {number}!", timestamp=number)
+        )
+        fan_outs.append(asyncio.create_task(chat_manager._send_to_all_members(group_chat.id, message)))
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    websocket = SlowWebSocket()
+    task = asyncio.create_task(chat_manager.connect_to_chat(group_chat.id, vlad, websocket))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    await send(1)
+    # Vlad reads slower than the chat writes, his queue overflows
+    websocket.unblocked.clear()
+    for number in range(2, 7):
+        await send(number)
+    await task
+    await asyncio.gather(*fan_outs)
+
+    assert websocket.close_code == OVERFLOW_CLOSE_CODE
+    assert texts(websocket) == ["Hello 1!"]
+
+    # The client reconnects with the id of the last message it got
+    last_seen_id = max(frame["id"] for frame in websocket.sent if frame["type"] == "message")
+    websocket = await connect(chat_manager, group_chat.id, vlad, last_seen_id)
+
+    assert texts(websocket) == [REPLAY_TRUNCATED_TEXT, "Hello 5!", "Hello 6!"]
+    # and loads the rest of the gap from /history after the same id
+    history = await message_repo.get_message_history(group_chat.id, limit=10, after_id=last_seen_id)
+    assert [message.text for message in history.items] == [f"Hello {number}!" for number in range(2, 7)]
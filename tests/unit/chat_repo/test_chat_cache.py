@@ -0,0 +1,64 @@
+import time
+
+from src.core.schemas.chat import ChatDTO, ChatType
+from src.data.chat_repo.cache import ChatCache
+
+
+def make_chat(chat_id: int) -> ChatDTO:
+    return ChatDTO(id=chat_id, name="test_chat", chat_type=ChatType.GROUP, creator_id=1000, members_ids=[1000])
+
+
+def test_chat_cache_hit_and_invalidate() -> None:
+    cache = ChatCache(ttl_sec=60, max_size=10)
+    assert cache.get(1) is None
+
+    cache.set(make_chat(1))
+    assert cache.get(1).members_ids == [1000]
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    assert cache.get_stats() == {"size": 0, "hits": 1, "misses": 2}
+
+
+def test_chat_cache_evicts_least_recently_used() -> None:
+    cache = ChatCache(ttl_sec=60, max_size=2)
+    for chat_id in (1, 2):
+        cache.set(make_chat(chat_id))
+    cache.get(1)
+    cache.set(make_chat(3))
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.get(3) is not None
+
+
+def test_chat_cache_entry_expires() -> None:
+    cache = ChatCache(ttl_sec=0.01, max_size=10)
+    cache.set(make_chat(1))
+    time.sleep(0.02)
+    assert cache.get(1) is None
+
+
+def test_chat_cache_skips_read_older_than_invalidation() -> None:
+    cache = ChatCache(ttl_sec=60, max_size=10)
+    invalidated = []
+    cache.invalidation_handler = invalidated.append
+
+    version = cache.version
+    cache.invalidate(1)
+    cache.set(make_chat(1), version)
+    assert cache.get(1) is None
+    assert invalidated == [1]
+
+    cache.set(make_chat(1), cache.version)
+    assert cache.get(1) is not None
+
+
+def test_chat_cache_returns_copies() -> None:
+    cache = ChatCache(ttl_sec=60, max_size=10)
+    chat = make_chat(1)
+    cache.set(chat)
+    chat.members_ids.append(1001)
+    cache.get(1).members_ids.append(1002)
+
+    assert cache.get(1).members_ids == [1000]
@@ -4,7 +4,9 @@ from sqlalchemy import select
 from src.core.schemas.chat import CreateChatDTO, ChatType
 from src.data.chat_repo.interface import ChatRepositoryInterface
 from src.data.models import Chat
-from src.data.chat_repo.exception import UserNotFound
+from src.data.chat_repo.cache import ChatCache
+from src.data.chat_repo.exception import ChatNotFound, UserNotFound
+from src.data.chat_repo.postgresql import ChatRepository
 from src.database.postgresql.connection import SessionWrapper
 
 
@@ -32,3 +34,47 @@ async def test_create_chat_user_not_found(
 ) -> None:
     with pytest.raises(UserNotFound):
         await chat_repo.create_chat(dto=CreateChatDTO(name="test_chat", chat_type=ChatType.PRIVATE, creator_id=1337))
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("insert_chat_test_records")
+async def test_get_chat_with_members_and_cache_invalidation(
+    async_session_wrapper: SessionWrapper,
+    creator_id: int,
+) -> None:
+    cache = ChatCache(ttl_sec=60, max_size=10)
+    async with async_session_wrapper.t() as session:
+        chat_repo = ChatRepository(session, cache=cache)
+        chat = await chat_repo.create_chat(dto=CreateChatDTO(name="test_chat", chat_type=ChatType.GROUP, creator_id=creator_id))
+
+        await chat_repo.add_user_to_chat(user_id=creator_id, new_user_id=creator_id, chat_id=chat.id)
+        assert cache.get(chat.id) is None
+
+        chat = await chat_repo.get_chat(chat.id)
+        assert chat.members_ids == [creator_id]
+        assert cache.get(chat.id) == chat
+
+        await chat_repo.remove_user_from_chat(user_id=creator_id, remove_user_id=creator_id, chat_id=chat.id)
+        assert (await chat_repo.get_chat(chat.id)).members_ids == []
+
+        with pytest.raises(ChatNotFound):
+            await chat_repo.get_chat(-1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("insert_chat_test_records")
+async def test_iter_chat_ids_in_chunks(
+    chat_repo: ChatRepositoryInterface,
+    creator_id: int,
+) -> None:
+    created_ids = [
+        (await chat_repo.create_chat(dto=CreateChatDTO(name="test_chat", chat_type=ChatType.GROUP, creator_id=creator_id))).id
+        for _ in range(5)
+    ]
+
+    chunks = [ids async for ids in chat_repo.iter_chat_ids(chunk_size=2)]
+
+    assert all(len(ids) <= 2 for ids in chunks)
+    all_ids = [chat_id for ids in chunks for chat_id in ids]
+    assert all_ids == sorted(all_ids)
+    assert set(created_ids) <= set(all_ids)
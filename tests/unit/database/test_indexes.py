@@ -0,0 +1,51 @@
+import pytest
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.dialects import postgresql
+
+from src.database.postgresql.connection import SessionWrapper
+
+from src.data.models import Chat, Message, User, UserGroup
+
+
+async def explain(async_session_wrapper: SessionWrapper, stmt: Select) -> str:
+    sql = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    async with async_session_wrapper.t() as session:
+        # Test tables are tiny, so the planner has to be pushed off sequential scans
+        await session.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = await session.scalars(text(f"EXPLAIN {sql}"))
+        return "\n".join(plan)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "stmt, index_name",
+    [
+        (
+            select(Message).where(Message.chat_id == 1).order_by(Message.timestamp, Message.id).limit(50),
+            "ix_message_chat_id_timestamp_id",
+        ),
+        (
+            select(UserGroup).where(UserGroup.group_id == 1),
+            "ix_user_group_group_id_user_id",
+        ),
+        (
+            select(func.count()).select_from(UserGroup).where(UserGroup.group_id == 1),
+            "ix_user_group_group_id_user_id",
+        ),
+        (
+            select(Chat).where(Chat.group_id == 1),
+            "ix_chat_group_id",
+        ),
+        (
+            select(User).where(User.name == "Sergey"),
+            "user_name_key",
+        ),
+    ],
+)
+async def test_lookup_uses_index(
+    async_session_wrapper: SessionWrapper, stmt: Select, index_name: str
+) -> None:
+    plan = await explain(async_session_wrapper, stmt)
+    assert index_name in plan
+    assert "Seq Scan" not in plan
@@ -0,0 +1,44 @@
+import pytest
+
+from src.core.chat_manager.delivery import LocalDelivery
+from src.core.message_buffer import RecentMessagesBuffer
+from src.core.storage import ConnectionStorage
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(data)
+
+    async def send(self, message: dict) -> None:
+        self.sent.append(message["text"])
+
+
+@pytest.fixture
+def storage() -> ConnectionStorage:
+    return ConnectionStorage()
+
+
+@pytest.fixture
+def buffer() -> RecentMessagesBuffer:
+    return RecentMessagesBuffer(depth=10, max_messages=100)
+
+
+@pytest.fixture
+def local_delivery(storage: ConnectionStorage, buffer: RecentMessagesBuffer) -> LocalDelivery:
+    return LocalDelivery(storage, buffer)
+
+
+@pytest.fixture
+def connection() -> FakeConnection:
+    return FakeConnection()
+
+
+@pytest.fixture
+def connections(storage: ConnectionStorage) -> dict[int, FakeConnection]:
+    connections = {1000: FakeConnection(), 1001: FakeConnection()}
+    for user_id, connection in connections.items():
+        storage.add_user_connection(228, user_id, connection)
+    return connections
@@ -0,0 +1,163 @@
+import asyncio
+import json
+from typing import Optional
+
+import pytest
+
+from src.core.chat_manager.delivery import LocalDelivery
+from src.core.connection_writer import SendConfirmation
+from src.core.fanout_bus.in_process import InProcessFanoutBus
+from src.core.fanout_bus.postgresql import NOTIFY_PAYLOAD_LIMIT, PostgresFanoutBus
+from src.core.message_buffer import RecentMessagesBuffer
+from src.core.schemas.delivery import FanoutEvent
+from src.core.schemas.frame import FrameDTO
+from src.core.schemas.message import MessageDTO
+from src.core.storage import ConnectionStorage
+from src.data.message_repo.exception import MessageNotFound
+
+
+def make_message(message_id: int, text: str = "Hello!") -> MessageDTO:
+    return MessageDTO(id=message_id, chat_id=228, sender_id=1000, text=text, timestamp=message_id)
+
+
+def make_bus(storage: ConnectionStorage) -> PostgresFanoutBus:
+    async def load_message(message_id: int) -> MessageDTO:
+        return make_message(message_id)
+
+    return PostgresFanoutBus("postgresql://", storage, load_message)
+
+
+def notify(bus: PostgresFanoutBus, **data) -> None:
+    bus._on_notification(None, 0, "chat_fanout", json.dumps({"worker": "remote", **data}))
+
+
+@pytest.mark.asyncio
+async def test_in_process_bus_delivers_to_local_connections(
+    storage: ConnectionStorage,
+    local_delivery: LocalDelivery,
+    buffer: RecentMessagesBuffer,
+    connections,
+) -> None:
+    bus = InProcessFanoutBus(storage)
+    await bus.start(local_delivery.handle)
+
+    await bus.publish(FanoutEvent(message=make_message(1)))
+    await bus.publish(FanoutEvent(message=make_message(1), receipt=True, user_id=1000))
+    await asyncio.sleep(0)
+
+    assert connections[1000].sent == [
+        FrameDTO.for_message(make_message(1)).dump(),
+        FrameDTO.for_receipt(make_message(1)).dump(),
+    ]
+    assert connections[1001].sent == [FrameDTO.for_message(make_message(1)).dump()]
+    assert [message.read for message in buffer.get_latest(228, limit=1)] == [True]
+    assert bus.is_online(228, 1001)
+    assert not bus.is_online(228, 1002)
+    assert not bus.is_online(229, 1000)
+
+
+def test_oversized_event_published_by_reference(storage: ConnectionStorage) -> None:
+    bus = make_bus(storage)
+
+    payload = json.loads(bus._encode_event(FanoutEvent(message=make_message(1))))
+    assert payload["type"] == "event"
+
+    large = FanoutEvent(message=make_message(2, "x" * NOTIFY_PAYLOAD_LIMIT), user_id=1001)
+    payload = json.loads(bus._encode_event(large))
+    assert payload == {
+        "worker": bus._worker_id,
+        "type": "event_ref",
+        "message_id": 2,
+        "receipt": False,
+        "user_id": 1001,
+        "ack": None,
+    }
+
+
+def test_remote_presence_tracked_until_worker_leaves(storage: ConnectionStorage) -> None:
+    bus = make_bus(storage)
+
+    notify(bus, type="snapshot", reset=True, members=[[228, 1000], [228, 1001]])
+    notify(bus, type="presence", chat_id=228, user_id=1001, online=False)
+    notify(bus, type="presence", chat_id=229, user_id=1002, online=True)
+    assert bus.is_online(228, 1000)
+    assert not bus.is_online(228, 1001)
+    assert bus.is_online(229, 1002)
+
+    notify(bus, type="bye")
+    assert not bus.is_online(228, 1000)
+    assert bus.get_stats()["workers"] == 1
+
+
+
+def test_chat_changes_passed_between_workers(storage: ConnectionStorage) -> None:
+    changed = []
+
+    async def load_message(message_id: int) -> MessageDTO:
+        return make_message(message_id)
+
+    bus = PostgresFanoutBus("postgresql://", storage, load_message, on_chat_changed=changed.append)
+    bus.chat_changed(228)
+    assert json.loads(bus._outgoing.get_nowait()) == {
+        "worker": bus._worker_id,
+        "type": "chat_changed",
+        "chat_id": 228,
+    }
+
+    notify(bus, type="chat_changed", chat_id=229)
+    assert changed == [229]
+
+
+@pytest.mark.asyncio
+async def test_event_of_missing_message_skipped(storage: ConnectionStorage, caplog) -> None:
+    async def load_message(message_id: int) -> MessageDTO:
+        if message_id == 1:
+            raise MessageNotFound
+        return make_message(message_id)
+
+    handled = []
+
+    async def handle(event: FanoutEvent, confirmation: Optional[SendConfirmation]) -> None:
+        handled.append(event.message.id)
+
+    bus = PostgresFanoutBus("postgresql://", storage, load_message)
+    bus._handler = handle
+    dispatching = asyncio.create_task(bus._dispatch_loop())
+    for message_id in (1, 2):
+        notify(bus, type="event_ref", message_id=message_id, receipt=False, user_id=None)
+    await asyncio.sleep(0.01)
+    dispatching.cancel()
+
+    assert handled == [2]
+    assert [record.levelname for record in caplog.records] == ["WARNING"]
+
+
+@pytest.mark.asyncio
+async def test_delivery_confirmed_by_every_worker(
+    storage: ConnectionStorage, local_delivery: LocalDelivery, connections
+) -> None:
+    bus = make_bus(storage)
+    bus._handler = local_delivery.handle
+    notify(bus, type="hello")
+    notify(bus, type="heartbeat", worker="other")
+
+    confirmation = await bus.deliver(FanoutEvent(message=make_message(1)))
+    payloads = [json.loads(bus._outgoing.get_nowait()) for _ in range(bus._outgoing.qsize())]
+    [ack_id] = [payload["ack"] for payload in payloads if payload["type"] == "event"]
+    notify(bus, type="ack", target=bus._worker_id, ack=ack_id, sent=True)
+    # Acknowledgements of other workers' events are not ours
+    notify(bus, type="ack", target="other", ack=ack_id, sent=False, worker="other")
+    await asyncio.sleep(0)
+    assert ack_id in bus._pending_acks
+
+    notify(bus, type="ack", target=bus._worker_id, ack=ack_id, sent=True, worker="other")
+    assert await confirmation.wait()
+    assert connections[1001].sent == [FrameDTO.for_message(make_message(1)).dump()]
+    assert not bus._pending_acks
+
+    confirmation = await bus.deliver(FanoutEvent(message=make_message(2)))
+    notify(bus, type="ack", target=bus._worker_id, ack=ack_id + 1, sent=True)
+    # Frames the gone worker had queued are not known to be sent
+    notify(bus, type="bye", worker="other")
+    assert not await confirmation.wait()
+    assert not bus._pending_acks
@@ -0,0 +1,52 @@
+import pytest
+import pytest_asyncio
+
+from src.core.schemas.chat import ChatDTO, ChatType, CreateChatDTO
+from src.core.schemas.user import CreateUserDTO
+from src.data.chat_repo.memory import InMemoryChatRepository
+from src.data.memory_store import MemoryStore
+from src.data.message_repo.memory import InMemoryMessageRepository
+from src.data.outbox_repo.memory import InMemoryOutboxRepository
+from src.data.user_repo.memory import InMemoryUserRepository
+
+
+@pytest.fixture
+def store() -> MemoryStore:
+    return MemoryStore()
+
+
+@pytest.fixture
+def user_repo(store: MemoryStore) -> InMemoryUserRepository:
+    return InMemoryUserRepository(store)
+
+
+@pytest.fixture
+def chat_repo(store: MemoryStore) -> InMemoryChatRepository:
+    return InMemoryChatRepository(store)
+
+
+@pytest.fixture
+def message_repo(store: MemoryStore) -> InMemoryMessageRepository:
+    return InMemoryMessageRepository(store)
+
+
+@pytest.fixture
+def outbox_repo(store: MemoryStore) -> InMemoryOutboxRepository:
+    return InMemoryOutboxRepository(store)
+
+
+@pytest_asyncio.fixture
+async def group_chat(
+    user_repo: InMemoryUserRepository, chat_repo: InMemoryChatRepository
+) -> ChatDTO:
+    """Chat of Sergey, Arina and Vlad created by Sergey."""
+    user_ids = [
+        (await user_repo.create_user(CreateUserDTO(name=name, email="some_email", password="123"))).id
+        for name in ("Sergey", "Arina", "Vlad")
+    ]
+    chat = await chat_repo.create_chat(
+        CreateChatDTO(name="some_chat", chat_type=ChatType.GROUP, creator_id=user_ids[0])
+    )
+    for user_id in user_ids:
+        await chat_repo.add_user_to_chat(user_ids[0], user_id, chat.id)
+    return await chat_repo.get_chat(chat.id)
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from src.core.chat_manager.delivery import LocalDelivery
+from src.core.chat_manager.fastapi import FastapiChatManager
+from src.core.fanout_bus.in_process import InProcessFanoutBus
+from src.core.schemas.chat import ChatDTO, ChatType, CreateChatDTO
+from src.core.schemas.frame import FrameDTO
+from src.core.schemas.message import MessageCreateDTO
+from src.core.schemas.user import CreateUserDTO
+from src.core.storage import ConnectionStorage
+from src.data.chat_repo.exception import (
+    ChatNotFound,
+    NotCreatorError,
+    PrivateChatError,
+    UserNotFound,
+)
+from src.data.repositories import memory_repositories
+from src.data.user_repo.exceptions import UserAlreadyExists
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+
+    async def send(self, message: dict) -> None:
+        self.sent.append(message["text"])
+
+
+@pytest.mark.asyncio
+async def test_users_and_chats(user_repo, chat_repo, group_chat: ChatDTO) -> None:
+    sergey, arina, vlad = group_chat.members_ids
+    assert (await user_repo.get_user_by_login("Arina")).id == arina
+    with pytest.raises(UserAlreadyExists):
+        await user_repo.create_user(CreateUserDTO(name="Arina", email="some_email", password="123"))
+
+    with pytest.raises(NotCreatorError):
+        await chat_repo.add_user_to_chat(arina, vlad, group_chat.id)
+    with pytest.raises(UserNotFound):
+        await chat_repo.add_user_to_chat(sergey, vlad, group_chat.id)
+    with pytest.raises(ChatNotFound):
+        await chat_repo.get_chat(group_chat.id + 1)
+
+    await chat_repo.remove_user_from_chat(sergey, vlad, group_chat.id)
+    assert (await chat_repo.get_chat(group_chat.id)).members_ids == [sergey, arina]
+
+    private = await chat_repo.create_chat(
+        CreateChatDTO(name="private", chat_type=ChatType.PRIVATE, creator_id=sergey)
+    )
+    await chat_repo.add_user_to_chat(sergey, sergey, private.id)
+    await chat_repo.add_user_to_chat(sergey, arina, private.id)
+    with pytest.raises(PrivateChatError):
+        await chat_repo.add_user_to_chat(sergey, vlad, private.id)
+    assert [ids async for ids in chat_repo.iter_chat_ids(chunk_size=1)] == [[group_chat.id], [private.id]]
+
+
+@pytest.mark.asyncio
+async def test_get_message_history_keyset(message_repo) -> None:
+    ids = []
+    for timestamp in (10, 20, 20, 30, 40):
+        message = await message_repo.save_message(
+            dto=MessageCreateDTO(chat_id=228, sender_id=228, text="Hello!", timestamp=timestamp)
+        )
+        ids.append(message.id)
+
+    latest = await message_repo.get_message_history(228, limit=2, latest=True)
+    assert [msg.id for msg in latest.items] == ids[3:]
+    assert latest.total is None
+
+    before = await message_repo.get_message_history(228, limit=2, before_id=ids[3])
+    assert [msg.id for msg in before.items] == ids[1:3]
+
+    after = await message_repo.get_message_history(228, limit=2, after_id=ids[1], with_total=True)
+    assert [msg.id for msg in after.items] == ids[2:4]
+    assert after.total == 5
+
+    page = await message_repo.get_message_history(228, limit=2, offset=1)
+    assert [msg.id for msg in page.items] == ids[1:3]
+
+    await message_repo.mark_messages_as_read(ids[:1])
+    await message_repo.mark_chat_as_read(chat_id=228, up_to_id=ids[2])
+    history = await message_repo.get_message_history(228)
+    assert [msg.read for msg in history.items] == [True, True, True, False, False]
+
+    foreign = await message_repo.save_message(
+        dto=MessageCreateDTO(chat_id=229, sender_id=228, text="Hello!", timestamp=25)
+    )
+    assert (await message_repo.get_message_history(228, before_id=foreign.id)).items == []
+    assert (await message_repo.get_message_history(228, after_id=foreign.id)).items == []
+
+
+@pytest.mark.asyncio
+async def test_offline_members_get_outbox_deliveries(
+    store, message_repo, outbox_repo, group_chat: ChatDTO
+) -> None:
+    sergey, arina, vlad = group_chat.members_ids
+    storage = ConnectionStorage()
+    bus = InProcessFanoutBus(storage)
+    await bus.start(LocalDelivery(storage).handle)
+    chat_manager = FastapiChatManager(
+        connection_storage=storage,
+        repositories=memory_repositories(store),
+        fanout_bus=bus,
+    )
+    connection = FakeConnection()
+    storage.add_user_connection(group_chat.id, arina, connection)
+
+    message = await message_repo.save_message(
+        MessageCreateDTO(chat_id=group_chat.id, sender_id=arina, text="Hello!", timestamp=1)
+    )
+    await chat_manager._send_to_all_members(group_chat.id, message)
+    await asyncio.sleep(0)
+
+    assert connection.sent == [FrameDTO.for_message(message).dump()]
+    assert await outbox_repo.count_deliveries() == 2
+    assert await outbox_repo.get_undelivered_message_ids([message.id, message.id + 1]) == {message.id}
+    deliveries = await outbox_repo.pop_deliveries(group_chat.id, vlad)
+    assert [delivery.message.id for delivery in deliveries] == [message.id]
+    assert await outbox_repo.count_deliveries() == 1
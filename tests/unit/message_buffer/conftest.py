@@ -0,0 +1,9 @@
+import pytest
+
+from src.core.message_buffer import RecentMessagesBuffer
+
+
+@pytest.fixture
+def buffer() -> RecentMessagesBuffer:
+    return RecentMessagesBuffer(depth=3, max_messages=5)
+
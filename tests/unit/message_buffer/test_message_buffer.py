@@ -0,0 +1,58 @@
+from src.core.message_buffer import RecentMessagesBuffer
+from src.core.schemas.message import MessageDTO
+
+
+def make_message(message_id: int, chat_id: int = 228) -> MessageDTO:
+    return MessageDTO(id=message_id, chat_id=chat_id, sender_id=1000, text=f"Hello {message_id}!", timestamp=message_id)
+
+
+def ids(messages) -> list[int]:
+    return [message.id for message in messages]
+
+
+def test_appended_tail_served_after_known_message(buffer: RecentMessagesBuffer) -> None:
+    for message_id in (1, 2, 3, 4):
+        buffer.append(make_message(message_id))
+
+    assert ids(buffer.get_latest(228, limit=3)) == [2, 3, 4]
+    assert ids(buffer.get_latest(228, limit=3, after_id=2)) == [3, 4]
+    assert buffer.get_latest(228, limit=3, after_id=1) is None
+    assert buffer.get_latest(228, limit=5) is None
+    assert buffer.get_stats() == {"chats": 1, "messages": 3, "hits": 2, "misses": 2}
+
+
+def test_seeded_complete_history_served_for_any_limit(buffer: RecentMessagesBuffer) -> None:
+    buffer.seed(228, [make_message(1), make_message(2)], complete=True)
+    assert ids(buffer.get_latest(228, limit=3)) == [1, 2]
+
+    buffer.append(make_message(2))
+    buffer.append(make_message(3))
+    buffer.append(make_message(4))
+    assert buffer.get_latest(228, limit=4) is None
+    assert ids(buffer.get_latest(228, limit=3)) == [2, 3, 4]
+
+
+def test_least_recently_used_chat_evicted(buffer: RecentMessagesBuffer) -> None:
+    for message_id in (1, 2, 3):
+        buffer.append(make_message(message_id, chat_id=1))
+    buffer.append(make_message(4, chat_id=2))
+    buffer.get_latest(1, limit=1)
+    for message_id in (5, 6):
+        buffer.append(make_message(message_id, chat_id=3))
+
+    assert buffer.get_latest(2, limit=1) is None
+    assert ids(buffer.get_latest(1, limit=1)) == [3]
+
+
+def test_mark_read(buffer: RecentMessagesBuffer) -> None:
+    buffer.append(make_message(1))
+    buffer.mark_read(228, 1)
+    assert buffer.get_latest(228, limit=1)[0].read
+
+
+def test_zero_limit_gives_nothing(buffer: RecentMessagesBuffer) -> None:
+    for message_id in (1, 2, 3):
+        buffer.append(make_message(message_id))
+
+    assert buffer.get_latest(228, limit=0) == []
+    assert buffer.get_latest(228, limit=0, after_id=1) == []
@@ -31,6 +31,7 @@ async def insert_test_records(async_session_wrapper: SessionWrapper) -> AsyncGen
         await session.flush()
 
         session.add(Chat(id=228, name="some_chat", chat_type=ChatType.PRIVATE.value, group_id=1337))
+        session.add(Chat(id=229, name="other_chat", chat_type=ChatType.GROUP.value, group_id=1337))
         await session.flush()
 
         await session.commit()
@@ -39,7 +40,7 @@ async def insert_test_records(async_session_wrapper: SessionWrapper) -> AsyncGen
 
     async with async_session_wrapper.t() as session:
         await session.execute(delete(Message).where(Message.text == "Hello!"))
-        await session.execute(delete(Chat).where(Chat.id == 228))
+        await session.execute(delete(Chat).where(Chat.id.in_((228, 229))))
         await session.execute(delete(Group).where(Group.id == 1337))
         await session.execute(delete(User).where(User.id == 228))
 
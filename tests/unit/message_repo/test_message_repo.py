@@ -1,7 +1,10 @@
+import asyncio
+
 import pytest
 
 from sqlalchemy import select
 
+from src.data.message_repo.batching import BatchedMessageWriter, ReadReceiptAggregator
 from src.data.message_repo.interface import MessageRepositoryInterface
 
 from src.core.schemas.message import MessageCreateDTO
@@ -27,4 +30,99 @@ async def test_save_message_success(message_repo: MessageRepositoryInterface, as
     )
     async with async_session_wrapper.t() as session:
         res = await session.scalars(select(Message).where(Message.text == "Hello!"))
-        assert res.fetchall()
\ No newline at end of file
+        assert res.fetchall()
+
+
+@pytest.mark.usefixtures("insert_test_records")
+@pytest.mark.asyncio
+async def test_get_message_history_keyset(message_repo: MessageRepositoryInterface) -> None:
+    ids = []
+    for timestamp in (10, 20, 20, 30, 40):
+        message = await message_repo.save_message(
+            dto=MessageCreateDTO(chat_id=228, sender_id=228, text="Hello!", timestamp=timestamp)
+        )
+        ids.append(message.id)
+
+    latest = await message_repo.get_message_history(228, limit=2, latest=True)
+    assert [msg.id for msg in latest.items] == ids[3:]
+    assert latest.total is None
+
+    before = await message_repo.get_message_history(228, limit=2, before_id=ids[3])
+    assert [msg.id for msg in before.items] == ids[1:3]
+
+    after = await message_repo.get_message_history(228, limit=2, after_id=ids[1], with_total=True)
+    assert [msg.id for msg in after.items] == ids[2:4]
+    assert after.total == 5
+
+
+@pytest.mark.usefixtures("insert_test_records")
+@pytest.mark.asyncio
+async def test_get_message_history_ignores_cursor_of_other_chat(message_repo: MessageRepositoryInterface) -> None:
+    for timestamp in (10, 20, 30):
+        await message_repo.save_message(
+            dto=MessageCreateDTO(chat_id=228, sender_id=228, text="Hello!", timestamp=timestamp)
+        )
+    foreign = await message_repo.save_message(
+        dto=MessageCreateDTO(chat_id=229, sender_id=228, text="Hello!", timestamp=25)
+    )
+
+    before = await message_repo.get_message_history(228, limit=10, before_id=foreign.id)
+    after = await message_repo.get_message_history(228, limit=10, after_id=foreign.id)
+    assert before.items == []
+    assert after.items == []
+
+
+@pytest.mark.usefixtures("insert_test_records")
+@pytest.mark.asyncio
+async def test_batched_message_writer(async_session_wrapper: SessionWrapper) -> None:
+    writer = BatchedMessageWriter(async_session_wrapper, max_batch_size=3, max_delay_sec=0.01)
+    writer.start()
+    messages = await asyncio.gather(
+        *(
+            writer.save_message(MessageCreateDTO(chat_id=228, sender_id=228, text="Hello!", timestamp=timestamp))
+            for timestamp in range(5)
+        )
+    )
+    await writer.stop()
+
+    assert [message.timestamp for message in messages] == list(range(5))
+    assert len({message.id for message in messages}) == 5
+    assert writer.get_stats()["batches"] == 2
+    async with async_session_wrapper.t() as session:
+        res = await session.scalars(select(Message).where(Message.id.in_([message.id for message in messages])))
+        assert {model.timestamp for model in res} == set(range(5))
+
+
+@pytest.mark.usefixtures("insert_test_records")
+@pytest.mark.asyncio
+async def test_mark_messages_as_read(message_repo: MessageRepositoryInterface, async_session_wrapper: SessionWrapper) -> None:
+    ids = []
+    for timestamp in range(4):
+        message = await message_repo.save_message(
+            dto=MessageCreateDTO(chat_id=228, sender_id=228, text="Hello!", timestamp=timestamp)
+        )
+        ids.append(message.id)
+
+    await message_repo.mark_messages_as_read(ids[:1])
+    await message_repo.mark_chat_as_read(chat_id=228, up_to_id=ids[2])
+
+    async with async_session_wrapper.t() as session:
+        res = await session.scalars(select(Message).where(Message.id.in_(ids)).order_by(Message.id))
+        assert [model.read for model in res] == [True, True, True, False]
+
+
+@pytest.mark.usefixtures("insert_test_records")
+@pytest.mark.asyncio
+async def test_read_receipt_aggregator(message_repo: MessageRepositoryInterface, async_session_wrapper: SessionWrapper) -> None:
+    message = await message_repo.save_message(
+        dto=MessageCreateDTO(chat_id=228, sender_id=228, text="Hello!", timestamp=1)
+    )
+    read_receipts = ReadReceiptAggregator(async_session_wrapper, max_batch_size=100, max_delay_sec=10)
+    read_receipts.start()
+    read_receipts.mark_message_as_read(message.id)
+    read_receipts.mark_message_as_read(message.id)
+    await read_receipts.stop()
+
+    assert read_receipts.get_stats()["batches"] == 1
+    async with async_session_wrapper.t() as session:
+        assert (await session.get_one(Message, message.id)).read
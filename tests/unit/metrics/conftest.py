@@ -0,0 +1,8 @@
+import pytest
+
+from src.core.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
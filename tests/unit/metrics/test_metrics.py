@@ -0,0 +1,43 @@
+import pytest
+
+from src.core.metrics import MetricsRegistry
+from src.data import base_repo
+from src.data.base_repo import BasePostgresAsyncRepository
+
+
+def test_histogram_and_gauge_rendering(registry: MetricsRegistry) -> None:
+    histogram = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, "save")
+    registry.gauge("open_sockets", "Open sockets", lambda: [(("228",), 3)], ("chat_id",))
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="save",le="0.1"} 1',
+        'latency_seconds_bucket{stage="save",le="1.0"} 2',
+        'latency_seconds_bucket{stage="save",le="+Inf"} 3',
+        'latency_seconds_sum{stage="save"} 5.55',
+        'latency_seconds_count{stage="save"} 3',
+        "# HELP open_sockets Open sockets",
+        "# TYPE open_sockets gauge",
+        'open_sockets{chat_id="228"} 3',
+    ]
+    with pytest.raises(ValueError):
+        registry.gauge("open_sockets", "Open sockets", lambda: 0)
+
+
+@pytest.mark.asyncio
+async def test_repository_methods_are_timed(registry: MetricsRegistry, monkeypatch) -> None:
+    # A histogram of its own, the process wide one is left alone
+    db_query_seconds = registry.histogram("db_query_seconds", "Latency", ("repository", "method"))
+    monkeypatch.setattr(base_repo, "db_query_seconds", db_query_seconds)
+
+    class TimedRepository(BasePostgresAsyncRepository[int]):
+        async def get_answer(self) -> int:
+            return 42
+
+    assert await TimedRepository(session=None).get_answer() == 42
+    assert 'db_query_seconds_count{repository="TimedRepository",method="get_answer"} 1' in (
+        db_query_seconds.render()
+    )
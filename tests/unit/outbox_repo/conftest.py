@@ -0,0 +1,57 @@
+import pytest_asyncio
+
+from sqlalchemy import delete
+
+from typing import AsyncGenerator
+
+from src.database.postgresql.connection import SessionWrapper
+
+from src.data.outbox_repo.postgresql import OutboxRepository
+from src.data.outbox_repo.interface import OutboxRepositoryInterface
+
+from src.data.models import DeliveryOutbox, Message, User, Group, Chat
+
+from src.core.schemas.chat import ChatType
+
+
+@pytest_asyncio.fixture
+async def outbox_repo(async_session_wrapper: SessionWrapper) -> AsyncGenerator[None, OutboxRepositoryInterface]:
+    async with async_session_wrapper.t() as session:
+        yield OutboxRepository(session)
+
+
+@pytest_asyncio.fixture
+async def insert_test_records(async_session_wrapper: SessionWrapper) -> AsyncGenerator[None, None]:
+    async with async_session_wrapper.t() as session:
+        session.add_all(
+            [
+                User(id=228, name="Sergey", email="some_email", password="123"),
+                User(id=229, name="Arina", email="some_email", password="123"),
+            ]
+        )
+        await session.flush()
+
+        session.add(Group(id=1337, name="some_group", creator_id=228))
+        await session.flush()
+
+        session.add(Chat(id=228, name="some_chat", chat_type=ChatType.GROUP.value, group_id=1337))
+        await session.flush()
+
+        session.add_all(
+            [
+                Message(id=1, chat_id=228, sender_id=228, text="Hello!", timestamp=1, read=False),
+                Message(id=2, chat_id=228, sender_id=228, text="Hello again!", timestamp=2, read=False),
+            ]
+        )
+        await session.commit()
+
+    yield
+
+    async with async_session_wrapper.t() as session:
+        await session.execute(delete(DeliveryOutbox).where(DeliveryOutbox.chat_id == 228))
+        await session.execute(delete(Message).where(Message.chat_id == 228))
+        await session.execute(delete(Chat).where(Chat.id == 228))
+        await session.execute(delete(Group).where(Group.id == 1337))
+        await session.execute(delete(User).where(User.id.in_((228, 229))))
+
+        await session.commit()
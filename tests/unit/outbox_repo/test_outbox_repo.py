@@ -0,0 +1,30 @@
+import pytest
+
+from src.data.outbox_repo.interface import OutboxRepositoryInterface
+
+
+@pytest.mark.usefixtures("insert_test_records")
+@pytest.mark.asyncio
+async def test_pop_deliveries_drains_outbox(outbox_repo: OutboxRepositoryInterface) -> None:
+    await outbox_repo.add_deliveries(chat_id=228, message_id=2, recipients_ids=[229])
+    await outbox_repo.add_deliveries(chat_id=228, message_id=1, recipients_ids=[228, 229])
+    await outbox_repo.add_deliveries(chat_id=228, message_id=1, recipients_ids=[229])
+
+    deliveries = await outbox_repo.pop_deliveries(chat_id=228, user_id=229)
+
+    assert [delivery.message.id for delivery in deliveries] == [1, 2]
+    assert deliveries[0].message.text == "Hello!"
+    assert not await outbox_repo.pop_deliveries(chat_id=228, user_id=229)
+    assert await outbox_repo.get_undelivered_message_ids([1, 2]) == {1}
+
+
+@pytest.mark.usefixtures("insert_test_records")
+@pytest.mark.asyncio
+async def test_receipt_deliveries_do_not_block_read_status(outbox_repo: OutboxRepositoryInterface) -> None:
+    await outbox_repo.add_deliveries(chat_id=228, message_id=1, recipients_ids=[228], receipt=True)
+
+    assert await outbox_repo.get_undelivered_message_ids([1]) == set()
+    assert await outbox_repo.count_deliveries() == 1
+
+    deliveries = await outbox_repo.pop_deliveries(chat_id=228, user_id=228)
+    assert deliveries[0].receipt
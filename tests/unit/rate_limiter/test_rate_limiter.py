@@ -0,0 +1,39 @@
+from src.core.rate_limiter import MessageRateLimiter, TokenBucketLimiter
+
+
+def test_bucket_refills_and_idle_buckets_expire(clock) -> None:
+    limiter = TokenBucketLimiter(rate_per_sec=2, burst=3)
+    assert [limiter.acquire(1000) for _ in range(4)] == [True, True, True, False]
+
+    clock.now += 0.5
+    assert limiter.acquire(1000)
+    assert not limiter.acquire(1000)
+
+    limiter.acquire(1001)
+    clock.now += 1.5
+    limiter.acquire(1002)
+    # 1000 and 1001 had time to refill completely
+    assert len(limiter) == 1
+
+
+def test_user_and_chat_limits(clock) -> None:
+    limiter = MessageRateLimiter(
+        user_rate_per_sec=1, user_burst=2, chat_rate_per_sec=1, chat_burst=3
+    )
+    assert [limiter.allow(228, 1000) for _ in range(3)] == [True, True, False]
+    assert limiter.allow(228, 1001)
+    # The chat is out of tokens, 1001 keeps its own for later
+    assert not limiter.allow(228, 1001)
+    assert limiter.allow(229, 1001)
+    assert limiter.get_stats() == {
+        "user_buckets": 2,
+        "chat_buckets": 2,
+        "throttled_users": 1,
+        "throttled_chats": 1,
+    }
+
+
+def test_zero_rate_disables_limit(clock) -> None:
+    limiter = TokenBucketLimiter(rate_per_sec=0, burst=1)
+    assert all(limiter.acquire(1000) for _ in range(100))
+    assert len(limiter) == 0
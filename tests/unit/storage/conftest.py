@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from src.core.storage import ConnectionStorage
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+        self.unblocked = asyncio.Event()
+        self.unblocked.set()
+
+    async def send(self, message: dict) -> None:
+        await self.unblocked.wait()
+        self.sent.append(message)
+
+
+@pytest.fixture
+def chat_id() -> int:
+    return 228
+
+
+@pytest.fixture
+def storage() -> ConnectionStorage:
+    return ConnectionStorage()
+
+
+@pytest.fixture
+def connection() -> FakeConnection:
+    return FakeConnection()
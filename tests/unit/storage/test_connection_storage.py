@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from src.core.connection_writer import CHAT_GONE_CLOSE_CODE
+from src.core.storage import ConnectionStorage
+
+
+def test_add_and_remove_user_connection(storage: ConnectionStorage, chat_id: int) -> None:
+    connection = object()
+    storage.add_user_connection(chat_id, 1000, connection)
+    assert [writer.connection for writer in storage.get_user_connections(chat_id, 1000)] == [connection]
+    assert storage.is_connected(chat_id, 1000)
+    assert storage.get_stats() == {"chats": 1, "connections": 1, "queued": 0}
+
+    assert storage.remove_user_connection(chat_id, 1000)
+    assert storage.get_user_connections(chat_id, 1000) == []
+    assert not storage.is_connected(chat_id, 1000)
+    # Chat state is freed with the last connection
+    assert storage.get_stats() == {"chats": 0, "connections": 0, "queued": 0}
+
+
+def test_several_devices_of_user(storage: ConnectionStorage, chat_id: int) -> None:
+    phone, laptop, tablet = object(), object(), object()
+    for connection in (phone, laptop, tablet):
+        storage.add_user_connection(chat_id, 1000, connection)
+    storage.add_user_connection(chat_id, 1001, object())
+    assert len(storage.get_connections(chat_id)) == 4
+    assert storage.get_stats()["connections"] == 4
+
+    assert not storage.remove_user_connection(chat_id, 1000, laptop)
+    assert {writer.connection for writer in storage.get_user_connections(chat_id, 1000)} == {phone, tablet}
+
+    assert not storage.remove_user_connection(chat_id, 1000, phone)
+    assert [writer.connection for writer in storage.get_user_connections(chat_id, 1000)] == [tablet]
+    assert storage.is_connected(chat_id, 1000)
+
+    assert storage.remove_user_connection(chat_id, 1000, tablet)
+    assert not storage.is_connected(chat_id, 1000)
+    assert storage.get_members() == [(chat_id, 1001)]
+
+
+@pytest.mark.asyncio
+async def test_drop_chat_closes_sockets(storage: ConnectionStorage, chat_id: int, connection) -> None:
+    storage.add_user_connection(chat_id, 1000, connection)
+
+    assert storage.drop_chat(chat_id) == [1000]
+    await asyncio.sleep(0.01)
+
+    assert connection.sent == [{"type": "websocket.close", "code": CHAT_GONE_CLOSE_CODE, "reason": ""}]
+    assert not storage.is_connected(chat_id, 1000)
+    assert storage.drop_chat(chat_id) == []
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from src.core.connection_writer import (
+    OVERFLOW_CLOSE_CODE,
+    ConnectionWriter,
+    OverflowPolicy,
+    SendConfirmation,
+)
+from src.core.schemas.delivery import DeliveryDTO
+from src.core.schemas.message import MessageDTO
+
+
+def make_delivery(message_id: int) -> DeliveryDTO:
+    message = MessageDTO(id=message_id, chat_id=228, sender_id=1000, text=f"Hello {message_id}!", timestamp=message_id)
+    return DeliveryDTO(message=message)
+
+
+def texts(connection) -> list[str]:
+    return [message.get("text") for message in connection.sent if message["type"] == "websocket.send"]
+
+
+async def fill_stuck_writer(writer: ConnectionWriter, connection, count: int) -> None:
+    connection.unblocked.clear()
+    writer.put_text("Hello 1!", make_delivery(1))
+    await asyncio.sleep(0)
+    for message_id in range(2, count + 1):
+        writer.put_text(f"Hello {message_id}!", make_delivery(message_id))
+
+
+@pytest.mark.asyncio
+async def test_frames_sent_in_order(connection) -> None:
+    writer = ConnectionWriter(228, 1000, connection, max_queue_size=10)
+
+    for message_id in (1, 2, 3):
+        assert writer.put_text(f"Hello {message_id}!")
+    await asyncio.sleep(0)
+
+    assert texts(connection) == ["Hello 1!", "Hello 2!", "Hello 3!"]
+    assert writer.get_stats() == {
+        "depth": 0, "max_depth": 3, "sent": 3, "dropped": 0
+    }
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_on_overflow(connection) -> None:
+    lost = []
+
+    async def lost_frames_handler(chat_id: int, user_id: int, deliveries: list[DeliveryDTO]) -> None:
+        lost.extend(deliveries)
+
+    writer = ConnectionWriter(
+        228, 1000, connection, max_queue_size=2,
+        overflow_policy=OverflowPolicy.DROP_OLDEST, lost_frames_handler=lost_frames_handler,
+    )
+    confirmation = SendConfirmation()
+
+    connection.unblocked.clear()
+    writer.put_text("Hello 1!", make_delivery(1))
+    await asyncio.sleep(0)
+    writer.put_text("Hello 2!", make_delivery(2), confirmation)
+    for message_id in (3, 4):
+        writer.put_text(f"Hello {message_id}!", make_delivery(message_id))
+    connection.unblocked.set()
+    await asyncio.sleep(0.01)
+
+    # The first frame was already being sent when the queue overflowed
+    assert texts(connection) == ["Hello 1!", "Hello 3!", "Hello 4!"]
+    assert writer.dropped == 1
+    assert not writer.closed
+    # The dropped message is returned to the outbox, not lost
+    assert lost == [make_delivery(2)]
+    assert not await confirmation.wait()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_on_overflow(connection) -> None:
+    lost = []
+
+    async def lost_frames_handler(chat_id: int, user_id: int, deliveries: list[DeliveryDTO]) -> None:
+        lost.extend(deliveries)
+
+    writer = ConnectionWriter(
+        228, 1000, connection, max_queue_size=2,
+        overflow_policy=OverflowPolicy.DISCONNECT, lost_frames_handler=lost_frames_handler,
+    )
+
+    await fill_stuck_writer(writer, connection, 4)
+    connection.unblocked.set()
+    await asyncio.sleep(0.01)
+
+    assert writer.closed
+    assert not writer.put_text("Hello 5!", make_delivery(5))
+    assert connection.sent == [{"type": "websocket.close", "code": OVERFLOW_CLOSE_CODE, "reason": ""}]
+    assert lost == []
+
+
+@pytest.mark.asyncio
+async def test_spill_on_overflow(connection) -> None:
+    lost = []
+
+    async def lost_frames_handler(chat_id: int, user_id: int, deliveries: list[DeliveryDTO]) -> None:
+        lost.extend(delivery.message.id for delivery in deliveries)
+
+    writer = ConnectionWriter(
+        228, 1000, connection, max_queue_size=2,
+        overflow_policy=OverflowPolicy.SPILL, lost_frames_handler=lost_frames_handler,
+    )
+
+    await fill_stuck_writer(writer, connection, 3)
+    writer.put_text("Hello 4!", make_delivery(4))
+    connection.unblocked.set()
+    await asyncio.sleep(0.01)
+
+    assert texts(connection) == []
+    assert connection.sent == [{"type": "websocket.close", "code": OVERFLOW_CLOSE_CODE, "reason": ""}]
+    assert lost == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_confirmation_settles_once_frames_sent_or_lost(connection) -> None:
+    writer = ConnectionWriter(228, 1000, connection, max_queue_size=10)
+
+    confirmation = SendConfirmation()
+    for message_id in (1, 2):
+        writer.put_text(f"Hello {message_id}!", make_delivery(message_id), confirmation)
+    assert await confirmation.wait()
+
+    connection.unblocked.clear()
+    confirmation = SendConfirmation()
+    writer.put_text("Hello 3!", make_delivery(3), confirmation)
+    writer.put_text("Hello 4!", make_delivery(4), confirmation)
+    await asyncio.sleep(0)
+    writer.close()
+
+    assert not await confirmation.wait()
+    assert texts(connection) == ["Hello 1!", "Hello 2!"]
@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.connection_writer import ConnectionWriter
+from src.core.heartbeat import EVICTION_CLOSE_CODE, PING_FRAME, HeartbeatSweeper
+
+
+@pytest.mark.asyncio
+async def test_silent_connection_pinged_then_evicted(connection) -> None:
+    evicted = []
+
+    async def on_evict(writer: ConnectionWriter) -> None:
+        evicted.append(writer)
+
+    sweeper = HeartbeatSweeper(interval_sec=2, timeout_sec=2, on_evict=on_evict)
+    writer = ConnectionWriter(228, 1000, connection, max_queue_size=10)
+    sweeper.track(writer)
+
+    sweeper.sweep()
+    sweeper.sweep()
+    await asyncio.sleep(0)
+    assert connection.sent == []
+
+    writer.last_seen = time.monotonic() - 2.5
+    sweeper.sweep()
+    sweeper.sweep()
+    await asyncio.sleep(0)
+    assert connection.sent == [PING_FRAME]
+
+    writer.last_seen = time.monotonic() - 5
+    sweeper.sweep()
+    sweeper.sweep()
+    await asyncio.sleep(0.01)
+    assert writer.closed
+    assert connection.sent[-1] == {"type": "websocket.close", "code": EVICTION_CLOSE_CODE, "reason": ""}
+    assert evicted == [writer]
+    assert sweeper.get_stats() == {"tracked": 0, "pings": 1, "evictions": 1}
+
+
+@pytest.mark.asyncio
+async def test_active_connection_kept(connection) -> None:
+    sweeper = HeartbeatSweeper(interval_sec=2, timeout_sec=2)
+    writer = ConnectionWriter(228, 1000, connection, max_queue_size=10)
+    sweeper.track(writer)
+
+    for _ in range(10):
+        writer.touch()
+        sweeper.sweep()
+
+    assert not writer.closed
+    assert sweeper.get_stats() == {"tracked": 1, "pings": 0, "evictions": 0}
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from src.core.background import BackgroundTasks, background_tasks
+from src.core.connection_writer import RESTART_CLOSE_CODE
+from src.core.schemas.delivery import DeliveryDTO
+from src.core.schemas.message import MessageDTO
+from src.core.storage import ConnectionStorage
+
+
+@pytest.mark.asyncio
+async def test_drain_cancels_tasks_past_deadline() -> None:
+    tasks = BackgroundTasks()
+    finished = []
+
+    async def work(delay: float) -> None:
+        await asyncio.sleep(delay)
+        finished.append(delay)
+
+    tasks.spawn(work(0))
+    slow = tasks.spawn(work(10))
+    assert await tasks.drain(0.05) == 1
+    assert finished == [0]
+    assert slow.cancelled()
+    assert len(tasks) == 0
+
+
+@pytest.mark.asyncio
+async def test_close_all_hands_unsent_frames_over(
+    storage: ConnectionStorage, chat_id: int, connection
+) -> None:
+    handed_over = []
+
+    async def lost_frames_handler(chat_id: int, user_id: int, deliveries: list[DeliveryDTO]) -> None:
+        handed_over.append((chat_id, user_id, [delivery.message.id for delivery in deliveries]))
+
+    storage.lost_frames_handler = lost_frames_handler
+    writer = storage.add_user_connection(chat_id, 1000, connection)
+    for message_id in (1, 2):
+        message = MessageDTO(id=message_id, chat_id=chat_id, sender_id=1001, text="hi", timestamp=0)
+        writer.put_text(message.text, DeliveryDTO(message=message))
+
+    storage.close_all(RESTART_CLOSE_CODE)
+    assert await background_tasks.drain(1) == 0
+
+    assert storage.get_stats() == {"chats": 0, "connections": 0, "queued": 0}
+    assert handed_over == [(chat_id, 1000, [1, 2])]
+    assert connection.sent == [{"type": "websocket.close", "code": RESTART_CLOSE_CODE, "reason": ""}]
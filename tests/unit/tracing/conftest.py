@@ -0,0 +1,21 @@
+import pytest
+
+from src.core.tracing import SpanExporter, Trace, Tracer
+
+
+class CollectingExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.traces: list[Trace] = []
+
+    def export(self, trace: Trace) -> None:
+        self.traces.append(trace)
+
+
+@pytest.fixture
+def exporter() -> CollectingExporter:
+    return CollectingExporter()
+
+
+@pytest.fixture
+def tracer(exporter: CollectingExporter) -> Tracer:
+    return Tracer(sample_rate=1, exporter=exporter, linger_sec=0)
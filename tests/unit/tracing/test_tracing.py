@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.tracing import OtlpFileSpanExporter, Tracer, trace_span
+
+
+@pytest.mark.asyncio
+async def test_message_trace_collects_spans_until_exported(tracer: Tracer, exporter) -> None:
+    trace = tracer.start("chat_message", chat_id=228, user_id=1000)
+    with trace_span(trace, "save_message"):
+        pass
+    tracer.bind(1, trace)
+    queued_at = time.perf_counter()
+    tracer.add_span(1, "send", queued_at, queued_at + 0.01, user_id=1001)
+    tracer.finish(trace)
+    await asyncio.sleep(0.01)
+
+    assert exporter.traces == [trace]
+    assert [span.name for span in trace.spans] == ["save_message", "send"]
+    assert trace.root.attributes == {"chat_id": 228, "user_id": 1000, "message_id": 1}
+    assert trace.root.ended_at >= queued_at + 0.01
+    # Sends after the export are not recorded anywhere
+    tracer.add_span(1, "send", queued_at, queued_at, user_id=1002)
+    assert len(trace.spans) == 2
+    assert tracer.get_stats() == {"started": 1, "in_flight": 0, "exported": 1}
+
+
+def test_unsampled_messages_are_not_traced(exporter) -> None:
+    tracer = Tracer(sample_rate=0, exporter=exporter)
+    trace = tracer.start("chat_message")
+    assert trace is None
+    with trace_span(trace, "save_message"):
+        pass
+    assert tracer.get_stats()["started"] == 0
+
+
+def test_otlp_export(tracer: Tracer) -> None:
+    trace = tracer.start("chat_message", chat_id=228)
+    with trace.span("get_chat"):
+        pass
+    trace.end()
+
+    request = OtlpFileSpanExporter("unused", service_name="chat").to_otlp(trace)
+    root, child = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert root["traceId"] == child["traceId"] == trace.trace_id
+    assert child["parentSpanId"] == root["spanId"]
+    assert int(root["startTimeUnixNano"]) <= int(child["startTimeUnixNano"])
+    assert root["attributes"] == [{"key": "chat_id", "value": {"intValue": "228"}}]